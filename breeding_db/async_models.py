@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+from breeding_db.general import type_check
+from breeding_db.models import Model
+
+
+class AsyncModel():
+
+    # Prefixes of methods of Model which are available as coroutines.
+    PREFIXES = (
+        "find_", "insert_", "update_", "upsert_", "aggregate", "query_frame",
+        "bulk_load"
+    )
+
+    def __init__(self, path: str, concurrency: int = 5):
+        """ Asyncio version of `Model`, whose statements run concurrently.
+
+        Methods of `Model` starting with `PREFIXES` become coroutines with \
+        the same arguments. They run on at most `concurrency` threads, each \
+        with a connection from the pool of the model, so `concurrency` \
+        can not exceed POOL_SIZE of the settings.
+
+        Every call runs outside of a session: writes are committed one call \
+        at a time.
+
+        Usage, looking up the parents of a pig at the same time:
+        ```
+        async with AsyncModel("database_settings.json") as model:
+            sire, dam = await asyncio.gather(
+                model.find_pig(sire),
+                model.find_pig(dam)
+            )
+        ```
+
+        :param path: path to the json setting file, see `Model`.
+        :param concurrency: maximum number of statements running at once.
+        :raises: TypeError, ValueError.
+        """
+
+        type_check(concurrency, "concurrency", int)
+        if concurrency < 1:
+            msg = f"concurrency should be larger than 0. Got {concurrency}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        self.__model = Model(path)
+        pool_size = self.__model.get_pool().get_size()
+        if concurrency > pool_size:
+            self.__model.close()
+            msg = f"concurrency should not exceed POOL_SIZE {pool_size}. Got {concurrency}."
+            logging.error(msg)
+            raise ValueError(msg)
+        self.__executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="AsyncModel"
+        )
+
+    def __getattr__(self, name: str):
+
+        if name.startswith("_") or not name.startswith(self.PREFIXES):
+            raise AttributeError(f"AsyncModel has no attribute {name}.")
+        method = getattr(self.__model, name)
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.__executor, partial(method, *args, **kwargs)
+            )
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
+
+    async def __aenter__(self) -> "AsyncModel":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.aclose()
+
+    def get_model(self) -> Model:
+        """ Return the model running the statements."""
+        return self.__model
+
+    def close(self) -> None:
+        """ Wait for running statements and close idle connections."""
+
+        self.__executor.shutdown(wait=True)
+        self.__model.close()
+
+    async def aclose(self) -> None:
+        """ Coroutine version of `close`, which waits without blocking the \
+        event loop.
+        """
+
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -375,7 +375,7 @@ class Estrus:
         if pregnant is not None:
             self.set_pregnant(pregnant)
         if parity is not None:
-            self.__parity(parity)
+            self.set_parity(parity)
 
     def __str__(self):
 
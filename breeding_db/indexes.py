@@ -0,0 +1,394 @@
+"""In-memory indexes of the database used by readers."""
+
+__all__ = [
+    "HerdIndex", 
+    "SowTimeline"
+]
+
+import logging
+from datetime import date, datetime
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+
+from breeding_db.general import type_check
+from breeding_db.models import Model
+from breeding_db.data_structures import Pig, Estrus
+
+
+class HerdIndex():
+
+    def __init__(self, model: Model | None, farm: str = None):
+        """ Pigs of a farm loaded once and looked up in memory.
+
+        Pigs are loaded with one streaming query and kept in hash maps keyed \
+        by primary key, `reg_id`, (id, breed, gender) and (id, birth_year, \
+        breed). Pigs of each key are sorted by birthday, so the pigs born \
+        before a date and the youngest pig are found by bisection.
+
+        The index does not see writes of other clients. Call `add` after \
+        inserting or updating a pig to keep it consistent. Pigs are streamed \
+        on a separate connection, so pigs not yet committed by the session of \
+        the model are not loaded.
+
+        An index without model starts empty and is filled through `add`, \
+        e.g. with pigs found in bulk or read from a sheet.
+
+        :param model: model to load pigs from, an empty index if None.
+        :param farm: farm of the pigs, all pigs are loaded if None.
+        :raises: TypeError.
+        """
+
+        if model is not None:
+            type_check(model, "model", Model)
+        if farm is not None:
+            type_check(farm, "farm", str)
+
+        self.__farm = farm
+        self.__pigs = {} # (id, birthday, farm): pig
+        self.__reg_ids = {} # reg_id: pig
+        self.__ids = {} # id: pigs
+        self.__lines = {} # (id, breed, gender): pigs
+        self.__tags = {} # (id, birth_year, breed): pigs
+
+        if model is None:
+            return
+        equal = {} if farm is None else {"farm": farm}
+        for pig in model.iter_pigs(equal=equal):
+            self.add(pig)
+
+    @staticmethod
+    def __sort_key(pig: Pig) -> tuple:
+        """ Order of pigs with the same key: birthday, then farm."""
+        return (pig.get_birthday(), pig.get_farm())
+
+    def __insert(self, index: dict, key: tuple | str, pig: Pig) -> None:
+        insort(index.setdefault(key, []), pig, key=self.__sort_key)
+
+    def __remove(self, index: dict, key: tuple | str, pig: Pig) -> None:
+        pigs = index.get(key, [])
+        for i, other in enumerate(pigs):
+            if other is pig:
+                del pigs[i]
+                break
+        if len(pigs) == 0:
+            index.pop(key, None)
+
+    def __keys(self, pig: Pig) -> list[tuple[dict, tuple | str]]:
+        """ Return (index, key) of every sorted index containing the pig."""
+
+        keys = [(self.__ids, pig.get_id())]
+        if pig.get_breed() is not None and pig.get_gender() is not None:
+            keys.append(
+                (self.__lines, (pig.get_id(), pig.get_breed(), pig.get_gender()))
+            )
+        if pig.get_breed() is not None:
+            keys.append(
+                (self.__tags, (pig.get_id(), pig.get_birthday().year, pig.get_breed()))
+            )
+        return keys
+
+    def add(self, pig: Pig) -> None:
+        """ Add a pig, replacing the pig with the same primary keys.
+
+        Pigs of other farms are ignored when the index has a farm.
+
+        :param pig: an unique pig instance.
+        :raises: TypeError, ValueError.
+        """
+
+        type_check(pig, "pig", Pig)
+        if not pig.is_unique():
+            msg = f"pig should be unique. Got {pig}."
+            logging.error(msg)
+            raise ValueError(msg)
+        if self.__farm is not None and pig.get_farm() != self.__farm:
+            return
+
+        key = (pig.get_id(), pig.get_birthday(), pig.get_farm())
+        old = self.__pigs.pop(key, None)
+        if old is not None:
+            if self.__reg_ids.get(old.get_reg_id()) is old:
+                del self.__reg_ids[old.get_reg_id()]
+            for index, index_key in self.__keys(old):
+                self.__remove(index, index_key, old)
+
+        self.__pigs[key] = pig
+        if pig.get_reg_id() is not None:
+            self.__reg_ids[pig.get_reg_id()] = pig
+        for index, index_key in self.__keys(pig):
+            self.__insert(index, index_key, pig)
+
+    def find_pig(self, pig: Pig) -> Pig | None:
+        """ Find a pig through primary keys, None if it does not exist.
+
+        :param pig: an unique pig instance.
+        :raises: TypeError, ValueError.
+        """
+
+        type_check(pig, "pig", Pig)
+        if not pig.is_unique():
+            msg = f"pig should be unique. Got {pig}."
+            logging.error(msg)
+            raise ValueError(msg)
+        return self.__pigs.get((pig.get_id(), pig.get_birthday(), pig.get_farm()))
+
+    def find_pig_by_reg_id(self, reg_id: str) -> Pig | None:
+        """ Find the pig with a registration id, None if it does not exist.
+
+        :param reg_id: registration id of the pig.
+        :raises: TypeError.
+        """
+
+        type_check(reg_id, "reg_id", str)
+        return self.__reg_ids.get(reg_id)
+
+    def find_pigs(
+            self,
+            id: str,
+            farm: str = None,
+            breed: str = None,
+            gender: str = None,
+            birth_year: int | str = None,
+            born_before: date = None
+        ) -> list[Pig]:
+        """ Find pigs of an id satisfying the conditions, ordered by \
+        birthday ascending. The youngest pig is the last one.
+
+        :param id: id of the pigs.
+        :param farm: farm of the pigs, any farm if None.
+        :param breed: breed of the pigs, any breed if None.
+        :param gender: gender of the pigs, any gender if None.
+        :param birth_year: birth year of the pigs, any year if None.
+        :param born_before: a date, only pigs born before it are returned. \
+            A datetime is truncated to its date.
+        :raises: TypeError, ValueError.
+        """
+
+        type_check(id, "id", str)
+        if birth_year is not None:
+            if isinstance(birth_year, int):
+                birth_year = str(birth_year)
+            type_check(birth_year, "birth_year", str)
+            if not birth_year.isdigit():
+                msg = f"birth_year should be digits. Got {birth_year}."
+                logging.error(msg)
+                raise ValueError(msg)
+            birth_year = int(birth_year)
+
+        if birth_year is not None and breed is not None:
+            pigs = self.__tags.get((id, birth_year, breed), [])
+        elif breed is not None and gender is not None:
+            pigs = self.__lines.get((id, breed, gender), [])
+        else:
+            pigs = self.__ids.get(id, [])
+
+        if born_before is not None:
+            type_check(born_before, "born_before", date)
+            born_before = born_before.date() if isinstance(born_before, datetime) else born_before
+            end = bisect_left(pigs, (born_before, ""), key=self.__sort_key)
+            pigs = pigs[:end]
+
+        return [
+            pig for pig in pigs
+            if (farm is None or pig.get_farm() == farm)
+            and (breed is None or pig.get_breed() == breed)
+            and (gender is None or pig.get_gender() == gender)
+            and (birth_year is None or pig.get_birthday().year == birth_year)
+        ]
+
+    def find_pig_by_tag(
+            self,
+            year: int | str,
+            breed: str,
+            id: str,
+            farm: str,
+            gender: str = None
+        ) -> Pig | None:
+        """ Find the youngest pig of a {birth_year}{breed}{id} tag, same as \
+        `Model.find_pig_by_tag`.
+
+        :param year: birth year of the pig.
+        :param breed: breed of the pig.
+        :param id: id of the pig.
+        :param farm: farm of the pig.
+        :param gender: gender of the pig, any gender if None.
+        :raises: TypeError, ValueError.
+        """
+
+        type_check(breed, "breed", str)
+        type_check(farm, "farm", str)
+        found = self.find_pigs(id, farm=farm, breed=breed, gender=gender, birth_year=year)
+        if len(found) == 0:
+            return None
+        return found[-1]
+
+    def get_farm(self) -> str | None:
+        return self.__farm
+
+    def get_count(self) -> int:
+        return len(self.__pigs)
+
+
+class SowTimeline():
+
+    def __init__(self, model: Model | None, farm: str = None):
+        """ Estrus datetimes and parities of each sow, loaded once.
+
+        Estrus are loaded with one streaming query. Datetimes of each sow \
+        are kept in a sorted list with a parallel list of parities, so \
+        estrus before or after a datetime are found by bisection. Running \
+        maxima and minima of the parities give the largest parity before \
+        and the smallest after a datetime, even if parities recorded in the \
+        database do not increase over time.
+
+        Estrus without parity are counted but kept out of the sorted lists, \
+        so they are ignored by parity lookups. Call \
+        `add` after inserting or updating an estrus to keep the timeline \
+        consistent. Estrus not yet committed by the session of the model \
+        are not loaded.
+
+        :param model: model to load estrus from, an empty timeline if None.
+        :param farm: farm of the sows, all estrus are loaded if None.
+        :raises: TypeError.
+        """
+
+        if model is not None:
+            type_check(model, "model", Model)
+        if farm is not None:
+            type_check(farm, "farm", str)
+
+        self.__farm = farm
+        self.__datetimes = {} # (id, birthday, farm): sorted estrus datetimes
+        self.__parities = {} # (id, birthday, farm): parities of the datetimes
+        self.__unknown = {} # (id, birthday, farm): datetimes without parity
+        # (id, birthday, farm): (prefix maxima, suffix minima) of the parities,
+        # computed again on lookup after the parities change.
+        self.__extrema = {}
+        self.__count = 0
+
+        if model is None:
+            return
+        equal = {} if farm is None else {"farm": farm}
+        for row in model.iter_estrus(equal=equal, raw=True):
+            self.__insert(
+                (row["id"], row["birthday"], row["farm"]), 
+                row["estrus_datetime"], 
+                row["parity"]
+            )
+
+    @staticmethod
+    def __sow_key(sow: Pig) -> tuple:
+
+        type_check(sow, "sow", Pig)
+        if not sow.is_unique():
+            msg = f"sow should be unique. Got {sow}."
+            logging.error(msg)
+            raise ValueError(msg)
+        return (sow.get_id(), sow.get_birthday(), sow.get_farm())
+
+    def __insert(self, key: tuple, estrus_datetime: datetime, parity: int | None) -> None:
+        """ Insert or replace the parity of an estrus datetime of a sow."""
+
+        datetimes = self.__datetimes.setdefault(key, [])
+        parities = self.__parities.setdefault(key, [])
+        unknown = self.__unknown.setdefault(key, set())
+        self.__extrema.pop(key, None)
+        i = bisect_left(datetimes, estrus_datetime)
+        if i < len(datetimes) and datetimes[i] == estrus_datetime:
+            del datetimes[i]
+            del parities[i]
+        elif estrus_datetime in unknown:
+            unknown.remove(estrus_datetime)
+        else:
+            self.__count += 1
+        if parity is None:
+            unknown.add(estrus_datetime)
+            return
+        datetimes.insert(i, estrus_datetime)
+        parities.insert(i, parity)
+
+    def __get_extrema(self, key: tuple) -> tuple[list, list]:
+        """ Return prefix maxima and suffix minima of the parities of a sow."""
+
+        if key not in self.__extrema:
+            parities = self.__parities.get(key, [])
+            minima = list(accumulate(reversed(parities), min))
+            minima.reverse()
+            self.__extrema[key] = (list(accumulate(parities, max)), minima)
+        return self.__extrema[key]
+
+    def add(self, estrus: Estrus) -> None:
+        """ Add an estrus, replacing the parity of the estrus with the same \
+        primary keys.
+
+        Estrus of other farms are ignored when the timeline has a farm.
+
+        :param estrus: an unique estrus instance.
+        :raises: TypeError, ValueError.
+        """
+
+        type_check(estrus, "estrus", Estrus)
+        if not estrus.is_unique():
+            msg = f"estrus should be unique. Got {estrus}."
+            logging.error(msg)
+            raise ValueError(msg)
+        if self.__farm is not None and estrus.get_sow().get_farm() != self.__farm:
+            return
+        self.__insert(
+            self.__sow_key(estrus.get_sow()), 
+            estrus.get_estrus_datetime(), 
+            estrus.get_parity()
+        )
+
+    def get_previous_parity(self, sow: Pig, estrus_datetime: datetime) -> int | None:
+        """ Return the largest parity of estrus of the sow before \
+        `estrus_datetime`, None if there is none.
+
+        :param sow: an unique pig instance.
+        :param estrus_datetime: datetime of an estrus.
+        :raises: TypeError, ValueError.
+        """
+
+        key = self.__sow_key(sow)
+        type_check(estrus_datetime, "estrus_datetime", datetime)
+        i = bisect_left(self.__datetimes.get(key, []), estrus_datetime)
+        return self.__get_extrema(key)[0][i - 1] if i > 0 else None
+
+    def get_next_parity(self, sow: Pig, estrus_datetime: datetime) -> int | None:
+        """ Return the smallest parity of estrus of the sow after \
+        `estrus_datetime`, None if there is none.
+
+        :param sow: an unique pig instance.
+        :param estrus_datetime: datetime of an estrus.
+        :raises: TypeError, ValueError.
+        """
+
+        key = self.__sow_key(sow)
+        type_check(estrus_datetime, "estrus_datetime", datetime)
+        datetimes = self.__datetimes.get(key, [])
+        i = bisect_right(datetimes, estrus_datetime)
+        return self.__get_extrema(key)[1][i] if i < len(datetimes) else None
+
+    def find_datetimes(self, sow: Pig, parity: int) -> list[datetime]:
+        """ Return datetimes of estrus of the sow with the parity, in \
+        ascending order.
+
+        :param sow: an unique pig instance.
+        :param parity: parity of the estrus.
+        :raises: TypeError, ValueError.
+        """
+
+        key = self.__sow_key(sow)
+        type_check(parity, "parity", int)
+        return [
+            estrus_datetime for estrus_datetime, p in zip(
+                self.__datetimes.get(key, []), self.__parities.get(key, [])
+            )
+            if p == parity
+        ]
+
+    def get_farm(self) -> str | None:
+        return self.__farm
+
+    def get_count(self) -> int:
+        return self.__count
@@ -0,0 +1,133 @@
+"""Link records to their parent events in bulk."""
+
+__all__ = [
+    "LinkStatus",
+    "link_latest"
+]
+
+import logging
+from enum import Enum
+from datetime import timedelta
+
+import pandas as pd
+
+from breeding_db.general import type_check
+
+
+class LinkStatus(Enum):
+
+    LINKED = "Linked"
+    MISSING = "Missing"
+    TOO_SHORT = "Too short"
+    TOO_LONG = "Too long"
+
+
+def link_latest(
+    records: pd.DataFrame,
+    parents: pd.DataFrame,
+    by: list[str],
+    on: str,
+    parent_on: str,
+    lower: timedelta = None,
+    upper: timedelta = None,
+    tolerance: timedelta = None,
+    in_days: bool = False
+) -> pd.DataFrame:
+    """ Link every record to the latest parent with the same `by` columns \
+    at or before it, with one `pandas.merge_asof`.
+
+    The gap between a record and its parent is checked against the window \
+    [`lower`, `upper`], e.g. `Farrowing.PREGNANT_LOWER_BOUND` and \
+    `Farrowing.PREGNANT_UPPER_BOUND` for a farrowing and its estrus.
+
+    Usage, linking farrowings to their estrus:
+    ```
+    links = link_latest(
+        farrowings, estrus, ["id", "birthday", "farm"],
+        "farrowing_date", "estrus_datetime",
+        Farrowing.PREGNANT_LOWER_BOUND, Farrowing.PREGNANT_UPPER_BOUND,
+        in_days=True
+    )
+    ```
+
+    :param records: records to link, with `by` and `on` columns.
+    :param parents: candidate parents, with `by` and `parent_on` columns.
+    :param by: columns which must be equal, e.g. primary keys of the sow.
+    :param on: date or datetime column of records.
+    :param parent_on: date or datetime column of parents.
+    :param lower: smallest gap allowed, no limit if None.
+    :param upper: largest gap allowed, no limit if None.
+    :param tolerance: parents further than it are not linked, no limit if \
+        None.
+    :param in_days: compare gaps between dates, ignoring time.
+    :return: a dataframe with the index of `records`, columns of `parents` \
+        except `by`, the "gap" and the "status", a LinkStatus. Records \
+        with an empty `by` or `on`, or without parent, are MISSING.
+    :raises: TypeError, KeyError.
+    """
+
+    type_check(records, "records", pd.DataFrame)
+    type_check(parents, "parents", pd.DataFrame)
+    type_check(by, "by", list)
+    type_check(on, "on", str)
+    type_check(parent_on, "parent_on", str)
+    if not set(by + [on]).issubset(records.columns):
+        msg = f"records should have columns {by + [on]}."
+        logging.error(msg)
+        raise KeyError(msg)
+    if not set(by + [parent_on]).issubset(parents.columns):
+        msg = f"parents should have columns {by + [parent_on]}."
+        logging.error(msg)
+        raise KeyError(msg)
+
+    if len(parents) == 0:
+        result = pd.DataFrame(
+            index=records.index, 
+            columns=[column for column in parents.columns if column not in by]
+        )
+        result["gap"] = pd.Series(pd.NaT, index=records.index, dtype="timedelta64[ns]")
+        result["status"] = pd.Series(LinkStatus.MISSING, index=records.index, dtype="object")
+        return result
+
+    # Join on a private column so that names of records and parents may be
+    # the same. merge_asof needs both sides sorted, without empty keys and
+    # with keys of the same dtypes, which differ when a side is built from
+    # python objects.
+    left = records[by].astype("object")
+    left["__on"] = pd.to_datetime(records[on]).astype("datetime64[ns]")
+    left = left[left.notna().all(axis=1)].sort_values("__on")
+    right = parents.copy()
+    right[by] = right[by].astype("object")
+    right["__on"] = pd.to_datetime(parents[parent_on]).astype("datetime64[ns]")
+    right = right[right[by + ["__on"]].notna().all(axis=1)].sort_values("__on")
+
+    merged = pd.merge_asof(
+        left.reset_index(),
+        right,
+        on="__on",
+        by=by,
+        direction="backward",
+        tolerance=None if tolerance is None else pd.Timedelta(tolerance)
+    ).set_index(left.index.name or "index")
+    merged.index.name = records.index.name
+
+    record_times = merged["__on"]
+    parent_times = pd.to_datetime(merged[parent_on])
+    if in_days:
+        record_times = record_times.dt.normalize()
+        parent_times = parent_times.dt.normalize()
+    gap = record_times - parent_times
+
+    status = pd.Series(LinkStatus.LINKED, index=merged.index, dtype="object")
+    status[gap.isna()] = LinkStatus.MISSING
+    if lower is not None:
+        status[gap < pd.Timedelta(lower)] = LinkStatus.TOO_SHORT
+    if upper is not None:
+        status[gap > pd.Timedelta(upper)] = LinkStatus.TOO_LONG
+
+    result = merged.drop(columns=by + ["__on"])
+    result["gap"] = gap
+    result["status"] = status
+    result = result.reindex(records.index)
+    result["status"] = result["status"].fillna(LinkStatus.MISSING)
+    return result
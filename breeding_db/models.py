@@ -1,15 +1,654 @@
+import os
+import re
+import sys
 import json
+import time
 import logging
+import threading
+import tempfile
+from enum import Enum
+from datetime import date, datetime
+from functools import lru_cache
+from contextlib import contextmanager, nullcontext
+from collections import OrderedDict, deque
+from collections.abc import Iterable, Iterator
 
 import pymysql
+import pandas as pd
 
+from breeding_db import schema
 from breeding_db.general import type_check
 from breeding_db.data_structures import Farrowing, Weaning, Individual
 from breeding_db.data_structures import Pig, Estrus, Mating, PregnantStatus
 
 
+class UpsertStatus(Enum):
+
+    INSERTED = "Inserted"
+    UPDATED = "Updated"
+    UNCHANGED = "Unchanged"
+
+    @staticmethod
+    def from_affected_rows(affected: int) -> "UpsertStatus":
+        """ Translate affected rows of `INSERT ... ON DUPLICATE KEY UPDATE`.
+
+        MySQL reports 1 for a new row, 2 for an updated row and 0 for an 
+        existing row whose values did not change.
+        """
+
+        return {
+            1: UpsertStatus.INSERTED, 
+            2: UpsertStatus.UPDATED
+        }.get(affected, UpsertStatus.UNCHANGED)
+
+
+class ConnectionPool():
+
+    def __init__(
+        self, 
+        config: dict, 
+        size: int = 5, 
+        idle_timeout: float = 300, 
+        ping_interval: float = 10
+    ):
+        """ A bounded, thread-safe pool of pymysql connections.
+
+        Connections are created lazily, reused after being returned and 
+        closed when they stay idle longer than `idle_timeout`. A connection 
+        idle longer than `ping_interval` is pinged (and reconnected if 
+        necessary) before being handed out.
+
+        :param config: database settings, see `Model`.
+        :param size: maximum number of open connections.
+        :param idle_timeout: seconds before an idle connection is closed.
+        :param ping_interval: seconds of idleness before a health check.
+        :raises: TypeError, ValueError.
+        """
+
+        type_check(config, "config", dict)
+        type_check(size, "size", int)
+        if size < 1:
+            msg = f"size should be larger than 0. Got {size}."
+            logging.error(msg)
+            raise ValueError(msg)
+        if isinstance(idle_timeout, int):
+            idle_timeout = float(idle_timeout)
+        type_check(idle_timeout, "idle_timeout", float)
+        if idle_timeout < 0:
+            msg = f"idle_timeout should not be negative. Got {idle_timeout}."
+            logging.error(msg)
+            raise ValueError(msg)
+        if isinstance(ping_interval, int):
+            ping_interval = float(ping_interval)
+        type_check(ping_interval, "ping_interval", float)
+        if ping_interval < 0:
+            msg = f"ping_interval should not be negative. Got {ping_interval}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        self.__config = config
+        self.__size = size
+        self.__idle_timeout = idle_timeout
+        self.__ping_interval = ping_interval
+        self.__idle = [] # Stack of (connection, last used time).
+        self.__created = 0
+        self.__condition = threading.Condition()
+
+    def __connect(self) -> pymysql.Connection:
+        """ Open a new connection from the settings."""
+
+        return pymysql.connect(
+            host=self.__config["DATABASE_HOST"],
+            user=self.__config["USER"],
+            password=self.__config["PASSWORD"],
+            database=self.__config["DATABASE"],
+            charset=self.__config["CHARSET"],
+            cursorclass=pymysql.cursors.DictCursor, 
+            local_infile=self.__config.get("LOCAL_INFILE", False)
+        )
+
+    def __discard(self, connection: pymysql.Connection) -> None:
+        """ Close a connection and free its slot. Caller holds the lock."""
+
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self.__created -= 1
+
+    def acquire(self, timeout: float = None) -> pymysql.Connection:
+        """ Check out a healthy connection, waiting if the pool is exhausted.
+
+        :param timeout: seconds to wait for a free connection, None to wait \
+            forever.
+        :raises TimeoutError: if no connection is available in time.
+        """
+
+        with self.__condition:
+            while True:
+                now = time.monotonic()
+                while len(self.__idle) > 0:
+                    connection, last_used = self.__idle.pop()
+                    if now - last_used > self.__idle_timeout:
+                        self.__discard(connection)
+                        continue
+                    if now - last_used > self.__ping_interval:
+                        try:
+                            connection.ping(reconnect=True)
+                        except pymysql.err.Error:
+                            self.__discard(connection)
+                            continue
+                    return connection
+                if self.__created < self.__size:
+                    self.__created += 1
+                    break
+                if not self.__condition.wait(timeout):
+                    msg = "No database connection available in the pool."
+                    logging.error(msg)
+                    raise TimeoutError(msg)
+
+        # Connect outside the lock so other threads are not blocked.
+        try:
+            return self.__connect()
+        except Exception as error:
+            with self.__condition:
+                self.__created -= 1
+                self.__condition.notify()
+            logging.error(error.args[0])
+            raise error
+
+    def release(self, connection: pymysql.Connection) -> None:
+        """ Return a connection to the pool.
+
+        :param connection: a connection from `acquire`.
+        """
+
+        with self.__condition:
+            if connection.open:
+                self.__idle.append((connection, time.monotonic()))
+            else:
+                self.__created -= 1
+            self.__condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """ Context manager which checks out a connection and returns it to 
+        the pool afterward. Uncommitted work is rolled back on error.
+        """
+
+        connection = self.acquire()
+        try:
+            yield connection
+        except Exception:
+            if connection.open:
+                try:
+                    connection.rollback()
+                except pymysql.err.Error:
+                    # Lost while rolling back, the server discards the work.
+                    connection.close()
+            raise
+        finally:
+            self.release(connection)
+
+    def close(self) -> None:
+        """ Close every idle connection."""
+
+        with self.__condition:
+            while len(self.__idle) > 0:
+                connection, _ = self.__idle.pop()
+                self.__discard(connection)
+
+    def get_size(self) -> int:
+        return self.__size
+
+    def get_idle_count(self) -> int:
+        return len(self.__idle)
+
+    def get_open_count(self) -> int:
+        return self.__created
+
+
+class IdentityMap():
+
+    def __init__(self):
+        """ Objects hydrated in a session, at most one per table and primary 
+        key, so the same row is always the same instance.
+        """
+
+        self.__objects = {} # (table, primary key): object
+
+    def get(self, table: str, key: tuple):
+        """ Return the object of the key, or None."""
+        return self.__objects.get((table, key))
+
+    def add(self, table: str, key: tuple, obj):
+        """ Register an object unless the key already has one. 
+        
+        :return: the registered object of the key.
+        """
+        return self.__objects.setdefault((table, key), obj)
+
+    def discard(self, table: str, key: tuple) -> None:
+        self.__objects.pop((table, key), None)
+
+    def clear(self) -> None:
+        self.__objects.clear()
+
+    def get_count(self) -> int:
+        return len(self.__objects)
+
+
+class Session():
+
+    def __init__(
+        self, 
+        connection: pymysql.Connection, 
+        on_close, 
+        on_rollback=None
+    ):
+        """ A unit of work pinned to one connection.
+
+        Statements issued through the model while the session is active run 
+        on this connection and are committed together by `commit`. Get a 
+        session from `Model.begin` or `Model.transaction`.
+
+        :param connection: a connection with an open transaction.
+        :param on_close: function called with the session once it ends.
+        :param on_rollback: function called without arguments after work is \
+            rolled back, either wholly or to a savepoint.
+        """
+
+        self.__connection = connection
+        self.__on_close = on_close
+        self.__on_rollback = on_rollback
+        self.__identity_map = IdentityMap()
+        self.__savepoints = 0
+        self.__closed = False
+
+    def __end(self) -> None:
+
+        self.__closed = True
+        self.__on_close(self)
+
+    def get_connection(self) -> pymysql.Connection:
+        return self.__connection
+
+    def get_identity_map(self) -> IdentityMap:
+        return self.__identity_map
+
+    def is_closed(self) -> bool:
+        return self.__closed
+
+    @contextmanager
+    def savepoint(self):
+        """ Context manager wraps a block in a savepoint. Work done in the 
+        block is rolled back to the savepoint on error and the error is 
+        re-raised; the rest of the session is kept.
+        """
+
+        self.__savepoints += 1
+        name = f"sp_{self.__savepoints}"
+        with self.__connection.cursor() as cursor:
+            cursor.execute(f"SAVEPOINT {name};")
+        try:
+            yield self
+        except Exception:
+            with self.__connection.cursor() as cursor:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {name};")
+            # Mapped objects may hold values which were rolled back.
+            self.__identity_map.clear()
+            if self.__on_rollback is not None:
+                self.__on_rollback()
+            raise
+        with self.__connection.cursor() as cursor:
+            cursor.execute(f"RELEASE SAVEPOINT {name};")
+
+    def commit(self) -> None:
+        """ Commit all work of the session and end it."""
+
+        if self.__closed:
+            msg = "Session has already been closed."
+            logging.error(msg)
+            raise RuntimeError(msg)
+        try:
+            self.__connection.commit()
+        finally:
+            self.__end()
+
+    def rollback(self) -> None:
+        """ Discard all work of the session and end it."""
+
+        if self.__closed:
+            msg = "Session has already been closed."
+            logging.error(msg)
+            raise RuntimeError(msg)
+        try:
+            self.__connection.rollback()
+        finally:
+            if self.__on_rollback is not None:
+                self.__on_rollback()
+            self.__end()
+
+
+class QueryCache():
+
+    MISSING = object() # Returned by `get` on a miss.
+
+    def __init__(self, size: int = 1024):
+        """ A size-bounded LRU cache of query results.
+
+        Each result is stored with tags naming what it depends on, such as \
+        ("id", "123456"). Invalidating a tag drops every result carrying it.
+
+        :param size: maximum number of cached results.
+        :raises TypeError: if size is not an int.
+        :raises ValueError: if size is smaller than 1.
+        """
+
+        type_check(size, "size", int)
+        if size < 1:
+            msg = f"size should be larger than 0. Got {size}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        self.__size = size
+        self.__entries = OrderedDict() # key: (value, tags)
+        self.__tagged = {} # tag: set of keys
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+
+    def __remove(self, key) -> None:
+        """ Remove an entry and its tags. Caller holds the lock."""
+
+        _, tags = self.__entries.pop(key)
+        for tag in tags:
+            keys = self.__tagged.get(tag)
+            if keys is None:
+                continue
+            keys.discard(key)
+            if len(keys) == 0:
+                del self.__tagged[tag]
+
+    def get(self, key, default=MISSING):
+        """ Return the cached value of `key` and mark it recently used, or 
+        `default` if not cached.
+        """
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__misses += 1
+                return default
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[0]
+
+    def put(self, key, value, tags: Iterable) -> None:
+        """ Cache a value, evicting the least recently used one if full.
+
+        :param key: a hashable key.
+        :param value: value to cache.
+        :param tags: hashable tags the value depends on.
+        """
+
+        tags = frozenset(tags)
+        with self.__lock:
+            if key in self.__entries:
+                self.__remove(key)
+            self.__entries[key] = (value, tags)
+            for tag in tags:
+                self.__tagged.setdefault(tag, set()).add(key)
+            while len(self.__entries) > self.__size:
+                self.__remove(next(iter(self.__entries)))
+
+    def invalidate(self, tags: Iterable) -> None:
+        """ Drop every value carrying any of the tags."""
+
+        with self.__lock:
+            for tag in tags:
+                for key in list(self.__tagged.get(tag, ())):
+                    self.__remove(key)
+
+    def clear(self) -> None:
+        """ Drop all values. Counters are kept."""
+
+        with self.__lock:
+            self.__entries.clear()
+            self.__tagged.clear()
+
+    def get_size(self) -> int:
+        return self.__size
+
+    def get_count(self) -> int:
+        return len(self.__entries)
+
+    def get_hits(self) -> int:
+        return self.__hits
+
+    def get_misses(self) -> int:
+        return self.__misses
+
+
+class QueryStats():
+
+    # Upper bounds of latency buckets in seconds.
+    BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, float("inf"))
+
+    def __init__(self, slow_seconds: float = None, slow_log_size: int = 100):
+        """ Latency statistics of statements, grouped by the calling method \
+        of `Model` and the statement shape.
+
+        :param slow_seconds: statements taking at least this long are kept \
+            in the slow query log, None to keep none.
+        :param slow_log_size: number of latest slow queries kept.
+        :raises TypeError: if slow_log_size is not an int.
+        :raises ValueError: if slow_log_size is smaller than 1.
+        """
+
+        type_check(slow_log_size, "slow_log_size", int)
+        if slow_log_size < 1:
+            msg = f"slow_log_size should be larger than 0. Got {slow_log_size}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        self.__slow_seconds = slow_seconds
+        self.__entries = {} # (method, statement): counters
+        self.__slow = deque(maxlen=slow_log_size)
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def shape(sql_query: str) -> str:
+        """ Strip values from a statement so that statements differing only \
+        in values or in the length of IN lists have the same shape.
+        """
+
+        shape = re.sub(r"\s+", " ", sql_query).strip()
+        shape = re.sub(r"'(?:[^'\\]|\\.|'')*'", "%s", shape)
+        shape = re.sub(r"\b\d+(?:\.\d+)?\b", "%s", shape)
+        shape = re.sub(r"%s(?:, %s)+", "%s, ...", shape)
+        shape = re.sub(r"\((%s(?:, \.\.\.)?)\)(?:, \(\1\))+", r"(\1), ...", shape)
+        return shape
+
+    def is_slow(self, seconds: float) -> bool:
+        return self.__slow_seconds is not None and seconds >= self.__slow_seconds
+
+    def record(self, method: str, statement: str, seconds: float, rows: int) -> None:
+        """ Count one execution of a statement.
+
+        :param method: name of the calling method.
+        :param statement: shape of the statement.
+        :param seconds: latency of the statement.
+        :param rows: rows returned or affected.
+        """
+
+        bucket = next(
+            index for index, bound in enumerate(self.BUCKETS) if seconds <= bound
+        )
+        with self.__lock:
+            entry = self.__entries.get((method, statement))
+            if entry is None:
+                entry = {
+                    "count": 0, 
+                    "total_seconds": 0.0, 
+                    "max_seconds": 0.0, 
+                    "rows": 0, 
+                    "histogram": [0] * len(self.BUCKETS)
+                }
+                self.__entries[(method, statement)] = entry
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["rows"] += rows
+            entry["histogram"][bucket] += 1
+
+    def add_slow_query(self, entry: dict) -> None:
+        """ Keep a slow query, dropping the oldest one if the log is full."""
+
+        with self.__lock:
+            self.__slow.append(entry)
+
+    def get_stats(self) -> list[dict]:
+        """ Return statistics of each (method, statement), the slowest in \
+        total first. Histograms map the upper bound of each bucket in \
+        seconds to the number of executions.
+        """
+
+        with self.__lock:
+            stats = [
+                {
+                    "method": method, 
+                    "statement": statement, 
+                    "count": entry["count"], 
+                    "total_seconds": entry["total_seconds"], 
+                    "max_seconds": entry["max_seconds"], 
+                    "rows": entry["rows"], 
+                    "histogram": {
+                        str(bound): count 
+                        for bound, count in zip(self.BUCKETS, entry["histogram"])
+                    }
+                }
+                for (method, statement), entry in self.__entries.items()
+            ]
+        stats.sort(key=lambda entry: entry["total_seconds"], reverse=True)
+        return stats
+
+    def get_slow_queries(self) -> list[dict]:
+        with self.__lock:
+            return list(self.__slow)
+
+    def get_slow_seconds(self) -> float | None:
+        return self.__slow_seconds
+
+    def reset(self) -> None:
+        """ Drop all statistics and slow queries."""
+
+        with self.__lock:
+            self.__entries.clear()
+            self.__slow.clear()
+
+    def dump(self, path: str) -> None:
+        """ Write statistics and slow queries to a json file.
+
+        :param path: path of the json file.
+        """
+
+        type_check(path, "path", str)
+        with open(path, "w") as json_file:
+            json.dump({
+                "stats": self.get_stats(), 
+                "slow_queries": self.get_slow_queries()
+            }, json_file, indent=4, default=str)
+
+
 class Model():
 
+    # Primary key columns of each table.
+    PRIMARY_KEYS = {
+        "Pigs": ("id", "birthday", "farm"), 
+        "Estrus": ("id", "birthday", "farm", "estrus_datetime"), 
+        "Matings": (
+            "sow_id", "sow_birthday", "sow_farm", "estrus_datetime", "mating_datetime"
+        ), 
+        "Farrowings": ("id", "birthday", "farm", "estrus_datetime"), 
+        "Weanings": ("id", "birthday", "farm", "estrus_datetime"), 
+        "Individuals": (
+            "birth_sow_id", "birth_sow_birthday", "birth_sow_farm", 
+            "birth_estrus_datetime", "in_litter_id"
+        )
+    }
+
+    # Eager loading of each table: alias of the table, and joins of 
+    # (alias, table, alias joined to, its columns referencing the table's 
+    # primary key, whether the reference may be null).
+    LINEAGE_JOINS = {
+        "Farrowings": ("farrowing", (
+            ("estrus", "Estrus", "farrowing", ("id", "birthday", "farm", "estrus_datetime"), False), 
+            ("sow", "Pigs", "farrowing", ("id", "birthday", "farm"), False)
+        )), 
+        "Weanings": ("weaning", (
+            ("farrowing", "Farrowings", "weaning", ("id", "birthday", "farm", "estrus_datetime"), False), 
+            ("estrus", "Estrus", "weaning", ("id", "birthday", "farm", "estrus_datetime"), False), 
+            ("sow", "Pigs", "weaning", ("id", "birthday", "farm"), False)
+        )), 
+        "Individuals": ("individual", (
+            ("birth_farrowing", "Farrowings", "individual", (
+                "birth_sow_id", "birth_sow_birthday", "birth_sow_farm", "birth_estrus_datetime"
+            ), False), 
+            ("birth_estrus", "Estrus", "birth_farrowing", ("id", "birthday", "farm", "estrus_datetime"), False), 
+            ("birth_sow", "Pigs", "birth_farrowing", ("id", "birthday", "farm"), False), 
+            ("nurse_weaning", "Weanings", "individual", (
+                "nurse_sow_id", "nurse_sow_birthday", "nurse_sow_farm", "nurse_estrus_datetime"
+            ), True), 
+            ("nurse_farrowing", "Farrowings", "nurse_weaning", ("id", "birthday", "farm", "estrus_datetime"), True), 
+            ("nurse_estrus", "Estrus", "nurse_weaning", ("id", "birthday", "farm", "estrus_datetime"), True), 
+            ("nurse_sow", "Pigs", "nurse_weaning", ("id", "birthday", "farm"), True)
+        ))
+    }
+
+    # Foreign keys of each table: referencing columns and the table whose 
+    # primary key they reference.
+    FOREIGN_KEYS = {
+        "Pigs": (
+            (("dam_id", "dam_birthday", "dam_farm"), "Pigs"), 
+            (("sire_id", "sire_birthday", "sire_farm"), "Pigs")
+        ), 
+        "Estrus": ((("id", "birthday", "farm"), "Pigs"),), 
+        "Matings": (
+            (("sow_id", "sow_birthday", "sow_farm", "estrus_datetime"), "Estrus"), 
+            (("boar_id", "boar_birthday", "boar_farm"), "Pigs")
+        ), 
+        "Farrowings": ((("id", "birthday", "farm", "estrus_datetime"), "Estrus"),), 
+        "Weanings": ((("id", "birthday", "farm", "estrus_datetime"), "Farrowings"),), 
+        "Individuals": (
+            ((
+                "birth_sow_id", "birth_sow_birthday", "birth_sow_farm", 
+                "birth_estrus_datetime"
+            ), "Farrowings"), 
+            ((
+                "nurse_sow_id", "nurse_sow_birthday", "nurse_sow_farm", 
+                "nurse_estrus_datetime"
+            ), "Weanings")
+        )
+    }
+
+    # Functions of `aggregate` metrics and group_by.
+    AGGREGATES = ("COUNT", "SUM", "AVG", "MIN", "MAX")
+    GROUPINGS = ("YEAR", "MONTH")
+
+    # Text columns with few distinct values, loaded as categories in frames.
+    CATEGORY_COLUMNS = ("farm", "breed", "gender")
+
+    # MySQL errors worth retrying: cannot connect, server has gone away, 
+    # lost connection, lock wait timeout and deadlock.
+    TRANSIENT_ERRORS = (2003, 2006, 2013, 1205, 1213)
+    # Transient errors which roll back only the failed statement, so the 
+    # statement can be retried within a session.
+    STATEMENT_ERRORS = (1205,)
+
+    # Primary keys per query when `bulk_load` checks the loaded rows.
+    BULK_CHECK_SIZE = 1000
+
     def __init__(self, path: str):
         """ A class connects to mysql database and do query.
 
@@ -20,40 +659,1242 @@ class Model():
         4. DATABASE
         5. CHARSET
 
+        Optional connection pool settings:
+        1. POOL_SIZE: maximum open connections, defaults to 5.
+        2. POOL_IDLE_TIMEOUT: seconds before closing an idle connection, \
+            defaults to 300.
+        3. POOL_PING_INTERVAL: seconds of idleness before pinging a \
+            connection on checkout, defaults to 10.
+
+        Optional cache setting:
+        1. CACHE_SIZE: number of pig lookups kept by `find_pig` and \
+            `find_pigs`, defaults to 0 which disables the cache.
+
+        Optional instrumentation settings, see `get_query_stats`:
+        1. QUERY_STATS: record latency of every statement, defaults to false.
+        2. SLOW_QUERY_SECONDS: log statements taking at least this long, \
+            defaults to none. Setting it also records statistics.
+        3. SLOW_QUERY_EXPLAIN: attach `EXPLAIN` of slow SELECT statements, \
+            defaults to false.
+
+        Optional retry settings, see `TRANSIENT_ERRORS`:
+        1. RETRY_ATTEMPTS: retries of a read or upsert after a transient \
+            error, defaults to 3. 0 disables retrying.
+        2. RETRY_BACKOFF: seconds before the first retry, doubled for every \
+            next one, defaults to 1.
+        3. RETRY_MAX_BACKOFF: maximum seconds between retries, defaults to 30.
+
+        Optional bulk load setting:
+        1. LOCAL_INFILE: allow `LOAD DATA LOCAL INFILE` used by `bulk_load`, \
+            defaults to false. The server must enable `local_infile` too.
+
         :param path: path to the json setting file.
         """
     
         type_check(path, "path", str)
         with open(path) as json_file:
             self.__config = json.load(json_file)
+        self.__pool = ConnectionPool(
+            self.__config, 
+            size=self.__config.get("POOL_SIZE", 5), 
+            idle_timeout=self.__config.get("POOL_IDLE_TIMEOUT", 300), 
+            ping_interval=self.__config.get("POOL_PING_INTERVAL", 10)
+        )
+        self.__local = threading.local() # Active session of each thread.
+        self.__columns = {} # Column types of each table.
+        self.__generated = {} # Generated columns of each table.
+        cache_size = self.__config.get("CACHE_SIZE", 0)
+        self.__cache = QueryCache(cache_size) if cache_size > 0 else None
+        slow_seconds = self.__config.get("SLOW_QUERY_SECONDS")
+        if self.__config.get("QUERY_STATS", False) or slow_seconds is not None:
+            self.__stats = QueryStats(slow_seconds)
+        else:
+            self.__stats = None
+        self.__explain_slow = self.__config.get("SLOW_QUERY_EXPLAIN", False)
+        self.__retry_attempts = self.__config.get("RETRY_ATTEMPTS", 3)
+        self.__retry_backoff = self.__config.get("RETRY_BACKOFF", 1)
+        self.__retry_max_backoff = self.__config.get("RETRY_MAX_BACKOFF", 30)
+
+    def close(self) -> None:
+        """ Close idle connections held by the model."""
+
+        self.__pool.close()
+
+    def get_pool(self) -> ConnectionPool:
+        """ Return the connection pool of the model."""
+        return self.__pool
+
+    def get_cache(self) -> QueryCache | None:
+        """ Return the pig lookup cache, or None if disabled."""
+        return self.__cache
+
+    def get_query_stats(self) -> QueryStats | None:
+        """ Return statistics of executed statements, or None if disabled."""
+        return self.__stats
+
+    def __clear_cache(self) -> None:
+        if self.__cache is not None:
+            self.__cache.clear()
+
+    def __pig_cache_key(
+        self, 
+        equal: dict, 
+        larger: dict = {}, 
+        smaller: dict = {}, 
+        larger_equal: dict = {}, 
+        smaller_equal: dict = {}, 
+        order_by: str = None, 
+        columns: list = None, 
+        limit: int = None, 
+        after: tuple = None, 
+        within: dict = {}
+    ) -> tuple | None:
+        """ Return the cache key of a pig lookup, or None if it should not 
+        be cached. Only lookups by `id` or `reg_id` equality are cached, 
+        since writes can only invalidate by those.
+        """
+
+        if self.__cache is None or len(within) > 0:
+            return None
+        if "id" not in equal and "reg_id" not in equal:
+            return None
+        key = tuple(
+            tuple(sorted(condition.items())) 
+            for condition in (equal, larger, smaller, larger_equal, smaller_equal)
+        )
+        key += (
+            order_by, 
+            None if columns is None else tuple(columns), 
+            limit, 
+            tuple(after) if isinstance(after, list) else after
+        )
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    @staticmethod
+    def __pig_tags(equal: dict, pigs: list[Pig]) -> set:
+        """ Tags of a pig lookup: its id or reg_id, and ids of found pigs."""
+
+        tags = {("id", pig.get_id()) for pig in pigs}
+        for column in ("id", "reg_id"):
+            if column in equal:
+                tags.add((column, equal[column]))
+        return tags
+
+    def __invalidate_pigs(self, pigs: Iterable[Pig]) -> None:
+        """ Drop cached lookups and mapped objects which may see the written 
+        pigs.
+        """
+
+        pigs = list(pigs)
+        self.__forget("Pigs", [self.__pig_key(pig) for pig in pigs])
+        if self.__cache is None:
+            return
+        tags = []
+        for pig in pigs:
+            tags.append(("id", pig.get_id()))
+            if pig.get_reg_id() is not None:
+                tags.append(("reg_id", pig.get_reg_id()))
+        self.__cache.invalidate(tags)
+
+    @staticmethod
+    def __pig_key(pig: Pig) -> tuple:
+        return (pig.get_id(), pig.get_birthday(), pig.get_farm())
+
+    @staticmethod
+    def __estrus_key(estrus: Estrus) -> tuple:
+        return Model.__pig_key(estrus.get_sow()) + (estrus.get_estrus_datetime(),)
+
+    def __get_identity_map(self) -> IdentityMap | None:
+        session = self.get_session()
+        return None if session is None else session.get_identity_map()
+
+    @contextmanager
+    def __partial_rows(self, partial: bool = True):
+        """ Objects hydrated in the block are not registered in the identity 
+        map, since rows of a column projection are incomplete.
+        """
+
+        previous = getattr(self.__local, "partial", False)
+        self.__local.partial = previous or partial
+        try:
+            yield
+        finally:
+            self.__local.partial = previous
+
+    def __mapped(self, table_name: str, key: tuple):
+        """ Return the object of a primary key in the identity map of the 
+        active session, or None.
+        """
+
+        identity_map = self.__get_identity_map()
+        if identity_map is None or None in key:
+            return None
+        return identity_map.get(table_name, key)
+
+    def __identify(self, table_name: str, key: tuple, obj):
+        """ Return the object of the key in the identity map, registering 
+        `obj` if there is none. Without a session `obj` is returned.
+        """
+
+        identity_map = self.__get_identity_map()
+        if identity_map is None:
+            return obj
+        if getattr(self.__local, "partial", False):
+            mapped = identity_map.get(table_name, key)
+            return obj if mapped is None else mapped
+        return identity_map.add(table_name, key, obj)
+
+    def __forget(self, table_name: str, keys: Iterable[tuple]) -> None:
+        """ Drop written objects from the identity map so that they are 
+        loaded again.
+        """
+
+        identity_map = self.__get_identity_map()
+        if identity_map is None:
+            return
+        for key in keys:
+            identity_map.discard(table_name, key)
+
+    def __invalidate_estrus(self, estrus: Iterable[Estrus]) -> None:
+        """ Drop mapped objects of the written estrus."""
+        self.__forget("Estrus", [self.__estrus_key(record) for record in estrus])
+
+    def get_session(self) -> Session | None:
+        """ Return the active session of the current thread, or None."""
+
+        return getattr(self.__local, "session", None)
+
+    def __close_session(self, session: Session) -> None:
+
+        self.__local.session = None
+        self.__pool.release(session.get_connection())
+
+    def begin(self) -> Session:
+        """ Start a session on the current thread.
+
+        Until `commit` or `rollback` is called on the returned session, every 
+        query of this model in the thread runs in its transaction.
+
+        :raises RuntimeError: if a session is already active.
+        """
+
+        if self.get_session() is not None:
+            msg = "A session is already active in this thread."
+            logging.error(msg)
+            raise RuntimeError(msg)
+
+        connection = self.__pool.acquire()
+        try:
+            connection.begin()
+        except Exception as error:
+            self.__pool.release(connection)
+            raise error
+        session = Session(connection, self.__close_session, self.__clear_cache)
+        self.__local.session = session
+        return session
+
+    @contextmanager
+    def transaction(self):
+        """ Context manager runs a block as one transaction.
+
+        The transaction is committed when the block exits and rolled back if 
+        it raises. Nested transactions become savepoints of the outer one.
+
+        Usage:
+        ```
+        with model.transaction() as session:
+            model.insert_pig(pig)
+        ```
+        """
+
+        session = self.get_session()
+        if session is not None:
+            with session.savepoint():
+                yield session
+            return
+
+        session = self.begin()
+        try:
+            yield session
+        except BaseException:
+            if not session.is_closed():
+                try:
+                    session.rollback()
+                except pymysql.err.Error as error:
+                    # The connection is lost, so is the transaction.
+                    logging.error(error.args[0])
+            raise
+        if not session.is_closed():
+            session.commit()
+
+    @contextmanager
+    def __connection(self):
+        """ Yield the connection of the active session, or a pooled 
+        connection which is committed when the block exits.
+        """
+
+        session = self.get_session()
+        if session is not None:
+            yield session.get_connection()
+            return
+        with self.__pool.connection() as connection:
+            yield connection
+            connection.commit()
+
+    @classmethod
+    def is_transient(cls, error: Exception) -> bool:
+        """ Whether an error may not happen again if the statement is retried.
+
+        :param error: an error raised by pymysql.
+        """
+
+        # Raised when using a connection which has already been closed.
+        if isinstance(error, pymysql.err.InterfaceError):
+            return True
+        return isinstance(error, pymysql.err.OperationalError) \
+            and len(error.args) > 0 and error.args[0] in cls.TRANSIENT_ERRORS
+
+    @staticmethod
+    def __is_idempotent(sql_query: str) -> bool:
+        """ Whether running a statement twice has the same effect as once."""
+
+        if "ON DUPLICATE KEY UPDATE" in sql_query:
+            return True
+        return sql_query.lstrip().upper().startswith(("SELECT", "SHOW", "UPDATE", "DELETE"))
+
+    def __retry(self, run, idempotent: bool, in_session: bool = True):
+        """ Call `run` and call it again after a transient error, waiting \
+        longer before every retry.
+
+        Outside a session, a lost connection is discarded by the pool and \
+        the retry checks out a new one. Work of a session is lost with its \
+        connection or a deadlock, so in a session only `STATEMENT_ERRORS` \
+        are retried.
+
+        :param run: function without arguments doing the work.
+        :param idempotent: whether `run` may be repeated safely.
+        :param in_session: whether `run` uses the connection of the active \
+            session, if any.
+        """
+
+        attempt = 0
+        while True:
+            try:
+                return run()
+            except pymysql.err.Error as error:
+                if attempt >= self.__retry_attempts or not idempotent \
+                        or not self.is_transient(error):
+                    raise error
+                if in_session and self.get_session() is not None \
+                        and error.args[0] not in self.STATEMENT_ERRORS:
+                    raise error
+                delay = min(
+                    self.__retry_backoff * 2 ** attempt, self.__retry_max_backoff
+                )
+                attempt += 1
+                logging.warning(
+                    f"{error.args}. Retry {attempt}/{self.__retry_attempts} "
+                    f"in {delay} seconds."
+                )
+                time.sleep(delay)
+
+    @staticmethod
+    def __caller() -> str:
+        """ Name of the nearest public method of this module on the stack.
+
+        Streamed rows are fetched after `iter_*` has returned, so the \
+        nearest private method is used if no public one is found.
+        """
+
+        fallback = "unknown"
+        frame = sys._getframe(2)
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == __file__ and not code.co_name.startswith("<"):
+                if not code.co_name.startswith("_"):
+                    return code.co_name
+                if fallback == "unknown" and code.co_name != "__stream_chunks":
+                    fallback = code.co_name
+            frame = frame.f_back
+        return fallback
+
+    def __execute(self, cursor, sql_query: str, args=None, many: bool = False):
+        """ Execute a statement and record its latency and affected rows.
+
+        :param cursor: cursor to execute on.
+        :param many: use `executemany` with a list of args.
+        :return: what the cursor returns.
+        """
+
+        if self.__stats is None:
+            if many:
+                return cursor.executemany(sql_query, args)
+            return cursor.execute(sql_query, args)
+
+        start = time.perf_counter()
+        if many:
+            affected = cursor.executemany(sql_query, args)
+        else:
+            affected = cursor.execute(sql_query, args)
+        self.__record(
+            cursor.connection, sql_query, None if many else args, 
+            time.perf_counter() - start, 
+            affected if affected is not None else 0
+        )
+        return affected
 
-    def __query(self, sql_query: str) -> tuple:
+    def __record(
+        self, 
+        connection: pymysql.Connection, 
+        sql_query: str, 
+        args, 
+        seconds: float, 
+        rows: int
+    ) -> None:
+        """ Add a statement to the statistics and to the slow query log if \
+        it is slow. SELECT statements of the slow query log are explained on \
+        `connection` if SLOW_QUERY_EXPLAIN is set.
+        """
+
+        method = self.__caller()
+        statement = QueryStats.shape(sql_query)
+        self.__stats.record(method, statement, seconds, rows)
+        if not self.__stats.is_slow(seconds):
+            return
+
+        entry = {
+            "method": method, 
+            "statement": statement, 
+            "seconds": seconds, 
+            "rows": rows, 
+            "at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if self.__explain_slow and statement.upper().startswith("SELECT"):
+            try:
+                with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                    cursor.execute("EXPLAIN " + sql_query, args)
+                    entry["explain"] = list(cursor.fetchall())
+            except pymysql.err.Error as error:
+                entry["explain"] = str(error)
+        logging.warning(f"Slow query in {method} took {seconds:.3f}s: {statement}")
+        self.__stats.add_slow_query(entry)
+
+    def __query(self, sql_query: str, args: tuple = None) -> tuple:
         """ Do query.
 
-        :param sql_query: the query string.
+        :param sql_query: the query string, values should be `%s` placeholders.
+        :param args: values bound to the placeholders.
         """
 
         type_check(sql_query, "sql_query", str)
 
-        with pymysql.connect(
-            host=self.__config["DATABASE_HOST"],
-            user=self.__config["USER"],
-            password=self.__config["PASSWORD"],
-            database=self.__config["DATABASE"],
-            charset=self.__config["CHARSET"],
-            cursorclass=pymysql.cursors.DictCursor
-        ) as connection:
-            cursor = connection.cursor()
+        def run():
+            with self.__connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    start = time.perf_counter()
+                    cursor.execute(sql_query, args)
+                    result = cursor.fetchall()
+                    cursor.close()
+                    if self.__stats is not None:
+                        self.__record(
+                            connection, sql_query, args, 
+                            time.perf_counter() - start, len(result)
+                        )
+                    return result
+                except Exception as error:
+                    cursor.close()
+                    logging.error(error.args[0])                
+                    raise error
+
+        return self.__retry(run, self.__is_idempotent(sql_query))
+
+    def __stream_chunks(
+        self, 
+        sql_query: str, 
+        args: tuple, 
+        chunk_size: int, 
+        cursor_class=pymysql.cursors.SSDictCursor
+    ):
+        """ Yield rows of a query in lists of at most `chunk_size` rows, 
+        fetched through a server-side cursor.
+
+        A separate connection is used so that the active session can keep 
+        querying while rows are streamed. Hence rows written but not yet 
+        committed by the session are not visible.
+
+        :param sql_query: the query string, values should be `%s` placeholders.
+        :param args: values bound to the placeholders.
+        :param chunk_size: rows fetched per round trip.
+        :param cursor_class: an unbuffered cursor class, rows are dicts of \
+            SSDictCursor or tuples of SSCursor.
+        """
+
+        type_check(chunk_size, "chunk_size", int)
+        if chunk_size < 1:
+            msg = f"chunk_size should be larger than 0. Got {chunk_size}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        def execute():
+            connection = self.__pool.acquire()
             try:
-                cursor.execute(sql_query)
-                result = cursor.fetchall()
-                cursor.close()
-                connection.commit()
-                return result
+                cursor = connection.cursor(cursor_class)
+                cursor.execute(sql_query, args)
             except Exception as error:
-                cursor.close()
-                logging.error(error.args[0])                
+                if connection.open:
+                    connection.close()
+                self.__pool.release(connection)
+                logging.error(error.args[0])
                 raise error
+            return connection, cursor
+
+        start = time.perf_counter()
+        # Rows are not retried once yielded, only the statement.
+        connection, cursor = self.__retry(execute, True, in_session=False)
+        try:
+            count = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if len(rows) == 0:
+                    break
+                count += len(rows)
+                yield rows
+            cursor.close()
+            # Includes the time spent by the consumer between chunks.
+            if self.__stats is not None:
+                self.__record(
+                    connection, sql_query, args, 
+                    time.perf_counter() - start, count
+                )
+            connection.commit()
+        except GeneratorExit:
+            # Stopped early. Closing is cheaper than draining the result.
+            connection.close()
+        except Exception as error:
+            connection.close()
+            logging.error(error.args[0])
+            raise error
+        finally:
+            self.__pool.release(connection)
+
+    def __stream(self, sql_query: str, args: tuple, chunk_size: int):
+        """ Yield row dicts of a query one by one, fetching `chunk_size` rows 
+        at a time. See `__stream_chunks`.
+        """
+
+        chunks = self.__stream_chunks(sql_query, args, chunk_size)
+        try:
+            for rows in chunks:
+                yield from rows
+        finally:
+            chunks.close()
+
+    def __iter(
+        self, 
+        table_name: str, 
+        hydrate, 
+        equal: dict, 
+        larger: dict, 
+        smaller: dict, 
+        larger_equal: dict, 
+        smaller_equal: dict, 
+        order_by: str, 
+        chunk_size: int, 
+        raw: bool
+    ):
+        """ Stream a table as domain objects, or as row dicts if raw. Empty 
+        conditions stream the whole table.
+        """
+
+        type_check(raw, "raw", bool)
+        sql_query, args = self.__generate_qeury_string(
+            table_name=table_name, 
+            equal=equal, 
+            larger=larger, 
+            smaller=smaller, 
+            larger_equal=larger_equal, 
+            smaller_equal=smaller_equal, 
+            order_by=order_by, 
+            allow_empty=True
+        )
+        for row in self.__stream(sql_query, args, chunk_size):
+            yield row if raw else hydrate(row)
+
+    def __find_by_keys(
+        self, 
+        table_name: str, 
+        keys: list[tuple], 
+        chunk_size: int
+    ) -> list[dict]:
+        """ Find rows of many primary keys with a row-constructor IN, 
+        `chunk_size` keys per query. Duplicated keys are queried once.
+        """
+
+        type_check(chunk_size, "chunk_size", int)
+        if chunk_size < 1:
+            msg = f"chunk_size should be larger than 0. Got {chunk_size}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        keys = list(dict.fromkeys(keys))
+        columns = Model.PRIMARY_KEYS[table_name]
+        rows = []
+        for start in range(0, len(keys), chunk_size):
+            sql_query, args = self.__generate_qeury_string(
+                table_name=table_name, 
+                within={columns: keys[start:start + chunk_size]}
+            )
+            rows.extend(self.__query(sql_query, args))
+        return rows
+
+    def __get_columns(self, table_name: str) -> tuple:
+        """ Column names of a table, read once from the database."""
+        return tuple(self.__get_column_types(table_name).keys())
+
+    def __get_column_types(self, table_name: str) -> dict:
+        """ Sql types of columns of a table in order, read once from the 
+        database.
+        """
+
+        if table_name not in self.__columns:
+            rows = self.__query(f"SHOW COLUMNS FROM {table_name};")
+            self.__columns[table_name] = {row["Field"]: row["Type"] for row in rows}
+            self.__generated[table_name] = tuple(
+                row["Field"] for row in rows 
+                if "GENERATED" in (row.get("Extra") or "").upper()
+            )
+        return self.__columns[table_name]
+
+    def __get_generated_columns(self, table_name: str) -> tuple:
+        """ Generated columns of a table, which can not be written."""
+
+        self.__get_column_types(table_name)
+        return self.__generated[table_name]
+
+    @staticmethod
+    def __lineage_from(table_name: str, used: set = None) -> tuple[str, list, str]:
+        """ Join a table with its parents in `LINEAGE_JOINS`.
+
+        :param used: aliases whose columns are used, None for all. Parents \
+            are joined on their primary keys, so leaving out the unused ones \
+            does not change the rows.
+        :return: alias of the table, (alias, table) of every joined table \
+            and the FROM clause.
+        """
+
+        alias, joins = Model.LINEAGE_JOINS[table_name]
+        if used is not None:
+            # Keep the joins leading to a used alias.
+            needed = set(used)
+            for join in reversed(joins):
+                if join[0] in needed:
+                    needed.add(join[2])
+            joins = tuple(join for join in joins if join[0] in needed)
+        aliases = [(alias, table_name)] + [(join[0], join[1]) for join in joins]
+        from_clause = f"{table_name} AS {alias}"
+        for join_alias, join_table, parent, references, nullable in joins:
+            on = " AND ".join(
+                f"{join_alias}.{key}={parent}.{reference}" 
+                for key, reference in zip(Model.PRIMARY_KEYS[join_table], references)
+            )
+            join = "LEFT JOIN" if nullable else "JOIN"
+            from_clause += f" {join} {join_table} AS {join_alias} ON {on}"
+        return alias, aliases, from_clause
+
+    def __query_lineage(
+        self, 
+        table_name: str, 
+        equal: dict, 
+        larger: dict, 
+        smaller: dict, 
+        larger_equal: dict, 
+        smaller_equal: dict, 
+        order_by: str, 
+        columns: list, 
+        limit: int, 
+        after: tuple, 
+        within: dict
+    ) -> list[dict]:
+        """ Query a table joined with its parents in `LINEAGE_JOINS`.
+
+        Conditions and `order_by` refer to columns of `table_name`. Each 
+        result maps an alias to the columns of its row, or to None if a \
+        nullable reference is empty.
+
+        :raises ValueError: if `columns` is given, since lineage needs whole rows.
+        """
+
+        if columns is not None:
+            msg = "columns can not be used with eager loading."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        alias, aliases, from_clause = Model.__lineage_from(table_name)
+        projection = [
+            f"{name}.{column} AS {name}__{column}" 
+            for name, table in aliases for column in self.__get_columns(table)
+        ]
+
+        def qualify(column):
+            if isinstance(column, tuple):
+                return tuple(qualify(item) for item in column)
+            return column if "." in str(column) else f"{alias}.{column}"
+
+        if order_by is not None:
+            type_check(order_by, "order_by", str)
+            order_by = ", ".join(qualify(term.strip()) for term in order_by.split(","))
+        sql_query, args = self.__generate_qeury_string(
+            table_name=from_clause, 
+            equal={qualify(key): value for key, value in equal.items()}, 
+            larger={qualify(key): value for key, value in larger.items()}, 
+            smaller={qualify(key): value for key, value in smaller.items()}, 
+            larger_equal={qualify(key): value for key, value in larger_equal.items()}, 
+            smaller_equal={qualify(key): value for key, value in smaller_equal.items()}, 
+            order_by=order_by, 
+            columns=projection, 
+            limit=limit, 
+            after=after, 
+            within={qualify(key): value for key, value in within.items()}
+        )
+
+        results = []
+        for row in self.__query(sql_query, args):
+            parts = {}
+            for name, table in aliases:
+                part = {column: row[f"{name}__{column}"] for column in self.__get_columns(table)}
+                parts[name] = None if all(value is None for value in part.values()) else part
+            results.append(parts)
+        return results
+
+    def __link_farrowing(self, parts: dict, prefix: str = "") -> Farrowing:
+        """ Build a farrowing with its whole estrus and sow."""
+
+        sow = self.dict_to_pig(parts[f"{prefix}sow"])
+        estrus = self.dict_to_estrus(parts[f"{prefix}estrus"])
+        estrus.set_sow(sow)
+        farrowing = self.dict_to_farrowing(parts[f"{prefix}farrowing"])
+        farrowing.set_estrus(estrus)
+        return farrowing
+
+    def __link_weaning(self, parts: dict, prefix: str = "") -> Weaning:
+        """ Build a weaning with its whole farrowing, estrus and sow."""
+
+        farrowing = self.__link_farrowing(parts, prefix)
+        weaning = self.dict_to_weaning(parts[f"{prefix}weaning"])
+        weaning.set_farrowing(farrowing)
+        return weaning
+
+    def __link_individual(self, parts: dict) -> Individual:
+        """ Build an individual with its whole birth and nurse litters."""
+
+        individual = self.dict_to_individual(parts["individual"])
+        individual.set_birth_litter(self.__link_farrowing(parts, "birth_"))
+        if parts["nurse_weaning"] is not None:
+            individual.set_nurse_litter(self.__link_weaning(parts, "nurse_"))
+        return individual
+
+    @staticmethod
+    def __frame_dtype(column: str, sql_type: str) -> str:
+        """ Pandas dtype of a column, by its sql type and name."""
+
+        sql_type = sql_type.lower()
+        unsigned = "unsigned" in sql_type
+        if sql_type.startswith(("date", "timestamp")):
+            return "datetime64"
+        if sql_type.startswith("tinyint"):
+            return "UInt8" if unsigned else "Int8"
+        if sql_type.startswith("smallint"):
+            return "UInt16" if unsigned else "Int16"
+        if sql_type.startswith(("int", "mediumint", "bigint")):
+            return "UInt64" if unsigned else "Int64"
+        if sql_type.startswith(("float", "double", "decimal")):
+            return "float64"
+        if sql_type.startswith("enum"):
+            return "category"
+        if column.split("_")[-1] in Model.CATEGORY_COLUMNS:
+            return "category"
+        return "string"
+
+    def query_frame(
+        self, 
+        table_name: str, 
+        conditions: dict = {}, 
+        columns: list = None, 
+        order_by: str = None, 
+        limit: int = None, 
+        chunk_size: int = 10000
+    ) -> pd.DataFrame:
+        """ Query a table straight into a typed DataFrame without building 
+        domain objects. Rows are fetched `chunk_size` at a time.
+
+        Dates and datetimes become datetime64, small integers nullable \
+        unsigned integers, enums and farm/breed/gender categories, and other \
+        text strings.
+
+        Usage:
+        ```
+        model.query_frame(
+            "Farrowings", 
+            {"equal": {"farm": "test farm"}, "larger_equal": {"farrowing_date": "2020-01-01"}}, 
+            columns=["farrowing_date", "n_of_male", "n_of_female"]
+        )
+        ```
+
+        :param table_name: table's name in the database.
+        :param conditions: keyword arguments of the conditions of `find_*`, \
+            i.e. equal, larger, smaller, larger_equal, smaller_equal and \
+            within. Empty conditions select the whole table.
+        :param columns: columns to select. Primary keys are always selected.
+        :param order_by: `column_name` `ASC|DESC`
+        :param limit: maximum number of rows.
+        :param chunk_size: rows fetched per round trip.
+        :raises TypeError: if passing in any parameter with incorrect type.
+        :raises ValueError: if conditions contain an unknown kind.
+        """
+
+        type_check(table_name, "table_name", str)
+        type_check(conditions, "conditions", dict)
+        kinds = ("equal", "larger", "smaller", "larger_equal", "smaller_equal", "within")
+        for kind in conditions:
+            if kind not in kinds:
+                msg = f"Condition should be one of {kinds}. Got {kind}."
+                logging.error(msg)
+                raise ValueError(msg)
+
+        types = self.__get_column_types(table_name)
+        selected = tuple(types.keys()) if columns is None else self.__projection(table_name, columns)
+        sql_query, args = self.__generate_qeury_string(
+            table_name=table_name, 
+            order_by=order_by, 
+            allow_empty=True, 
+            columns=selected, 
+            limit=limit, 
+            **conditions
+        )
+
+        dtypes = {column: self.__frame_dtype(column, types[column]) for column in selected}
+        # Categories are set once at the end, since categories of chunks differ.
+        chunk_dtypes = {
+            column: dtype for column, dtype in dtypes.items() if dtype != "category"
+        }
+        frames = []
+        for rows in self.__stream_chunks(
+            sql_query, args, chunk_size, pymysql.cursors.SSCursor
+        ):
+            frame = pd.DataFrame.from_records(rows, columns=list(selected))
+            frames.append(self.__convert_frame(frame, chunk_dtypes))
+        if len(frames) == 0:
+            frame = pd.DataFrame(columns=list(selected))
+        else:
+            frame = pd.concat(frames, ignore_index=True)
+        return self.__convert_frame(frame, dtypes)
+
+    @staticmethod
+    def __convert_frame(frame: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+        """ Convert columns of a frame to dtypes."""
+
+        for column, dtype in dtypes.items():
+            if dtype == "datetime64":
+                frame[column] = pd.to_datetime(frame[column])
+            else:
+                frame[column] = frame[column].astype(dtype)
+        return frame
+
+    def aggregate(
+        self, 
+        table_name: str, 
+        group_by: list = [], 
+        metrics: dict = {}, 
+        where: dict = {}, 
+        order_by: str = None, 
+        lineage: bool = False
+    ) -> pd.DataFrame:
+        """ Summarize a table inside the database with GROUP BY.
+
+        Metrics are {name: "FUNCTION(expression)"}, where the function is \
+        one of `AGGREGATES` and the expression is `*` (COUNT only) or \
+        columns joined by `+` and `-`, optionally after DISTINCT. Groups are \
+        columns or YEAR/MONTH of a column.
+
+        With `lineage`, the table is joined with its parents in \
+        `LINEAGE_JOINS`, and columns of a parent are named by its alias, \
+        e.g. Weanings with `farrowing.n_of_male`. Other columns refer to \
+        the table itself.
+
+        Usage, born alive and weaned piglets per sow:
+        ```
+        model.aggregate(
+            "Weanings", 
+            group_by=["id", "birthday"], 
+            metrics={
+                "born_alive": "SUM(farrowing.n_of_male + farrowing.n_of_female)", 
+                "weaned": "SUM(total_weaning_piglets)", 
+                "litters": "COUNT(*)"
+            }, 
+            where={"equal": {"farm": "Chen-Gang"}}, 
+            lineage=True
+        )
+        ```
+
+        :param table_name: table's name in the database.
+        :param group_by: groups of the summary, empty for one row.
+        :param metrics: names and definitions of the summarized values.
+        :param where: keyword arguments of the conditions of `find_*`, \
+            like `query_frame`.
+        :param order_by: `name` `ASC|DESC` of groups or metrics, separated \
+            by commas.
+        :param lineage: join the table with its parents.
+        :raises TypeError: if passing in any parameter with incorrect type.
+        :raises ValueError: if a table, column, function or name is unknown.
+        :return: a dataframe with a column for each group and metric.
+        """
+
+        type_check(table_name, "table_name", str)
+        type_check(group_by, "group_by", list)
+        type_check(metrics, "metrics", dict)
+        type_check(where, "where", dict)
+        if table_name not in self.PRIMARY_KEYS \
+                or (lineage and table_name not in self.LINEAGE_JOINS):
+            msg = f"Unknown table {table_name}."
+            logging.error(msg)
+            raise ValueError(msg)
+        if len(group_by) == 0 and len(metrics) == 0:
+            msg = "group_by and metrics can not both be empty."
+            logging.error(msg)
+            raise ValueError(msg)
+        kinds = ("equal", "larger", "smaller", "larger_equal", "smaller_equal", "within")
+        for kind in where:
+            if kind not in kinds:
+                msg = f"Condition should be one of {kinds}. Got {kind}."
+                logging.error(msg)
+                raise ValueError(msg)
+
+        if lineage:
+            alias, aliases, _ = self.__lineage_from(table_name)
+        else:
+            alias = table_name.lower()
+            aliases = [(alias, table_name)]
+        tables = dict(aliases)
+        used = set()
+
+        def column(name):
+            """ Qualify a column with its alias if it exists."""
+            if isinstance(name, tuple):
+                return tuple(column(item) for item in name)
+            name = str(name)
+            owner, _, field = name.rpartition(".")
+            owner = owner or alias
+            if owner not in tables or field not in self.__get_columns(tables[owner]):
+                msg = f"Unknown column {name} of {table_name}."
+                logging.error(msg)
+                raise ValueError(msg)
+            used.add(owner)
+            return f"{owner}.{field}"
+
+        identifier = r"[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)?"
+        selected = []
+        groups = []
+        for name in group_by:
+            type_check(name, "group_by", str)
+            found = re.fullmatch(rf"\s*(?:(\w+)\(\s*({identifier})\s*\)|({identifier}))\s*", name)
+            if found is None or (found[1] is not None and found[1].upper() not in self.GROUPINGS):
+                msg = f"group_by should be a column or one of {self.GROUPINGS}. Got {name}."
+                logging.error(msg)
+                raise ValueError(msg)
+            if found[3] is not None:
+                expression = column(found[3])
+            else:
+                expression = f"{found[1].upper()}({column(found[2])})"
+            groups.append(expression)
+            selected.append(f"{expression} AS `{name}`")
+
+        for name, definition in metrics.items():
+            type_check(definition, "metrics", str)
+            found = re.fullmatch(
+                rf"\s*(\w+)\(\s*(DISTINCT\s+)?(\*|{identifier}(?:\s*[+-]\s*{identifier})*)\s*\)\s*", 
+                definition, 
+                re.IGNORECASE
+            )
+            function = None if found is None else found[1].upper()
+            if not str(name).isidentifier() or function not in self.AGGREGATES \
+                    or (found[3] == "*" and (function != "COUNT" or found[2])):
+                msg = f"Metric should be a name and one of {self.AGGREGATES}. Got {name}: {definition}."
+                logging.error(msg)
+                raise ValueError(msg)
+            expression = re.sub(identifier, lambda term: column(term[0]), found[3])
+            expression = re.sub(r"\s*([+-])\s*", r" \1 ", expression)
+            distinct = "DISTINCT " if found[2] else ""
+            selected.append(f"{function}({distinct}{expression}) AS `{name}`")
+
+        names = list(group_by) + [str(name) for name in metrics]
+        orders = []
+        if order_by is not None:
+            type_check(order_by, "order_by", str)
+            for term in order_by.split(","):
+                words = term.split()
+                direction = words[1].upper() if len(words) > 1 else "ASC"
+                if len(words) == 0 or words[0] not in names \
+                        or direction not in ("ASC", "DESC") or len(words) > 2:
+                    msg = f"order_by should be groups or metrics. Got {order_by}."
+                    logging.error(msg)
+                    raise ValueError(msg)
+                orders.append(f"`{words[0]}` {direction}")
+
+        conditions = {
+            kind: {column(key): value for key, value in condition.items()} 
+            for kind, condition in where.items()
+        }
+        if lineage:
+            _, _, from_clause = self.__lineage_from(table_name, used)
+        else:
+            from_clause = f"{table_name} AS {alias}"
+        sql_query, args = self.__generate_qeury_string(
+            table_name=from_clause, 
+            allow_empty=True, 
+            columns=selected, 
+            **conditions
+        )
+        sql_query = sql_query[:-1]
+        if len(groups) > 0:
+            sql_query += f" GROUP BY {', '.join(groups)}"
+        if len(orders) > 0:
+            sql_query += f" ORDER BY {', '.join(orders)}"
+        rows = self.__query(sql_query + ";", args)
+
+        frame = pd.DataFrame.from_records(list(rows), columns=names)
+        for name in metrics:
+            # SUM and AVG are returned as decimals.
+            frame[name] = pd.to_numeric(frame[name])
+        return frame
+
+    @staticmethod
+    def __load_value(value, sql_type: str):
+        """ Convert a value of a frame to what `LOAD DATA` writes to a column."""
+
+        if isinstance(value, Enum):
+            value = value.value
+        if isinstance(value, datetime):
+            if sql_type.startswith("datetime") or sql_type.startswith("timestamp"):
+                return value.strftime("%Y-%m-%d %H:%M:%S")
+            return value.strftime("%Y-%m-%d")
+        if isinstance(value, date):
+            return value.isoformat()
+        if isinstance(value, float) and value.is_integer() and "int" in sql_type:
+            return int(value)
+        return value
+
+    @staticmethod
+    def __tsv_value(value, sql_type: str) -> str:
+        """ Write a value as a field of `LOAD DATA` with the default escapes."""
+
+        if value is None or pd.isna(value):
+            return "\\N"
+        value = Model.__load_value(value, sql_type)
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t") \
+            .replace("\n", "\\n").replace("\r", "\\r")
+
+    def __frame_keys(self, table_name: str, frame: pd.DataFrame) -> list[tuple]:
+        """ Distinct primary keys of the rows of a frame, as loaded."""
+
+        types = self.__get_column_types(table_name)
+        keys = self.PRIMARY_KEYS[table_name]
+        return list(dict.fromkeys(
+            tuple(
+                str(self.__load_value(value, types[key])) 
+                for key, value in zip(keys, row)
+            )
+            for row in frame[list(keys)].itertuples(index=False, name=None)
+        ))
+
+    def __count_present(self, cursor, table_name: str, keys: list[tuple]) -> int:
+        """ Count rows of a table with the primary keys, `BULK_CHECK_SIZE` \
+        keys per query.
+        """
+
+        columns = self.PRIMARY_KEYS[table_name]
+        present = 0
+        for start in range(0, len(keys), self.BULK_CHECK_SIZE):
+            chunk = keys[start:start + self.BULK_CHECK_SIZE]
+            sql_query = "SELECT COUNT(*) AS present FROM {table} WHERE ({columns}) IN ({rows});"
+            sql_query = sql_query.format(
+                table=table_name, 
+                columns=", ".join(columns), 
+                rows=", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(chunk))
+            )
+            cursor.execute(sql_query, tuple(value for key in chunk for value in key))
+            present += cursor.fetchone()["present"]
+        return present
+
+    def __count_orphans(self, cursor, table_name: str, keys: list[tuple]) -> int:
+        """ Count rows of a table with the primary keys referencing rows \
+        which do not exist, `BULK_CHECK_SIZE` keys per query. References \
+        with an empty column are not checked, like in MySQL.
+        """
+
+        columns = self.PRIMARY_KEYS[table_name]
+        orphans = 0
+        for references, parent in self.FOREIGN_KEYS.get(table_name, ()):
+            parent_keys = self.PRIMARY_KEYS[parent]
+            for start in range(0, len(keys), self.BULK_CHECK_SIZE):
+                chunk = keys[start:start + self.BULK_CHECK_SIZE]
+                sql_query = "SELECT COUNT(*) AS orphans FROM {table} AS child " \
+                    "LEFT JOIN {parent} AS parent ON {on} " \
+                    "WHERE ({columns}) IN ({rows}) AND {filled} AND parent.{key} IS NULL;"
+                sql_query = sql_query.format(
+                    table=table_name, 
+                    parent=parent, 
+                    on=" AND ".join(
+                        f"child.{column}=parent.{key}" 
+                        for column, key in zip(references, parent_keys)
+                    ), 
+                    columns=", ".join(f"child.{column}" for column in columns), 
+                    rows=", ".join(
+                        ["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(chunk)
+                    ), 
+                    filled=" AND ".join(f"child.{column} IS NOT NULL" for column in references), 
+                    key=parent_keys[0]
+                )
+                cursor.execute(sql_query, tuple(value for key in chunk for value in key))
+                orphans += cursor.fetchone()["orphans"]
+        return orphans
+
+    def bulk_load(
+        self, 
+        table_name: str, 
+        frame: pd.DataFrame, 
+        check_foreign_keys: bool = True
+    ) -> int:
+        """ Insert rows of a dataframe through `LOAD DATA LOCAL INFILE`, \
+        which is much faster than INSERTs for backfilling a farm's history.
+
+        Columns of the frame are columns of the table, except generated \
+        ones such as `birth_year` of Pigs. Rows whose primary key already \
+        exists are skipped. Needs LOCAL_INFILE in the settings.
+
+        The load is rolled back and IntegrityError is raised if any row \
+        references a missing row. With `check_foreign_keys`, references are \
+        checked row by row during the load, and rows skipped by them are \
+        found afterward. Without it, references of the loaded rows are \
+        verified by queries afterward instead, which is faster for large \
+        frames.
+
+        Within a session, the load is a savepoint of it.
+
+        :param table_name: name of the table.
+        :param frame: rows to insert, primary keys must not be empty.
+        :param check_foreign_keys: check references while loading.
+        :raises: TypeError, ValueError, RuntimeError, pymysql.err.IntegrityError.
+        :return: number of inserted rows.
+        """
+
+        type_check(table_name, "table_name", str)
+        type_check(frame, "frame", pd.DataFrame)
+        if not self.__config.get("LOCAL_INFILE", False):
+            msg = "LOCAL_INFILE should be enabled in the settings to bulk load."
+            logging.error(msg)
+            raise RuntimeError(msg)
+        if table_name not in self.PRIMARY_KEYS:
+            msg = f"Unknown table {table_name}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        types = self.__get_column_types(table_name)
+        columns = [str(column) for column in frame.columns]
+        unknown = [column for column in columns if column not in types]
+        if len(unknown) > 0:
+            msg = f"Columns {unknown} are not in {table_name}."
+            logging.error(msg)
+            raise ValueError(msg)
+        generated = [
+            column for column in columns 
+            if column in self.__get_generated_columns(table_name)
+        ]
+        if len(generated) > 0:
+            msg = f"Columns {generated} of {table_name} are generated."
+            logging.error(msg)
+            raise ValueError(msg)
+        for key in self.PRIMARY_KEYS[table_name]:
+            if key not in columns or frame[key].isna().any():
+                msg = f"Primary key {key} of {table_name} should not be empty."
+                logging.error(msg)
+                raise ValueError(msg)
+        if len(frame) == 0:
+            return 0
+
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".tsv", delete=False, encoding="utf-8", newline="\n"
+        ) as tsv:
+            for row in frame.itertuples(index=False, name=None):
+                tsv.write("\t".join(
+                    self.__tsv_value(value, types[column]) 
+                    for column, value in zip(columns, row)
+                ) + "\n")
+        sql_query = "LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE {table} " \
+            "CHARACTER SET {charset} FIELDS TERMINATED BY '\\t' " \
+            "LINES TERMINATED BY '\\n' ({columns});"
+        sql_query = sql_query.format(
+            table=table_name, 
+            charset=self.__config["CHARSET"], 
+            columns=", ".join(columns)
+        )
+
+        session = self.get_session()
+        try:
+            with self.__connection() as connection:
+                with session.savepoint() if session is not None else nullcontext():
+                    with connection.cursor() as cursor:
+                        if not check_foreign_keys:
+                            cursor.execute("SET foreign_key_checks = 0;")
+                        try:
+                            loaded = self.__execute(cursor, sql_query, (tsv.name,))
+                        finally:
+                            if not check_foreign_keys:
+                                cursor.execute("SET foreign_key_checks = 1;")
+                        # Only rows of the frame are checked.
+                        keys = self.__frame_keys(table_name, frame)
+                        if check_foreign_keys:
+                            # IGNORE turns errors of references into warnings
+                            # and skips the rows, while existing rows are kept.
+                            orphans = len(keys) - self.__count_present(
+                                cursor, table_name, keys
+                            )
+                        else:
+                            orphans = self.__count_orphans(cursor, table_name, keys)
+                        if orphans > 0:
+                            msg = f"{orphans} rows of {table_name} reference missing rows."
+                            logging.error(msg)
+                            raise pymysql.err.IntegrityError(1452, msg)
+        finally:
+            os.remove(tsv.name)
+        # Lookups of rows which did not exist are cached.
+        self.__clear_cache()
+        return loaded
+
+    def ensure_schema(self) -> int:
+        """ Create the tables and indexes, or migrate them to the latest \
+        version of `schema.MIGRATIONS`.
+
+        :return: the schema version of the database.
+        :raises RuntimeError: if a session is active, since DDL commits it.
+        """
+
+        if self.get_session() is not None:
+            msg = "Cannot change the schema in a session."
+            logging.error(msg)
+            raise RuntimeError(msg)
+
+        with self.__pool.connection() as connection:
+            applied = schema.migrate(connection)
+        if len(applied) > 0:
+            self.__columns.clear()
+            self.__generated.clear()
+            self.__clear_cache()
+        return schema.get_latest_version()
 
     def _delete_all(self, table: str):
         """Delete all data in the table. Should only be used in debugging.
@@ -63,20 +1904,141 @@ class Model():
 
         type_check(table, "table", str)
 
-        with pymysql.connect(
-            host=self.__config["DATABASE_HOST"],
-            user=self.__config["USER"],
-            password=self.__config["PASSWORD"],
-            database=self.__config["DATABASE"],
-            charset=self.__config["CHARSET"],
-            cursorclass=pymysql.cursors.DictCursor
-        ) as connection:
+        with self.__pool.connection() as connection:
             cursor = connection.cursor()
             cursor.execute("SET foreign_key_checks = 0;")
             cursor.execute("DELETE FROM {table};".format(table=table))
             cursor.execute("SET foreign_key_checks = 1;")
             cursor.close()
             connection.commit()
+        self.__clear_cache()
+
+    def _truncate_all(self, tables: Iterable[str] = None) -> None:
+        """ Empty tables with TRUNCATE, which does not depend on the number \
+        of rows like `_delete_all`. Should only be used in debugging and tests.
+
+        :param tables: names of the tables, defaults to every table.
+        :raises RuntimeError: if a session is active, since TRUNCATE commits it.
+        :raises ValueError: if a table is unknown.
+        """
+
+        if self.get_session() is not None:
+            msg = "Cannot truncate tables in a session."
+            logging.error(msg)
+            raise RuntimeError(msg)
+
+        tables = list(self.PRIMARY_KEYS.keys()) if tables is None else list(tables)
+        for table in tables:
+            if table not in self.PRIMARY_KEYS:
+                msg = f"Unknown table {table}."
+                logging.error(msg)
+                raise ValueError(msg)
+
+        # Children before parents. InnoDB refuses to truncate a referenced 
+        # table even if the referencing one is empty, so checks are disabled.
+        with self.__pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SET foreign_key_checks = 0;")
+                try:
+                    for table in reversed(self.PRIMARY_KEYS):
+                        if table in tables:
+                            cursor.execute(f"TRUNCATE TABLE {table};")
+                finally:
+                    cursor.execute("SET foreign_key_checks = 1;")
+        self.__clear_cache()
+
+    @contextmanager
+    def _rollback_after(self):
+        """ Context manager runs a block in a session which is always rolled \
+        back, so tests leave no data behind. Should only be used in tests.
+
+        `transaction` in the block works on savepoints of the session. Rows \
+        of the session are not visible to `iter_*` and `query_frame`, which \
+        stream on other connections.
+        """
+
+        session = self.begin()
+        try:
+            yield session
+        finally:
+            if not session.is_closed():
+                session.rollback()
+
+    @staticmethod
+    def __projection(table_name: str, columns: list) -> tuple:
+        """ Columns to select: primary keys first, then the other columns."""
+
+        keys = Model.PRIMARY_KEYS.get(table_name, ())
+        return tuple(keys) + tuple(str(column) for column in columns if column not in keys)
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def __generate_select_template(
+        table_name: str, 
+        equal: tuple, 
+        larger: tuple, 
+        smaller: tuple, 
+        larger_equal: tuple, 
+        smaller_equal: tuple, 
+        order_by: str, 
+        columns: tuple = None, 
+        after: bool = False, 
+        limit: bool = False, 
+        within: tuple = ()
+    ) -> str:
+        """Build and cache the statement shape of a query. Arguments are 
+        column names of each kind of condition, the projected columns, 
+        whether a keyset and a limit are bound, and pairs of (column or 
+        tuple of columns, number of values) of IN conditions.
+        """
+
+        conditions = []
+        for condition_columns, operator in (
+            (equal, "="), 
+            (larger, ">"), 
+            (smaller, "<"), 
+            (larger_equal, ">="), 
+            (smaller_equal, "<=")
+        ):
+            for column in condition_columns:
+                conditions.append(f"{column}{operator}%s")
+
+        for within_columns, count in within:
+            if isinstance(within_columns, tuple):
+                row = f"({', '.join(['%s'] * len(within_columns))})"
+                conditions.append(
+                    f"({', '.join(within_columns)}) IN ({', '.join([row] * count)})"
+                )
+            else:
+                conditions.append(f"{within_columns} IN ({', '.join(['%s'] * count)})")
+
+        if after:
+            keyset = []
+            directions = set()
+            for term in order_by.split(","):
+                words = term.split()
+                keyset.append(words[0])
+                directions.add(words[1].upper() if len(words) > 1 else "ASC")
+            if len(directions) != 1:
+                msg = f"Keyset pagination needs one direction in order_by. Got {order_by}."
+                logging.error(msg)
+                raise ValueError(msg)
+            operator = ">" if directions.pop() == "ASC" else "<"
+            if len(keyset) == 1:
+                conditions.append(f"{keyset[0]}{operator}%s")
+            else:
+                placeholders = ", ".join(["%s"] * len(keyset))
+                conditions.append(f"({', '.join(keyset)}){operator}({placeholders})")
+
+        projection = "*" if columns is None else ", ".join(columns)
+        sql_query = f"SELECT {projection} FROM {table_name}"
+        if len(conditions) > 0:
+            sql_query = f"{sql_query} WHERE {' AND '.join(conditions)}"
+        if order_by is not None:
+            sql_query = "".join([sql_query, " ORDER BY ", order_by])
+        if limit:
+            sql_query = "".join([sql_query, " LIMIT %s"])
+        return "".join([sql_query, ";"])
 
     def __generate_qeury_string(
         self,
@@ -86,10 +2048,27 @@ class Model():
         smaller: dict = {},
         larger_equal: dict = {},
         smaller_equal: dict = {},
-        order_by: str = None
-    ) -> str:
-        """Generate a sql query string look like:
-        `SELECT * FROM {table_name} WHERE {conditions};`
+        order_by: str = None, 
+        allow_empty: bool = False, 
+        columns: list = None, 
+        limit: int = None, 
+        after: tuple = None, 
+        within: dict = {}
+    ) -> tuple[str, tuple]:
+        """Generate a parameterized sql query look like:
+        `SELECT * FROM {table_name} WHERE {column}=%s AND ...;`
+
+        Statements of the same table, condition columns and order are built 
+        once and reused.
+
+        `after` continues a keyset pagination: only rows after the given 
+        values of the `order_by` columns are returned, e.g. order_by \
+        "birthday DESC" and after ("2020-01-01",) gives `birthday<%s`. All 
+        `order_by` columns should have the same direction.
+
+        Keys of `within` are a column, or a tuple of columns compared as a 
+        row, e.g. {("id", "birthday", "farm"): [("1", "2020-01-01", "A")]} \
+        gives `(id, birthday, farm) IN ((%s, %s, %s))`.
 
         :param table_name: table's name in the database.
         :param equal: query will be `key`=`value`
@@ -98,9 +2077,16 @@ class Model():
         :param larger_equal: query will be `key`>=`value`
         :param smaller_equal: query will be `key`<=`value`
         :param order_by: `column_name` `ASC|DESC`
-        :raises ValueError: if all conditions are empty
+        :param allow_empty: select the whole table if all conditions are empty.
+        :param columns: columns to select. Primary keys are always selected.
+        :param limit: maximum number of rows.
+        :param after: last values of the `order_by` columns already read.
+        :param within: query will be `key` IN (`values`)
+        :raises ValueError: if all conditions are empty and not allow_empty, \
+            `after` does not match `order_by`, or a `within` value is empty \
+            or has rows of wrong length.
         :raises TypeError: if passing in any parameter with incorrect type.
-        :return: a sql query string.
+        :return: a sql query string and its arguments.
         """
         
         type_check(table_name, "table_name", str)
@@ -111,55 +2097,292 @@ class Model():
         type_check(smaller_equal, "smaller_equal", dict)
         if order_by is not None:
             type_check(order_by, "order_by", str)
+        if columns is not None:
+            type_check(columns, "columns", (list, tuple))
+            columns = Model.__projection(table_name, columns)
+        if limit is not None:
+            type_check(limit, "limit", int)
+            if limit < 1:
+                msg = f"limit should be larger than 0. Got {limit}."
+                logging.error(msg)
+                raise ValueError(msg)
+        if after is not None and not isinstance(after, (list, tuple)):
+            after = (after,)
+        if after is not None and (
+            order_by is None or len(after) != len(order_by.split(","))
+        ):
+            msg = f"after should have a value for each order_by column. Got {after}."
+            logging.error(msg)
+            raise ValueError(msg)
 
-        conditions = []
-        for key, value in equal.items():
-            conditions.append("{key}='{value}'".format(key=str(key), value=str(value)))
-        for key, value in larger.items():
-            conditions.append("{key}>'{value}'".format(key=str(key), value=str(value)))
-        for key, value in smaller.items():
-            conditions.append("{key}<'{value}'".format(key=str(key), value=str(value)))
-        for key, value in larger_equal.items():
-            conditions.append("{key}>='{value}'".format(key=str(key), value=str(value)))
-        for key, value in smaller_equal.items():
-            conditions.append("{key}<='{value}'".format(key=str(key), value=str(value)))
-
-        if len(conditions) == 0:
+        type_check(within, "within", dict)
+        within_shape = []
+        within_args = []
+        for columns_in, values in within.items():
+            values = list(values)
+            if len(values) == 0:
+                msg = f"Values of {columns_in} can not be empty."
+                logging.error(msg)
+                raise ValueError(msg)
+            if isinstance(columns_in, tuple):
+                for value in values:
+                    if len(value) != len(columns_in):
+                        msg = f"{value} does not match columns {columns_in}."
+                        logging.error(msg)
+                        raise ValueError(msg)
+                    within_args.extend(value)
+            else:
+                columns_in = str(columns_in)
+                within_args.extend(values)
+            within_shape.append((columns_in, len(values)))
+
+        conditions = (equal, larger, smaller, larger_equal, smaller_equal)
+        if (
+            not allow_empty 
+            and len(within) == 0 
+            and all(len(condition) == 0 for condition in conditions)
+        ):
             msg = "Searching condition can not be empty."
             logging.error(msg)
             raise ValueError(msg)
 
-        sql_query = f"SELECT * FROM {table_name} WHERE {' AND '.join(conditions)}"
-        if order_by is not None:
-            sql_query = "".join([sql_query, " ORDER BY ", order_by])
-        sql_query = "".join([sql_query, ";"])
-        return sql_query
+        sql_query = self.__generate_select_template(
+            table_name, 
+            *[tuple(str(key) for key in condition.keys()) for condition in conditions], 
+            order_by, 
+            columns, 
+            after is not None, 
+            limit is not None, 
+            tuple(within_shape)
+        )
+        args = tuple(value for condition in conditions for value in condition.values())
+        args += tuple(within_args)
+        if after is not None:
+            args += tuple(after)
+        if limit is not None:
+            args += (limit,)
+        return sql_query, args
     
     def __generate_insert_string(
         self, 
         attributes: dict, 
         table_name: str
-    ) -> str:
-        """Generate sql used for new insertion.
+    ) -> tuple[str, tuple]:
+        """Generate parameterized sql used for new insertion.
 
         :param attributes: attributes of inserted object.
         :param table_name: name of the table in the database.
-        :return: sql string.
+        :return: sql string and its arguments.
         """
 
         type_check(attributes, "attributes", dict)
         type_check(table_name, "table_name", str)
 
         # Pick non-empty attributes.
-        columns = []
-        values = []
-        for key, item in attributes.items():
-            if item is not None:
-                columns.append(key)
-                values.append(f"'{str(item)}'")
-        insert_string = f"INSERT INTO {table_name} "
-        insert_string += f"({', '.join(columns)}) VALUES ({', '.join(values)});"
-        return insert_string
+        attributes = {
+            key: value for key, value in attributes.items() if value is not None
+        }
+        sql_query = self.__generate_write_string(table_name, tuple(attributes.keys()))
+        return sql_query, tuple(attributes.values())
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def __generate_update_template(table_name: str, columns: tuple) -> str:
+        """Build and cache an UPDATE of `columns` through primary keys."""
+
+        keys = Model.PRIMARY_KEYS[table_name]
+        if len(columns) == 0:
+            # Nothing but keys to set, keep the statement valid.
+            columns = keys
+        setting = ", ".join(f"{column}=%s" for column in columns)
+        condition = " AND ".join(f"{key}=%s" for key in keys)
+        return f"UPDATE {table_name} SET {setting} WHERE {condition};"
+
+    def __generate_update_string(
+        self, 
+        attributes: dict, 
+        table_name: str
+    ) -> tuple[str, tuple]:
+        """Generate parameterized sql which updates non-empty, non-key 
+        attributes of a record identified by its primary keys.
+
+        :param attributes: attributes of the updated object, including keys.
+        :param table_name: name of the table in the database.
+        :return: sql string and its arguments.
+        """
+
+        type_check(attributes, "attributes", dict)
+        type_check(table_name, "table_name", str)
+
+        keys = Model.PRIMARY_KEYS[table_name]
+        setting = {
+            key: value for key, value in attributes.items() 
+            if value is not None and key not in keys
+        }
+        if len(setting) == 0:
+            setting = {key: attributes[key] for key in keys}
+        sql_query = self.__generate_update_template(table_name, tuple(setting.keys()))
+        args = tuple(setting.values()) + tuple(attributes[key] for key in keys)
+        return sql_query, args
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def __generate_write_string(
+        table_name: str, 
+        columns: tuple, 
+        upsert: bool = False
+    ) -> str:
+        """Generate a parameterized INSERT with one placeholder per column.
+
+        If upsert, non-key columns are updated when the primary key already 
+        exists: `INSERT ... ON DUPLICATE KEY UPDATE column=VALUES(column)`.
+
+        :param table_name: name of the table in the database.
+        :param columns: inserted columns.
+        :param upsert: whether to update existing rows.
+        :return: sql string.
+        """
+
+        sql_query = "INSERT INTO {table} ({columns}) VALUES ({values})".format(
+            table=table_name, 
+            columns=", ".join(columns), 
+            values=", ".join(["%s"] * len(columns))
+        )
+        if upsert:
+            keys = Model.PRIMARY_KEYS[table_name]
+            setting = [f"{column}=VALUES({column})" for column in columns if column not in keys]
+            if len(setting) == 0:
+                # Nothing to update, but a duplicate should not be an error.
+                setting = [f"{keys[0]}={keys[0]}"]
+            sql_query += " ON DUPLICATE KEY UPDATE " + ", ".join(setting)
+        return sql_query + ";"
+
+    def __write_one(self, table_name: str, attributes: dict) -> "UpsertStatus":
+        """Upsert one row and tell what happened from the affected rows.
+
+        :param table_name: name of the table in the database.
+        :param attributes: attributes of the object, None values are skipped.
+        :raises pymysql.err.IntegrityError: if a foreign key does not exist.
+        """
+
+        attributes = {
+            key: value for key, value in attributes.items() if value is not None
+        }
+        sql_query = self.__generate_write_string(
+            table_name, tuple(attributes.keys()), upsert=True
+        )
+        def run():
+            with self.__connection() as connection:
+                with connection.cursor() as cursor:
+                    return self.__execute(cursor, sql_query, tuple(attributes.values()))
+
+        return UpsertStatus.from_affected_rows(self.__retry(run, True))
+
+    def __write_many(
+        self, 
+        table_name: str, 
+        items: list, 
+        get_attributes, 
+        chunk_size: int, 
+        upsert: bool = False, 
+        report_changes: bool = False
+    ) -> list[tuple[object, "UpsertStatus | Exception"]]:
+        """Insert or upsert many objects in one transaction, or in the active 
+        session.
+
+        Objects are grouped by their non-empty columns and each group is sent 
+        as multi-row INSERTs of at most `chunk_size` rows. If a chunk violates 
+        a constraint, its rows are retried one by one so that only the 
+        offending rows are skipped.
+
+        If report_changes, rows are sent one by one and the UpsertStatus of 
+        every row is reported. A retried attempt first rolls back the rows 
+        of the failed one, so the statuses come from the last attempt only.
+
+        :param table_name: name of the table in the database.
+        :param items: unique objects to write.
+        :param get_attributes: function returns the attributes dict of an item.
+        :param chunk_size: maximum rows per INSERT statement.
+        :param upsert: update non-key columns of existing rows.
+        :param report_changes: report the UpsertStatus of every row.
+        :raises TypeError: if table_name is not a str or chunk_size is not \
+            an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (object, error) for rows which were not written, \
+            plus (object, UpsertStatus) for every other row if report_changes.
+        """
+
+        type_check(table_name, "table_name", str)
+        type_check(chunk_size, "chunk_size", int)
+        if chunk_size < 1:
+            msg = f"chunk_size should be larger than 0. Got {chunk_size}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        invalid = []
+        # Group rows by column set, keeping the order of first appearance.
+        groups = {}
+        for item in items:
+            if not item.is_unique():
+                msg = f"{type(item).__name__} should be unique. Got {item}."
+                logging.error(msg)
+                invalid.append((item, ValueError(msg)))
+                continue
+            attributes = {
+                key: value for key, value 
+                in get_attributes(item).items() if value is not None
+            }
+            columns = tuple(attributes.keys())
+            groups.setdefault(columns, []).append((item, tuple(attributes.values())))
+
+        def run():
+            results = []
+            with self.__connection() as connection:
+                cursor = connection.cursor()
+                # A lock wait timeout keeps the earlier statements of a session, 
+                # so undo them before a retry writes and reports every row again.
+                cursor.execute("SAVEPOINT write_many;")
+                try:
+                    for columns, rows in groups.items():
+                        sql_query = self.__generate_write_string(table_name, columns, upsert)
+                        if not report_changes:
+                            for start in range(0, len(rows), chunk_size):
+                                chunk = rows[start:start + chunk_size]
+                                # executemany may split a chunk into several statements.
+                                cursor.execute("SAVEPOINT write_chunk;")
+                                try:
+                                    self.__execute(
+                                        cursor, sql_query, [row for _, row in chunk], many=True
+                                    )
+                                    continue
+                                except pymysql.err.IntegrityError:
+                                    cursor.execute("ROLLBACK TO SAVEPOINT write_chunk;")
+                                # Retry row by row to find the offending rows. A 
+                                # failed statement is rolled back on its own by InnoDB.
+                                for item, row in chunk:
+                                    try:
+                                        self.__execute(cursor, sql_query, row)
+                                    except pymysql.err.IntegrityError as error:
+                                        logging.error(error.args[1])
+                                        results.append((item, error))
+                            continue
+                        for item, row in rows:
+                            try:
+                                affected = self.__execute(cursor, sql_query, row)
+                                results.append((item, UpsertStatus.from_affected_rows(affected)))
+                            except pymysql.err.IntegrityError as error:
+                                logging.error(error.args[1])
+                                results.append((item, error))
+                except pymysql.err.OperationalError as error:
+                    if len(error.args) > 0 and error.args[0] in self.STATEMENT_ERRORS:
+                        cursor.execute("ROLLBACK TO SAVEPOINT write_many;")
+                    raise error
+                cursor.close()
+            return results
+
+        # Upserts may be repeated, a repeated insert would fail on its own rows.
+        return invalid + self.__retry(run, upsert)
 
     def __get_pig_attributes(self, pig: Pig) -> dict:
         """ Generate a dictionary of non-empty attributes."""
@@ -185,6 +2408,40 @@ class Model():
 
         return attributes
 
+    def __find_reg_id_conflicts(self, pigs: list[Pig], chunk_size: int = 500) -> dict:
+        """ Find pigs whose reg_id is held by another pig, in the database or 
+        earlier in `pigs`.
+
+        reg_id is unique, so `ON DUPLICATE KEY UPDATE` also fires on a reg_id 
+        of another pig and would overwrite that pig.
+
+        :return: {index of the pig in `pigs`: error message}.
+        """
+
+        reg_ids = list(dict.fromkeys(
+            pig.get_reg_id() for pig in pigs 
+            if pig.is_unique() and pig.get_reg_id() is not None
+        ))
+        holders = {} # reg_id: primary keys of the pig holding it
+        for start in range(0, len(reg_ids), chunk_size):
+            sql_query, args = self.__generate_qeury_string(
+                table_name="Pigs", 
+                columns=["reg_id"], 
+                within={"reg_id": reg_ids[start:start + chunk_size]}
+            )
+            for row in self.__query(sql_query, args):
+                holders[row["reg_id"]] = (row["id"], row["birthday"], row["farm"])
+
+        conflicts = {}
+        for i, pig in enumerate(pigs):
+            if not pig.is_unique() or pig.get_reg_id() is None:
+                continue
+            key = self.__pig_key(pig)
+            holder = holders.setdefault(pig.get_reg_id(), key)
+            if holder != key:
+                conflicts[i] = f"reg_id {pig.get_reg_id()} belongs to pig {holder}. Got {pig}."
+        return conflicts
+
     def insert_pig(self, pig: Pig) -> None:
         """ Insert a pig to the database.
 
@@ -199,20 +2456,116 @@ class Model():
             logging.error(msg)
             raise ValueError(msg)
 
-        # Pick non-empty attributes.
         attributes = self.__get_pig_attributes(pig)
-        columns = []
-        values = []
-        for key, item in attributes.items():
-            if item is not None:
-                columns.append(key)
-                values.append("'{item}'".format(item=item))
-        sql_query = "INSERT INTO Pigs ({columns}) VALUES ({values});".format(
-            columns=", ".join(columns),
-            values=", ".join(values)
-        )
+        sql_query, args = self.__generate_insert_string(attributes, "Pigs")
+        self.__query(sql_query, args)
+        self.__invalidate_pigs([pig])
+
+    def insert_pigs(
+        self, 
+        pigs: Iterable[Pig], 
+        chunk_size: int = 500
+    ) -> list[tuple[Pig, Exception]]:
+        """ Insert many pigs to the database in one transaction.
+
+        Parents should come before their offspring in `pigs`.
+
+        :param pigs: unique pig instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (pig, error) for pigs which were not inserted.
+        """
+
+        pigs = list(pigs)
+        for pig in pigs:
+            type_check(pig, "pig", Pig)
+
+        try:
+            return self.__write_many("Pigs", pigs, self.__get_pig_attributes, chunk_size)
+        finally:
+            self.__invalidate_pigs(pigs)
+
+    def upsert_pig(self, pig: Pig) -> UpsertStatus:
+        """Insert or update a pig in one statement.
+
+        Non-key attributes of an existing record are overwritten by the 
+        non-empty attributes of `pig`.
+
+        :param pig: an unique Pig.
+        :raises: TypeError, ValueError, KeyError.
+        :return: whether the record was inserted, updated or unchanged.
+        """
+
+        type_check(pig, "pig", Pig)
+        if not pig.is_unique():
+            msg = f"pig should be unique. Got {pig}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        conflicts = self.__find_reg_id_conflicts([pig])
+        if len(conflicts) > 0:
+            msg = conflicts[0]
+            logging.error(msg)
+            raise KeyError(msg)
+
+        try:
+            status = self.__write_one("Pigs", self.__get_pig_attributes(pig))
+            self.__invalidate_pigs([pig])
+            return status
+        except pymysql.err.IntegrityError:
+            msg = "Parent does not exist or reg_id is duplicated in the database."
+            msg += f"\n Get {pig}"
+            logging.error(msg)
+            raise KeyError(msg)
 
-        self.__query(sql_query)
+    def upsert_pigs(
+        self, 
+        pigs: Iterable[Pig], 
+        chunk_size: int = 500, 
+        report_changes: bool = False
+    ) -> list[tuple[Pig, UpsertStatus | Exception]]:
+        """Insert or update many pigs in one transaction.
+
+        A pig whose reg_id is held by another pig is not written, instead of 
+        overwriting the other pig.
+
+        :param pigs: unique Pig instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :param report_changes: send rows one by one and report the \
+            UpsertStatus of every row.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (pig, error) for records which were not \
+            written, plus (pig, UpsertStatus) for the others if \
+            report_changes.
+        """
+
+        pigs = list(pigs)
+        for pig in pigs:
+            type_check(pig, "pig", Pig)
+
+        conflicts = self.__find_reg_id_conflicts(pigs, chunk_size)
+        rejected = []
+        for i, msg in conflicts.items():
+            logging.error(msg)
+            # Same error as a duplicated reg_id of an insert.
+            rejected.append((pigs[i], pymysql.err.IntegrityError(1062, msg)))
+        try:
+            return rejected + self.__write_many(
+                "Pigs", 
+                [pig for i, pig in enumerate(pigs) if i not in conflicts], 
+                self.__get_pig_attributes, 
+                chunk_size, 
+                upsert=True, 
+                report_changes=report_changes
+            )
+        finally:
+            self.__invalidate_pigs(pigs)
 
     def dict_to_pig(self, pig_dict: dict) -> Pig:
         """ Transform a dictionary from query to an unique pig instance. 
@@ -220,12 +2573,21 @@ class Model():
         If the pig is not unique, None will be returned. \
         Incomplete sire/dam attributes will raise KeyError.
 
+        Within a session, rows of the same primary key return the same \
+        instance, and sire/dam already loaded are reused.
+
         :param pig_dict: a dictionary contains attributes of pig.
         :raises: TypeError, KeyError.
         """
 
         type_check(pig_dict, "pig_dict", dict)
 
+        mapped = self.__mapped(
+            "Pigs", (pig_dict.get("id"), pig_dict.get("birthday"), pig_dict.get("farm"))
+        )
+        if mapped is not None:
+            return mapped
+
         pig = Pig()
         if pig_dict.get("id") is not None:
             pig.set_id(pig_dict["id"])
@@ -244,27 +2606,36 @@ class Model():
         if pig_dict.get("litter") is not None:
             pig.set_litter(pig_dict.get("litter"))
         if pig_dict.get("sire_id") is not None:
-            sire = Pig()
-            sire.set_id(pig_dict["sire_id"])
-            sire.set_birthday(pig_dict["sire_birthday"])
-            sire.set_farm(pig_dict["sire_farm"])
+            sire = self.__mapped("Pigs", (
+                pig_dict["sire_id"], pig_dict["sire_birthday"], pig_dict["sire_farm"]
+            ))
+            if sire is None:
+                sire = Pig()
+                sire.set_id(pig_dict["sire_id"])
+                sire.set_birthday(pig_dict["sire_birthday"])
+                sire.set_farm(pig_dict["sire_farm"])
             pig.set_sire(sire)
         if pig_dict.get("dam_id") is not None:
-            dam = Pig()
-            dam.set_id(pig_dict["dam_id"])
-            dam.set_birthday(pig_dict["dam_birthday"])
-            dam.set_farm(pig_dict["dam_farm"])
+            dam = self.__mapped("Pigs", (
+                pig_dict["dam_id"], pig_dict["dam_birthday"], pig_dict["dam_farm"]
+            ))
+            if dam is None:
+                dam = Pig()
+                dam.set_id(pig_dict["dam_id"])
+                dam.set_birthday(pig_dict["dam_birthday"])
+                dam.set_farm(pig_dict["dam_farm"])
             pig.set_dam(dam)
 
         if not pig.is_unique():
             return None
 
-        return pig
+        return self.__identify("Pigs", self.__pig_key(pig), pig)
 
     def find_pig(self, pig: Pig) -> Pig:
         """ Find a pig in the database through primary keys.
 
-        If the pig does not exist, return none.
+        If the pig does not exist, return none. Results are cached when \
+        CACHE_SIZE is set, except those read in a session.
 
         :param pig: an unique pig instance.
         :raises: TypeError, ValueError.
@@ -277,16 +2648,31 @@ class Model():
             logging.error(msg)
             raise ValueError(msg)
 
-        sql_query = f"SELECT * FROM Pigs WHERE id={pig.get_id()} "
-        sql_query += f"AND birthday='{str(pig.get_birthday())}' "
-        sql_query += f"AND farm='{pig.get_farm()}';"
-        result = self.__query(sql_query)
+        equal = {
+            "id": pig.get_id(), 
+            "birthday": pig.get_birthday(), 
+            "farm": pig.get_farm()
+        }
+        cache_key = self.__pig_cache_key(equal)
+        if cache_key is not None:
+            cached = self.__cache.get(cache_key)
+            if cached is not QueryCache.MISSING:
+                if len(cached) == 0:
+                    return None
+                return self.__identify("Pigs", self.__pig_key(cached[0]), cached[0])
+
+        sql_query, args = self.__generate_qeury_string(table_name="Pigs", equal=equal)
+        result = self.__query(sql_query, args)
+        found = [self.dict_to_pig(row) for row in result[:1]]
+        # Rows read in a session may not be committed, keep them out of the cache.
+        if cache_key is not None and self.get_session() is None:
+            self.__cache.put(cache_key, tuple(found), self.__pig_tags(equal, found))
 
         # pig not found
-        if len(result) == 0:
+        if len(found) == 0:
             return None
 
-        return self.dict_to_pig(result[0])
+        return found[0]
 
     def find_pigs(
             self,
@@ -295,7 +2681,11 @@ class Model():
             smaller: dict = {},
             larger_equal: dict = {},
             smaller_equal: dict = {},
-            order_by: str = None
+            order_by: str = None, 
+            columns: list = None, 
+            limit: int = None, 
+            after: tuple = None, 
+            within: dict = {}
         ) -> list[Pig]:
         """ Find all pigs satisfy the conditions. 
 
@@ -303,32 +2693,193 @@ class Model():
         * Keys of the dictionary should be same as attributes.
         * Different conditions will be connected by AND.
         * Sire and Dam should be listed as sire_id, sire_birthday, ...
+
+        When CACHE_SIZE is set, results of conditions containing `id` or \
+        `reg_id` equality are cached until a pig with that id or reg_id is \
+        written. Results read in a session are not cached, since they may \
+        not be committed. Cached pigs are shared, do not modify them.
         
         :param equal: query will be `key`=`value`
         :param larger: query will be `key`>`value`
         :param smaller: query will be `key`<`value`
         :param larger_equal: query will be `key`>=`value`
         :param smaller_equal: query will be `key`<=`value`
+        :param within: query will be `key` IN (`values`). A tuple key \
+            compares several columns as a row.
         :param order_by: `column_name` `ASC|DESC`
+        :param columns: columns to select. Primary keys are always selected.
+        :param limit: maximum number of results.
+        :param after: values of the `order_by` columns of the last result \
+            from the previous page. Only results after it are returned.
         :raises: TypeError, ValueError.
         """
 
-        sql_query = self.__generate_qeury_string(
+        sql_query, args = self.__generate_qeury_string(
             table_name="Pigs", 
             equal=equal, 
             larger=larger, 
             smaller=smaller, 
             larger_equal=larger_equal, 
             smaller_equal=smaller_equal, 
-            order_by=order_by
+            order_by=order_by, 
+            columns=columns, 
+            limit=limit, 
+            after=after, 
+            within=within
         )
-        results = self.__query(sql_query)
+        cache_key = self.__pig_cache_key(
+            equal, larger, smaller, larger_equal, smaller_equal, 
+            order_by, columns, limit, after, within
+        )
+        if cache_key is not None:
+            cached = self.__cache.get(cache_key)
+            if cached is not QueryCache.MISSING:
+                with self.__partial_rows(columns is not None):
+                    return [self.__identify("Pigs", self.__pig_key(pig), pig) for pig in cached]
+
+        results = self.__query(sql_query, args)
         pigs = []
-        for pig in results:
-            pigs.append(self.dict_to_pig(pig))
+        with self.__partial_rows(columns is not None):
+            for pig in results:
+                pigs.append(self.dict_to_pig(pig))
+
+        # Rows read in a session may not be committed, keep them out of the cache.
+        if cache_key is not None and self.get_session() is None:
+            self.__cache.put(cache_key, tuple(pigs), self.__pig_tags(equal, pigs))
+        return pigs
+
+    def find_pig_by_tag(
+            self, 
+            year: int | str, 
+            breed: str, 
+            id: str, 
+            farm: str, 
+            gender: str = None
+        ) -> Pig | None:
+        """ Find the youngest pig of a {birth_year}{breed}{id} tag.
+
+        The lookup matches the stored `birth_year` column exactly, so it \
+        needs schema version 3 (see `ensure_schema`).
+
+        :param year: birth year of the pig.
+        :param breed: breed of the pig.
+        :param id: id of the pig.
+        :param farm: farm of the pig.
+        :param gender: gender of the pig, any gender if None.
+        :raises: TypeError, ValueError.
+        """
+
+        if isinstance(year, int):
+            year = str(year)
+        type_check(year, "year", str)
+        if not year.isdigit():
+            msg = f"year should be digits. Got {year}."
+            logging.error(msg)
+            raise ValueError(msg)
+        type_check(breed, "breed", str)
+        type_check(id, "id", str)
+        type_check(farm, "farm", str)
+
+        equal = {"farm": farm, "id": id, "birth_year": int(year), "breed": breed}
+        if gender is not None:
+            type_check(gender, "gender", str)
+            equal["gender"] = gender
+        found = self.find_pigs(equal=equal, order_by="birthday DESC", limit=1)
+        if len(found) == 0:
+            return None
+        return found[0]
+
+    def iter_pigs(
+        self,
+        equal: dict = {},
+        larger: dict = {},
+        smaller: dict = {},
+        larger_equal: dict = {},
+        smaller_equal: dict = {},
+        order_by: str = None, 
+        chunk_size: int = 1000, 
+        raw: bool = False
+    ) -> Iterator[Pig | dict]:
+        """ Lazily iterate all pigs satisfy the conditions with bounded 
+        memory. Empty conditions iterate the whole table.
+
+        Please make sure:
+        * Keys of the dictionary should be same as attributes.
+        * Different conditions will be connected by AND.
+        * Sire and Dam should be listed as sire_id, sire_birthday, ...
+        
+        :param equal: query will be `key`=`value`
+        :param larger: query will be `key`>`value`
+        :param smaller: query will be `key`<`value`
+        :param larger_equal: query will be `key`>=`value`
+        :param smaller_equal: query will be `key`<=`value`
+        :param order_by: `column_name` `ASC|DESC`
+        :param chunk_size: rows fetched from the server per round trip.
+        :param raw: yield row dicts instead of Pig objects.
+        :raises: TypeError, ValueError.
+        """
+
+        return self.__iter(
+            "Pigs", self.dict_to_pig, equal, larger, smaller, 
+            larger_equal, smaller_equal, order_by, chunk_size, raw
+        )
+
+    def find_pigs_by_keys(
+        self, 
+        keys: Iterable[tuple | Pig], 
+        chunk_size: int = 500
+    ) -> dict[tuple, Pig]:
+        """ Find many pigs by primary key in a few queries.
 
+        Keys are normalized like Pig does, so ("1", "2020-01-01", "A") \
+        and ("1", date(2020, 1, 1), "A") are the same key.
+
+        :param keys: (id, birthday, farm) tuples or unique Pig instances.
+        :param chunk_size: maximum keys per query.
+        :raises: TypeError, ValueError.
+        :return: found pigs keyed by (id, birthday, farm). Keys not in the \
+            database are absent.
+        """
+
+        normalized = []
+        for key in keys:
+            if isinstance(key, Pig):
+                pig = key
+            else:
+                pig = Pig(id=key[0], birthday=key[1], farm=key[2])
+            if not pig.is_unique():
+                msg = f"Pig should be unique. Got {pig}."
+                logging.error(msg)
+                raise ValueError(msg)
+            normalized.append(self.__pig_key(pig))
+
+        pigs = {}
+        for row in self.__find_by_keys("Pigs", normalized, chunk_size):
+            pig = self.dict_to_pig(row)
+            pigs[self.__pig_key(pig)] = pig
         return pigs
 
+    def find_pigs_frame(
+        self, 
+        columns: list = None, 
+        order_by: str = None, 
+        limit: int = None, 
+        chunk_size: int = 10000, 
+        **conditions
+    ) -> pd.DataFrame:
+        """ Same as `find_pigs` but return a typed DataFrame of the rows. See 
+        `query_frame`.
+
+        :param columns: columns to select. Primary keys are always selected.
+        :param order_by: `column_name` `ASC|DESC`
+        :param limit: maximum number of rows.
+        :param chunk_size: rows fetched per round trip.
+        :param conditions: equal, larger, smaller, larger_equal, \
+            smaller_equal and within as in `find_pigs`.
+        :raises: TypeError, ValueError.
+        """
+        return self.query_frame("Pigs", conditions, columns, order_by, limit, chunk_size)
+
     def update_pig(self, pig: Pig) -> None:
         """ Update attributes of a pig in the database.
 
@@ -344,21 +2895,9 @@ class Model():
             raise ValueError(msg)
 
         attributes = self.__get_pig_attributes(pig)
-        setting = []
-        for key, value in attributes.items():
-            if value is not None:
-                setting.append("{key}='{value}'".format(key=key, value=value))
-        condition = "id='{id}' AND birthday='{birthday}' AND farm='{farm}'".format(
-            id=pig.get_id(),
-            birthday=str(pig.get_birthday()),
-            farm=pig.get_farm()
-        )
-        sql_query = "UPDATE Pigs SET {setting} WHERE {condition};".format(
-            setting=", ".join(setting),
-            condition=condition
-        )
-
-        self.__query(sql_query)
+        sql_query, args = self.__generate_update_string(attributes, "Pigs")
+        self.__query(sql_query, args)
+        self.__invalidate_pigs([pig])
 
     def __get_estrus_attributes(self, estrus: Estrus) -> dict:
         """Get a dictionary of attributes.
@@ -399,44 +2938,128 @@ class Model():
         
         attributes = self.__get_estrus_attributes(estrus)
 
-        # Pick non-empty attributes.
-        columns = []
-        values = []
-        for key, item in attributes.items():
-            if item is not None:
-                columns.append(key)
-                values.append("'{item}'".format(item=str(item)))
-        sql_query = "INSERT INTO Estrus ({columns}) VALUES ({values});".format(
-            columns=", ".join(columns), 
-            values=", ".join(values)
-        )
+        sql_query, args = self.__generate_insert_string(attributes, "Estrus")
 
         try:
-            self.__query(sql_query)
+            self.__query(sql_query, args)
         except pymysql.err.IntegrityError:
             msg = "Sow does not exist in the database."
             msg += f"\n Get {estrus.get_sow()}"
             raise KeyError(msg)
+
+    def insert_estrus_many(
+        self, 
+        estrus: Iterable[Estrus], 
+        chunk_size: int = 500
+    ) -> list[tuple[Estrus, Exception]]:
+        """Insert many estrus records to the database in one transaction.
+
+        :param estrus: unique Estrus instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (estrus, error) for records which were not inserted.
+        """
+
+        estrus = list(estrus)
+        for record in estrus:
+            type_check(record, "estrus", Estrus)
+
+        return self.__write_many(
+            "Estrus", estrus, self.__get_estrus_attributes, chunk_size
+        )
+
+    def upsert_estrus(self, estrus: Estrus) -> UpsertStatus:
+        """Insert or update an estrus record in one statement.
+
+        Non-key attributes of an existing record are overwritten by the 
+        non-empty attributes of `estrus`.
+
+        :param estrus: an unique Estrus.
+        :raises: TypeError, ValueError, KeyError.
+        :return: whether the record was inserted, updated or unchanged.
+        """
+
+        type_check(estrus, "estrus", Estrus)
+        if not estrus.is_unique():
+            msg = f"estrus should be unique. Got {estrus}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        try:
+            status = self.__write_one("Estrus", self.__get_estrus_attributes(estrus))
+            self.__invalidate_estrus([estrus])
+            return status
+        except pymysql.err.IntegrityError:
+            msg = "Sow does not exist in the database."
+            msg += f"\n Get {estrus}"
+            logging.error(msg)
+            raise KeyError(msg)
+
+    def upsert_estrus_many(
+        self, 
+        estrus: Iterable[Estrus], 
+        chunk_size: int = 500, 
+        report_changes: bool = False
+    ) -> list[tuple[Estrus, UpsertStatus | Exception]]:
+        """Insert or update many estrus records in one transaction.
+
+        :param estrus: unique Estrus instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :param report_changes: send rows one by one and report the \
+            UpsertStatus of every row.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (estrus, error) for records which were not \
+            written, plus (estrus, UpsertStatus) for the others if \
+            report_changes.
+        """
+
+        estrus = list(estrus)
+        for record in estrus:
+            type_check(record, "estrus", Estrus)
+
+        try:
+            return self.__write_many(
+                "Estrus", estrus, self.__get_estrus_attributes, chunk_size, 
+                upsert=True, report_changes=report_changes
+            )
+        finally:
+            self.__invalidate_estrus(estrus)
         
     def dict_to_estrus(self, estrus_dict: dict) -> Estrus | None:
         """Transform a dictionary from query to an unique estrus instance.
 
         If the estrus is not unique, None will be returned. \
 
+        Within a session, rows of the same primary key return the same \
+        instance, and a sow already loaded is reused.
+
         :param estrus_dict: a dictionary contains attributes of estrus.
         :return: an estrus object or None if estrus is not unique.
         """
 
         type_check(estrus_dict, "estrus_dict", dict)
 
+        sow_key = (estrus_dict.get("id"), estrus_dict.get("birthday"), estrus_dict.get("farm"))
+        mapped = self.__mapped("Estrus", sow_key + (estrus_dict.get("estrus_datetime"),))
+        if mapped is not None:
+            return mapped
+
         estrus = Estrus()
-        sow = Pig()
-        if estrus_dict.get("id") is not None:
-            sow.set_id(estrus_dict.get("id"))
-        if estrus_dict.get("birthday") is not None:
-            sow.set_birthday(estrus_dict.get("birthday"))
-        if estrus_dict.get("farm") is not None:
-            sow.set_farm(estrus_dict.get("farm"))
+        sow = self.__mapped("Pigs", sow_key)
+        if sow is None:
+            sow = Pig()
+            if estrus_dict.get("id") is not None:
+                sow.set_id(estrus_dict.get("id"))
+            if estrus_dict.get("birthday") is not None:
+                sow.set_birthday(estrus_dict.get("birthday"))
+            if estrus_dict.get("farm") is not None:
+                sow.set_farm(estrus_dict.get("farm"))
         if not sow.is_unique():
             return None
         estrus.set_sow(sow)
@@ -448,7 +3071,7 @@ class Model():
             estrus.set_pregnant(PregnantStatus(estrus_dict.get("pregnant")))
         if not estrus.is_unique():
             return None
-        return estrus
+        return self.__identify("Estrus", self.__estrus_key(estrus), estrus)
 
     def find_estrus(
             self,
@@ -457,7 +3080,11 @@ class Model():
             smaller: dict = {},
             larger_equal: dict = {},
             smaller_equal: dict = {},
-            order_by: str = None
+            order_by: str = None, 
+            columns: list = None, 
+            limit: int = None, 
+            after: tuple = None, 
+            within: dict = {}
         ) -> list[Estrus]:
         """ Find all estrus satisfy the conditions. 
 
@@ -471,26 +3098,132 @@ class Model():
         :param smaller: query will be `key`<`value`
         :param larger_equal: query will be `key`>=`value`
         :param smaller_equal: query will be `key`<=`value`
+        :param within: query will be `key` IN (`values`). A tuple key \
+            compares several columns as a row.
         :param order_by: `column_name` `ASC|DESC`
+        :param columns: columns to select. Primary keys are always selected.
+        :param limit: maximum number of results.
+        :param after: values of the `order_by` columns of the last result \
+            from the previous page. Only results after it are returned.
         :raises: TypeError, ValueError.
         """
-        sql_query = self.__generate_qeury_string(
+        sql_query, args = self.__generate_qeury_string(
             table_name="Estrus", 
             equal=equal, 
             larger=larger, 
             smaller=smaller, 
             larger_equal=larger_equal, 
             smaller_equal=smaller_equal, 
-            order_by=order_by
+            order_by=order_by, 
+            columns=columns, 
+            limit=limit, 
+            after=after, 
+            within=within
         )
 
-        results = self.__query(sql_query)
+        results = self.__query(sql_query, args)
         estrus = []
-        for dictionary in results:
-            estrus.append(self.dict_to_estrus(dictionary))
+        with self.__partial_rows(columns is not None):
+            for dictionary in results:
+                estrus.append(self.dict_to_estrus(dictionary))
 
         return estrus
         
+    def iter_estrus(
+        self,
+        equal: dict = {},
+        larger: dict = {},
+        smaller: dict = {},
+        larger_equal: dict = {},
+        smaller_equal: dict = {},
+        order_by: str = None, 
+        chunk_size: int = 1000, 
+        raw: bool = False
+    ) -> Iterator[Estrus | dict]:
+        """ Lazily iterate all estrus satisfy the conditions with bounded 
+        memory. Empty conditions iterate the whole table.
+
+        Please make sure:
+        * Keys of the dictionary should be same as attributes.
+        * Different conditions will be connected by AND.
+        * Sow should be listed as id, birthday, ...
+        
+        :param equal: query will be `key`=`value`
+        :param larger: query will be `key`>`value`
+        :param smaller: query will be `key`<`value`
+        :param larger_equal: query will be `key`>=`value`
+        :param smaller_equal: query will be `key`<=`value`
+        :param order_by: `column_name` `ASC|DESC`
+        :param chunk_size: rows fetched from the server per round trip.
+        :param raw: yield row dicts instead of Estrus objects.
+        :raises: TypeError, ValueError.
+        """
+
+        return self.__iter(
+            "Estrus", self.dict_to_estrus, equal, larger, smaller, 
+            larger_equal, smaller_equal, order_by, chunk_size, raw
+        )
+
+    def find_estrus_by_keys(
+        self, 
+        keys: Iterable[tuple | Estrus], 
+        chunk_size: int = 500
+    ) -> dict[tuple, Estrus]:
+        """ Find many estrus by primary key in a few queries.
+
+        Keys are normalized like Estrus does, so datetimes may be strings \
+        or datetime objects.
+
+        :param keys: (id, birthday, farm, estrus_datetime) tuples or unique \
+            Estrus instances.
+        :param chunk_size: maximum keys per query.
+        :raises: TypeError, ValueError.
+        :return: found estrus keyed by (id, birthday, farm, estrus_datetime). \
+            Keys not in the database are absent.
+        """
+
+        normalized = []
+        for key in keys:
+            if isinstance(key, Estrus):
+                estrus = key
+            else:
+                estrus = Estrus(
+                    sow=Pig(id=key[0], birthday=key[1], farm=key[2]), 
+                    estrus_datetime=key[3]
+                )
+            if not estrus.is_unique():
+                msg = f"Estrus should be unique. Got {estrus}."
+                logging.error(msg)
+                raise ValueError(msg)
+            normalized.append(self.__estrus_key(estrus))
+
+        found = {}
+        for row in self.__find_by_keys("Estrus", normalized, chunk_size):
+            estrus = self.dict_to_estrus(row)
+            found[self.__estrus_key(estrus)] = estrus
+        return found
+
+    def find_estrus_frame(
+        self, 
+        columns: list = None, 
+        order_by: str = None, 
+        limit: int = None, 
+        chunk_size: int = 10000, 
+        **conditions
+    ) -> pd.DataFrame:
+        """ Same as `find_estrus` but return a typed DataFrame of the rows. See 
+        `query_frame`.
+
+        :param columns: columns to select. Primary keys are always selected.
+        :param order_by: `column_name` `ASC|DESC`
+        :param limit: maximum number of rows.
+        :param chunk_size: rows fetched per round trip.
+        :param conditions: equal, larger, smaller, larger_equal, \
+            smaller_equal and within as in `find_estrus`.
+        :raises: TypeError, ValueError.
+        """
+        return self.query_frame("Estrus", conditions, columns, order_by, limit, chunk_size)
+
     def __get_mating_attributes(self, mating: Mating):
         """Get a dictionary of attributes.
 
@@ -532,26 +3265,69 @@ class Model():
             raise ValueError(msg)
 
         attributes = self.__get_estrus_attributes(estrus)
-        setting = []
-        for key, value in attributes.items():
-            if value is not None:
-                setting.append("{key}='{value}'".format(key=key, value=value))
-        condition = f"id='{estrus.get_sow().get_id()}' and "
-        condition += f"birthday='{str(estrus.get_sow().get_birthday())}' and "
-        condition += f"farm='{estrus.get_sow().get_farm()}' and "
-        condition += f"estrus_datetime='{str(estrus.get_estrus_datetime())}'"
-        sql_query = "UPDATE Estrus SET {setting} WHERE {condition};".format(
-            setting=", ".join(setting),
-            condition=condition
-        )
-
-        self.__query(sql_query)
+        sql_query, args = self.__generate_update_string(attributes, "Estrus")
+        self.__query(sql_query, args)
+        self.__invalidate_estrus([estrus])
     
     def insert_mating(self, mating: Mating):
         """Insert a mating record to the database.
 
         :param mating: an unique Mating.
-        :raises: TypeError, ValueError.
+        :raises: TypeError, ValueError.
+        """
+
+        type_check(mating, "mating", Mating)
+        if not mating.is_unique():
+            msg = f"mating should be unique. Got {mating}."
+            logging.error(msg)
+            raise ValueError(msg)
+        
+        attributes = self.__get_mating_attributes(mating)
+
+        sql_query, args = self.__generate_insert_string(attributes, "Matings")
+
+        try:
+            self.__query(sql_query, args)
+        except pymysql.err.IntegrityError:
+            msg = "Estrus or boar does not exist in the database."
+            msg += f"\n estrus: {mating.get_estrus()}."
+            msg += f"\n boar: {mating.get_boar()}."
+            logging.error(msg)
+            raise KeyError(msg)
+
+    def insert_matings(
+        self, 
+        matings: Iterable[Mating], 
+        chunk_size: int = 500
+    ) -> list[tuple[Mating, Exception]]:
+        """Insert many mating records to the database in one transaction.
+
+        :param matings: unique Mating instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (mating, error) for records which were not inserted.
+        """
+
+        matings = list(matings)
+        for mating in matings:
+            type_check(mating, "mating", Mating)
+
+        return self.__write_many(
+            "Matings", matings, self.__get_mating_attributes, chunk_size
+        )
+
+    def upsert_mating(self, mating: Mating) -> UpsertStatus:
+        """Insert or update a mating record in one statement.
+
+        Non-key attributes of an existing record are overwritten by the 
+        non-empty attributes of `mating`.
+
+        :param mating: an unique Mating.
+        :raises: TypeError, ValueError, KeyError.
+        :return: whether the record was inserted, updated or unchanged.
         """
 
         type_check(mating, "mating", Mating)
@@ -559,29 +3335,44 @@ class Model():
             msg = f"mating should be unique. Got {mating}."
             logging.error(msg)
             raise ValueError(msg)
-        
-        attributes = self.__get_mating_attributes(mating)
-
-        # Pick non-empty attributes.
-        columns = []
-        values = []
-        for key, item in attributes.items():
-            if item is not None:
-                columns.append(key)
-                values.append("'{item}'".format(item=str(item)))
-        sql_query = "INSERT INTO Matings ({columns}) VALUES ({values});".format(
-            columns=", ".join(columns), 
-            values=", ".join(values)
-        )
 
         try:
-            self.__query(sql_query)
+            return self.__write_one("Matings", self.__get_mating_attributes(mating))
         except pymysql.err.IntegrityError:
             msg = "Estrus or boar does not exist in the database."
-            msg += f"\n estrus: {mating.get_estrus()}."
-            msg += f"\n boar: {mating.get_boar()}."
+            msg += f"\n Get {mating}"
             logging.error(msg)
             raise KeyError(msg)
+
+    def upsert_matings(
+        self, 
+        matings: Iterable[Mating], 
+        chunk_size: int = 500, 
+        report_changes: bool = False
+    ) -> list[tuple[Mating, UpsertStatus | Exception]]:
+        """Insert or update many mating records in one transaction.
+
+        :param matings: unique Mating instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :param report_changes: send rows one by one and report the \
+            UpsertStatus of every row.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (mating, error) for records which were not \
+            written, plus (mating, UpsertStatus) for the others if \
+            report_changes.
+        """
+
+        matings = list(matings)
+        for mating in matings:
+            type_check(mating, "mating", Mating)
+
+        return self.__write_many(
+            "Matings", matings, self.__get_mating_attributes, chunk_size, 
+            upsert=True, report_changes=report_changes
+        )
         
     def dict_to_mating(self, mating_dict: dict) -> Mating | None:
         """Transform a dictionary from query to an unique Mating instance.
@@ -595,27 +3386,42 @@ class Model():
         type_check(mating_dict, "mating_dict", dict)
 
         mating = Mating()
-        estrus = Estrus()
-        sow = Pig()
-        if mating_dict.get("sow_id") is not None:
-            sow.set_id(mating_dict.get("sow_id"))
-        if mating_dict.get("sow_farm") is not None:
-            sow.set_farm(mating_dict.get("sow_farm"))
-        if mating_dict.get("sow_birthday") is not None:
-            sow.set_birthday(mating_dict.get("sow_birthday"))
-        if sow.is_unique():
-            estrus.set_sow(sow)
-        if mating_dict.get("estrus_datetime") is not None:
-            estrus.set_estrus_datetime(mating_dict.get("estrus_datetime"))
+        sow_key = (
+            mating_dict.get("sow_id"), 
+            mating_dict.get("sow_birthday"), 
+            mating_dict.get("sow_farm")
+        )
+        estrus = self.__mapped("Estrus", sow_key + (mating_dict.get("estrus_datetime"),))
+        if estrus is None:
+            estrus = Estrus()
+            sow = self.__mapped("Pigs", sow_key)
+            if sow is None:
+                sow = Pig()
+                if mating_dict.get("sow_id") is not None:
+                    sow.set_id(mating_dict.get("sow_id"))
+                if mating_dict.get("sow_farm") is not None:
+                    sow.set_farm(mating_dict.get("sow_farm"))
+                if mating_dict.get("sow_birthday") is not None:
+                    sow.set_birthday(mating_dict.get("sow_birthday"))
+            if sow.is_unique():
+                estrus.set_sow(sow)
+            if mating_dict.get("estrus_datetime") is not None:
+                estrus.set_estrus_datetime(mating_dict.get("estrus_datetime"))
         if estrus.is_unique():
             mating.set_estrus(estrus)
-        boar = Pig()
-        if mating_dict.get("boar_id") is not None:
-            boar.set_id(mating_dict.get("boar_id"))
-        if mating_dict.get("boar_farm") is not None:
-            boar.set_farm(mating_dict.get("boar_farm"))
-        if mating_dict.get("boar_birthday") is not None:
-            boar.set_birthday(mating_dict.get("boar_birthday"))
+        boar = self.__mapped("Pigs", (
+            mating_dict.get("boar_id"), 
+            mating_dict.get("boar_birthday"), 
+            mating_dict.get("boar_farm")
+        ))
+        if boar is None:
+            boar = Pig()
+            if mating_dict.get("boar_id") is not None:
+                boar.set_id(mating_dict.get("boar_id"))
+            if mating_dict.get("boar_farm") is not None:
+                boar.set_farm(mating_dict.get("boar_farm"))
+            if mating_dict.get("boar_birthday") is not None:
+                boar.set_birthday(mating_dict.get("boar_birthday"))
         if boar.is_unique():
             mating.set_boar(boar)
         if mating_dict.get("mating_datetime") is not None:
@@ -632,7 +3438,11 @@ class Model():
             smaller: dict = {},
             larger_equal: dict = {},
             smaller_equal: dict = {},
-            order_by: str = None
+            order_by: str = None, 
+            columns: list = None, 
+            limit: int = None, 
+            after: tuple = None, 
+            within: dict = {}
         ) -> list[Mating]:
         """ Find all matings satisfy the conditions. 
 
@@ -647,26 +3457,93 @@ class Model():
         :param smaller: query will be `key`<`value`
         :param larger_equal: query will be `key`>=`value`
         :param smaller_equal: query will be `key`<=`value`
+        :param within: query will be `key` IN (`values`). A tuple key \
+            compares several columns as a row.
         :param order_by: `column_name` `ASC|DESC`
+        :param columns: columns to select. Primary keys are always selected.
+        :param limit: maximum number of results.
+        :param after: values of the `order_by` columns of the last result \
+            from the previous page. Only results after it are returned.
         :raises: TypeError, ValueError.
         """
 
-        sql_query = self.__generate_qeury_string(
+        sql_query, args = self.__generate_qeury_string(
             table_name="Matings", 
             equal=equal, 
             larger=larger, 
             smaller=smaller, 
             larger_equal=larger_equal, 
             smaller_equal=smaller_equal, 
-            order_by=order_by
+            order_by=order_by, 
+            columns=columns, 
+            limit=limit, 
+            after=after, 
+            within=within
         )
-        results = self.__query(sql_query)
+        results = self.__query(sql_query, args)
         matings = []
         for dictionary in results:
             matings.append(self.dict_to_mating(dictionary))
 
         return matings
     
+    def iter_matings(
+        self,
+        equal: dict = {},
+        larger: dict = {},
+        smaller: dict = {},
+        larger_equal: dict = {},
+        smaller_equal: dict = {},
+        order_by: str = None, 
+        chunk_size: int = 1000, 
+        raw: bool = False
+    ) -> Iterator[Mating | dict]:
+        """ Lazily iterate all matings satisfy the conditions with bounded 
+        memory. Empty conditions iterate the whole table.
+
+        Please make sure:
+        * Keys of the dictionary should be same as attributes.
+        * Different conditions will be connected by AND.
+        * Sow should be listed as sow_id, sow_birthday, ...
+        * Boar should be listed as boar_id, boar_birthday, ...
+        
+        :param equal: query will be `key`=`value`
+        :param larger: query will be `key`>`value`
+        :param smaller: query will be `key`<`value`
+        :param larger_equal: query will be `key`>=`value`
+        :param smaller_equal: query will be `key`<=`value`
+        :param order_by: `column_name` `ASC|DESC`
+        :param chunk_size: rows fetched from the server per round trip.
+        :param raw: yield row dicts instead of Mating objects.
+        :raises: TypeError, ValueError.
+        """
+
+        return self.__iter(
+            "Matings", self.dict_to_mating, equal, larger, smaller, 
+            larger_equal, smaller_equal, order_by, chunk_size, raw
+        )
+
+    def find_matings_frame(
+        self, 
+        columns: list = None, 
+        order_by: str = None, 
+        limit: int = None, 
+        chunk_size: int = 10000, 
+        **conditions
+    ) -> pd.DataFrame:
+        """ Same as `find_matings` but return a typed DataFrame of the rows. See 
+        `query_frame`.
+
+        :param columns: columns to select. Primary keys are always selected.
+        :param order_by: `column_name` `ASC|DESC`
+        :param limit: maximum number of rows.
+        :param chunk_size: rows fetched per round trip.
+        :param conditions: equal, larger, smaller, larger_equal, \
+            smaller_equal and within as in `find_matings`.
+        :raises: TypeError, ValueError.
+        """
+        return self.query_frame("Matings", conditions, columns, order_by, limit, chunk_size)
+
     def update_mating(self, mating: Mating) -> None:
         """ Update attributes of a Mating in the database.
 
@@ -682,21 +3559,8 @@ class Model():
             raise ValueError(msg)
 
         attributes = self.__get_mating_attributes(mating)
-        setting = []
-        for key, value in attributes.items():
-            if value is not None:
-                setting.append("{key}='{value}'".format(key=key, value=value))
-        condition = f"sow_id='{mating.get_estrus().get_sow().get_id()}' and "
-        condition += f"sow_birthday='{str(mating.get_estrus().get_sow().get_birthday())}' and "
-        condition += f"sow_farm='{mating.get_estrus().get_sow().get_farm()}' and "
-        condition += f"estrus_datetime='{str(mating.get_estrus().get_estrus_datetime())}' and "
-        condition += f"mating_datetime='{str(mating.get_mating_datetime())}'"
-        sql_query = "UPDATE Matings SET {setting} WHERE {condition};".format(
-            setting=", ".join(setting),
-            condition=condition
-        )
-
-        self.__query(sql_query)
+        sql_query, args = self.__generate_update_string(attributes, "Matings")
+        self.__query(sql_query, args)
 
 
     def dict_to_farrowing(self, farrowing_dict: dict) -> Farrowing:
@@ -712,23 +3576,34 @@ class Model():
 
         type_check(farrowing_dict, "farrowing_dict", dict)
 
-        sow = Pig()
-        estrus = Estrus()
         farrowing = Farrowing()
-
-        # Create sow.
-        if farrowing_dict.get("id") is not None:
-            sow.set_id(farrowing_dict.get("id"))
-        if farrowing_dict.get("birthday") is not None:
-            sow.set_birthday(farrowing_dict.get("birthday"))
-        if farrowing_dict.get("farm") is not None:
-            sow.set_farm(farrowing_dict.get("farm"))
-        if sow.is_unique():
-            estrus.set_sow(sow)
-
-        # Create estrus.
-        if farrowing_dict.get("estrus_datetime") is not None:
-            estrus.set_estrus_datetime(farrowing_dict.get("estrus_datetime"))
+        sow_key = (
+            farrowing_dict.get("id"), 
+            farrowing_dict.get("birthday"), 
+            farrowing_dict.get("farm")
+        )
+        estrus = self.__mapped(
+            "Estrus", sow_key + (farrowing_dict.get("estrus_datetime"),)
+        )
+        if estrus is None:
+            estrus = Estrus()
+
+            # Create sow.
+            sow = self.__mapped("Pigs", sow_key)
+            if sow is None:
+                sow = Pig()
+                if farrowing_dict.get("id") is not None:
+                    sow.set_id(farrowing_dict.get("id"))
+                if farrowing_dict.get("birthday") is not None:
+                    sow.set_birthday(farrowing_dict.get("birthday"))
+                if farrowing_dict.get("farm") is not None:
+                    sow.set_farm(farrowing_dict.get("farm"))
+            if sow.is_unique():
+                estrus.set_sow(sow)
+
+            # Create estrus.
+            if farrowing_dict.get("estrus_datetime") is not None:
+                estrus.set_estrus_datetime(farrowing_dict.get("estrus_datetime"))
         if estrus.is_unique():
             farrowing.set_estrus(estrus)
 
@@ -802,24 +3677,94 @@ class Model():
         
         attributes = self.__get_farrowing_attributes(farrowing)
 
-        # Pick non-empty attributes.
-        columns = []
-        values = []
-        for key, item in attributes.items():
-            if item is not None:
-                columns.append(key)
-                values.append("'{item}'".format(item=str(item)))
-        sql_query = "INSERT INTO Farrowings ({columns}) VALUES ({values});".format(
-            columns=", ".join(columns), 
-            values=", ".join(values)
-        )
+        sql_query, args = self.__generate_insert_string(attributes, "Farrowings")
 
         try:
-            self.__query(sql_query)
+            self.__query(sql_query, args)
         except pymysql.err.IntegrityError:
             msg = "Estrus does not exist in the database."
             msg += f"\n Get {farrowing.get_estrus()}"
             raise KeyError(msg)
+
+    def insert_farrowings(
+        self, 
+        farrowings: Iterable[Farrowing], 
+        chunk_size: int = 500
+    ) -> list[tuple[Farrowing, Exception]]:
+        """Insert many farrowing records to the database in one transaction.
+
+        :param farrowings: unique Farrowing instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (farrowing, error) for records which were not \
+            inserted.
+        """
+
+        farrowings = list(farrowings)
+        for farrowing in farrowings:
+            type_check(farrowing, "farrowing", Farrowing)
+
+        return self.__write_many(
+            "Farrowings", farrowings, self.__get_farrowing_attributes, chunk_size
+        )
+
+    def upsert_farrowing(self, farrowing: Farrowing) -> UpsertStatus:
+        """Insert or update a farrowing record in one statement.
+
+        Non-key attributes of an existing record are overwritten by the 
+        non-empty attributes of `farrowing`.
+
+        :param farrowing: an unique Farrowing.
+        :raises: TypeError, ValueError, KeyError.
+        :return: whether the record was inserted, updated or unchanged.
+        """
+
+        type_check(farrowing, "farrowing", Farrowing)
+        if not farrowing.is_unique():
+            msg = f"farrowing should be unique. Got {farrowing}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        try:
+            return self.__write_one("Farrowings", self.__get_farrowing_attributes(farrowing))
+        except pymysql.err.IntegrityError:
+            msg = "Estrus does not exist in the database."
+            msg += f"\n Get {farrowing}"
+            logging.error(msg)
+            raise KeyError(msg)
+
+    def upsert_farrowings(
+        self, 
+        farrowings: Iterable[Farrowing], 
+        chunk_size: int = 500, 
+        report_changes: bool = False
+    ) -> list[tuple[Farrowing, UpsertStatus | Exception]]:
+        """Insert or update many farrowing records in one transaction.
+
+        :param farrowings: unique Farrowing instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :param report_changes: send rows one by one and report the \
+            UpsertStatus of every row.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (farrowing, error) for records which were not \
+            written, plus (farrowing, UpsertStatus) for the others if \
+            report_changes.
+        """
+
+        farrowings = list(farrowings)
+        for farrowing in farrowings:
+            type_check(farrowing, "farrowing", Farrowing)
+
+        return self.__write_many(
+            "Farrowings", farrowings, self.__get_farrowing_attributes, chunk_size, 
+            upsert=True, report_changes=report_changes
+        )
         
     def find_farrowings(
         self,
@@ -828,7 +3773,12 @@ class Model():
         smaller: dict = {},
         larger_equal: dict = {},
         smaller_equal: dict = {},
-        order_by: str = None
+        order_by: str = None, 
+        columns: list = None, 
+        limit: int = None, 
+        after: tuple = None, 
+        within: dict = {}, 
+        eager: bool = False
     ) -> list[Farrowing]:
         """ Find all farrowings satisfy the conditions. 
 
@@ -842,26 +3792,114 @@ class Model():
         :param smaller: query will be `key`<`value`
         :param larger_equal: query will be `key`>=`value`
         :param smaller_equal: query will be `key`<=`value`
+        :param within: query will be `key` IN (`values`). A tuple key \
+            compares several columns as a row.
         :param order_by: `column_name` `ASC|DESC`
+        :param columns: columns to select. Primary keys are always selected.
+        :param limit: maximum number of results.
+        :param after: values of the `order_by` columns of the last result \
+            from the previous page. Only results after it are returned.
+        :param eager: load the whole estrus and sow in the same query \
+            through JOIN, instead of key-only stubs. Can not be used with \
+            `columns`.
         :raises: TypeError, ValueError.
         """
-        sql_query = self.__generate_qeury_string(
+
+        type_check(eager, "eager", bool)
+        if eager:
+            return [
+                self.__link_farrowing(parts) for parts in self.__query_lineage(
+                    "Farrowings", equal, larger, smaller, larger_equal, smaller_equal, 
+                    order_by, columns, limit, after, within
+                )
+            ]
+
+        sql_query, args = self.__generate_qeury_string(
             table_name="Farrowings", 
             equal=equal, 
             larger=larger, 
             smaller=smaller, 
             larger_equal=larger_equal, 
             smaller_equal=smaller_equal, 
-            order_by=order_by
+            order_by=order_by, 
+            columns=columns, 
+            limit=limit, 
+            after=after, 
+            within=within
         )
 
-        results = self.__query(sql_query)
+        results = self.__query(sql_query, args)
         estrus = []
         for dictionary in results:
             estrus.append(self.dict_to_farrowing(dictionary))
 
         return estrus
     
+    def find_farrowings_with_lineage(self, **conditions) -> list[Farrowing]:
+        """ Find farrowings with their whole estrus and sow in one query. 
+        Same as `find_farrowings(..., eager=True)`.
+
+        :param conditions: keyword arguments of `find_farrowings`.
+        :raises: TypeError, ValueError.
+        """
+        return self.find_farrowings(eager=True, **conditions)
+
+    def iter_farrowings(
+        self,
+        equal: dict = {},
+        larger: dict = {},
+        smaller: dict = {},
+        larger_equal: dict = {},
+        smaller_equal: dict = {},
+        order_by: str = None, 
+        chunk_size: int = 1000, 
+        raw: bool = False
+    ) -> Iterator[Farrowing | dict]:
+        """ Lazily iterate all farrowings satisfy the conditions with bounded 
+        memory. Empty conditions iterate the whole table.
+
+        Please make sure:
+        * Keys of the dictionary should be same as attributes.
+        * Different conditions will be connected by AND.
+        * Sow should be listed as id, birthday, ...
+        
+        :param equal: query will be `key`=`value`
+        :param larger: query will be `key`>`value`
+        :param smaller: query will be `key`<`value`
+        :param larger_equal: query will be `key`>=`value`
+        :param smaller_equal: query will be `key`<=`value`
+        :param order_by: `column_name` `ASC|DESC`
+        :param chunk_size: rows fetched from the server per round trip.
+        :param raw: yield row dicts instead of Farrowing objects.
+        :raises: TypeError, ValueError.
+        """
+
+        return self.__iter(
+            "Farrowings", self.dict_to_farrowing, equal, larger, smaller, 
+            larger_equal, smaller_equal, order_by, chunk_size, raw
+        )
+
+    def find_farrowings_frame(
+        self, 
+        columns: list = None, 
+        order_by: str = None, 
+        limit: int = None, 
+        chunk_size: int = 10000, 
+        **conditions
+    ) -> pd.DataFrame:
+        """ Same as `find_farrowings` but return a typed DataFrame of the rows. See 
+        `query_frame`.
+
+        :param columns: columns to select. Primary keys are always selected.
+        :param order_by: `column_name` `ASC|DESC`
+        :param limit: maximum number of rows.
+        :param chunk_size: rows fetched per round trip.
+        :param conditions: equal, larger, smaller, larger_equal, \
+            smaller_equal and within as in `find_farrowings`.
+        :raises: TypeError, ValueError.
+        """
+        return self.query_frame("Farrowings", conditions, columns, order_by, limit, chunk_size)
+
     def update_farrowing(self, farrowing: Farrowing) -> None:
         """ Update attributes of a farrowing in the database.
 
@@ -877,20 +3915,8 @@ class Model():
             raise ValueError(msg)
 
         attributes = self.__get_farrowing_attributes(farrowing)
-        setting = []
-        for key, value in attributes.items():
-            if value is not None:
-                setting.append("{key}='{value}'".format(key=key, value=value))
-        condition = f"id='{farrowing.get_estrus().get_sow().get_id()}' and "
-        condition += f"birthday='{str(farrowing.get_estrus().get_sow().get_birthday())}' and "
-        condition += f"farm='{farrowing.get_estrus().get_sow().get_farm()}' and "
-        condition += f"estrus_datetime='{str(farrowing.get_estrus().get_estrus_datetime())}'"
-        sql_query = "UPDATE Farrowings SET {setting} WHERE {condition};".format(
-            setting=", ".join(setting),
-            condition=condition
-        )
-
-        self.__query(sql_query)
+        sql_query, args = self.__generate_update_string(attributes, "Farrowings")
+        self.__query(sql_query, args)
 
     def dict_to_weaning(self, weaning_dict: dict) -> Weaning:
         """Transform a dictionary from query to an unique Weaning instance.
@@ -905,18 +3931,27 @@ class Model():
 
         type_check(weaning_dict, "weaning_dict", dict)
 
-        sow = Pig(
-            id=weaning_dict.get("id"), 
-            farm=weaning_dict.get("farm"), 
-            birthday=weaning_dict.get("birthday")
-        )
-        if not sow.is_unique():
-            return None
-        
-        estrus = Estrus(
-            sow=sow, 
-            estrus_datetime=weaning_dict.get("estrus_datetime")
+        sow_key = (
+            weaning_dict.get("id"), 
+            weaning_dict.get("birthday"), 
+            weaning_dict.get("farm")
         )
+        estrus = self.__mapped("Estrus", sow_key + (weaning_dict.get("estrus_datetime"),))
+        if estrus is None:
+            sow = self.__mapped("Pigs", sow_key)
+            if sow is None:
+                sow = Pig(
+                    id=weaning_dict.get("id"), 
+                    farm=weaning_dict.get("farm"), 
+                    birthday=weaning_dict.get("birthday")
+                )
+            if not sow.is_unique():
+                return None
+            
+            estrus = Estrus(
+                sow=sow, 
+                estrus_datetime=weaning_dict.get("estrus_datetime")
+            )
         if not estrus.is_unique():
             return None
         
@@ -978,14 +4013,93 @@ class Model():
             raise ValueError(msg)
         
         attributes = self.__get_weaning_attributes(weaning)
-        sql_query = self.__generate_insert_string(attributes, "Weanings")
+        sql_query, args = self.__generate_insert_string(attributes, "Weanings")
 
         try:
-            self.__query(sql_query)
+            self.__query(sql_query, args)
         except pymysql.err.IntegrityError:
             msg = "Farrowing does not exist in the database."
             msg += f"\n Get {weaning.get_farrowing()}"
             raise KeyError(msg)
+
+    def insert_weanings(
+        self, 
+        weanings: Iterable[Weaning], 
+        chunk_size: int = 500
+    ) -> list[tuple[Weaning, Exception]]:
+        """Insert many weaning records to the database in one transaction.
+
+        :param weanings: unique Weaning instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (weaning, error) for records which were not inserted.
+        """
+
+        weanings = list(weanings)
+        for weaning in weanings:
+            type_check(weaning, "weaning", Weaning)
+
+        return self.__write_many(
+            "Weanings", weanings, self.__get_weaning_attributes, chunk_size
+        )
+
+    def upsert_weaning(self, weaning: Weaning) -> UpsertStatus:
+        """Insert or update a weaning record in one statement.
+
+        Non-key attributes of an existing record are overwritten by the 
+        non-empty attributes of `weaning`.
+
+        :param weaning: an unique Weaning.
+        :raises: TypeError, ValueError, KeyError.
+        :return: whether the record was inserted, updated or unchanged.
+        """
+
+        type_check(weaning, "weaning", Weaning)
+        if not weaning.is_unique():
+            msg = f"weaning should be unique. Got {weaning}."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        try:
+            return self.__write_one("Weanings", self.__get_weaning_attributes(weaning))
+        except pymysql.err.IntegrityError:
+            msg = "Farrowing does not exist in the database."
+            msg += f"\n Get {weaning}"
+            logging.error(msg)
+            raise KeyError(msg)
+
+    def upsert_weanings(
+        self, 
+        weanings: Iterable[Weaning], 
+        chunk_size: int = 500, 
+        report_changes: bool = False
+    ) -> list[tuple[Weaning, UpsertStatus | Exception]]:
+        """Insert or update many weaning records in one transaction.
+
+        :param weanings: unique Weaning instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :param report_changes: send rows one by one and report the \
+            UpsertStatus of every row.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (weaning, error) for records which were not \
+            written, plus (weaning, UpsertStatus) for the others if \
+            report_changes.
+        """
+
+        weanings = list(weanings)
+        for weaning in weanings:
+            type_check(weaning, "weaning", Weaning)
+
+        return self.__write_many(
+            "Weanings", weanings, self.__get_weaning_attributes, chunk_size, 
+            upsert=True, report_changes=report_changes
+        )
         
     def find_weanings(
         self,
@@ -994,7 +4108,12 @@ class Model():
         smaller: dict = {},
         larger_equal: dict = {},
         smaller_equal: dict = {},
-        order_by: str = None
+        order_by: str = None, 
+        columns: list = None, 
+        limit: int = None, 
+        after: tuple = None, 
+        within: dict = {}, 
+        eager: bool = False
     ) -> list[Weaning]:
         """ Find all weanings satisfy the conditions. 
 
@@ -1008,27 +4127,114 @@ class Model():
         :param smaller: query will be `key`<`value`
         :param larger_equal: query will be `key`>=`value`
         :param smaller_equal: query will be `key`<=`value`
+        :param within: query will be `key` IN (`values`). A tuple key \
+            compares several columns as a row.
         :param order_by: `column_name` `ASC|DESC`
+        :param columns: columns to select. Primary keys are always selected.
+        :param limit: maximum number of results.
+        :param after: values of the `order_by` columns of the last result \
+            from the previous page. Only results after it are returned.
+        :param eager: load the whole farrowing, estrus and sow in the same query \
+            through JOIN, instead of key-only stubs. Can not be used with \
+            `columns`.
         :raises: TypeError, ValueError.
         """
 
-        sql_query = self.__generate_qeury_string(
+        type_check(eager, "eager", bool)
+        if eager:
+            return [
+                self.__link_weaning(parts) for parts in self.__query_lineage(
+                    "Weanings", equal, larger, smaller, larger_equal, smaller_equal, 
+                    order_by, columns, limit, after, within
+                )
+            ]
+
+        sql_query, args = self.__generate_qeury_string(
             table_name="Weanings", 
             equal=equal, 
             larger=larger, 
             smaller=smaller, 
             larger_equal=larger_equal, 
             smaller_equal=smaller_equal, 
-            order_by=order_by
+            order_by=order_by, 
+            columns=columns, 
+            limit=limit, 
+            after=after, 
+            within=within
         )
 
-        results = self.__query(sql_query)
+        results = self.__query(sql_query, args)
         weanings = []
         for dictionary in results:
             weanings.append(self.dict_to_weaning(dictionary))
 
         return weanings
     
+    def find_weanings_with_lineage(self, **conditions) -> list[Weaning]:
+        """ Find weanings with their whole farrowing, estrus and sow in one 
+        query. Same as `find_weanings(..., eager=True)`.
+
+        :param conditions: keyword arguments of `find_weanings`.
+        :raises: TypeError, ValueError.
+        """
+        return self.find_weanings(eager=True, **conditions)
+
+    def iter_weanings(
+        self,
+        equal: dict = {},
+        larger: dict = {},
+        smaller: dict = {},
+        larger_equal: dict = {},
+        smaller_equal: dict = {},
+        order_by: str = None, 
+        chunk_size: int = 1000, 
+        raw: bool = False
+    ) -> Iterator[Weaning | dict]:
+        """ Lazily iterate all weanings satisfy the conditions with bounded 
+        memory. Empty conditions iterate the whole table.
+
+        Please make sure:
+        * Keys of the dictionary should be same as attributes.
+        * Different conditions will be connected by AND.
+        * Sow should be listed as id, birthday, ...
+        
+        :param equal: query will be `key`=`value`
+        :param larger: query will be `key`>`value`
+        :param smaller: query will be `key`<`value`
+        :param larger_equal: query will be `key`>=`value`
+        :param smaller_equal: query will be `key`<=`value`
+        :param order_by: `column_name` `ASC|DESC`
+        :param chunk_size: rows fetched from the server per round trip.
+        :param raw: yield row dicts instead of Weaning objects.
+        :raises: TypeError, ValueError.
+        """
+
+        return self.__iter(
+            "Weanings", self.dict_to_weaning, equal, larger, smaller, 
+            larger_equal, smaller_equal, order_by, chunk_size, raw
+        )
+
+    def find_weanings_frame(
+        self, 
+        columns: list = None, 
+        order_by: str = None, 
+        limit: int = None, 
+        chunk_size: int = 10000, 
+        **conditions
+    ) -> pd.DataFrame:
+        """ Same as `find_weanings` but return a typed DataFrame of the rows. See 
+        `query_frame`.
+
+        :param columns: columns to select. Primary keys are always selected.
+        :param order_by: `column_name` `ASC|DESC`
+        :param limit: maximum number of rows.
+        :param chunk_size: rows fetched per round trip.
+        :param conditions: equal, larger, smaller, larger_equal, \
+            smaller_equal and within as in `find_weanings`.
+        :raises: TypeError, ValueError.
+        """
+        return self.query_frame("Weanings", conditions, columns, order_by, limit, chunk_size)
+
     def update_weaning(self, weaning: Weaning) -> None:
         """ Update attributes of a Weaning in the database.
 
@@ -1044,22 +4250,8 @@ class Model():
             raise ValueError(msg)
         
         attributes = self.__get_weaning_attributes(weaning)
-        setting = []
-        for key, value in attributes.items():
-            if value is not None:
-                setting.append("{key}='{value}'".format(key=key, value=value))
-        id = weaning.get_farrowing().get_estrus().get_sow().get_id()
-        birthday = weaning.get_farrowing().get_estrus().get_sow().get_birthday()
-        farm = weaning.get_farrowing().get_estrus().get_sow().get_farm()
-        estrus_datetime = weaning.get_farrowing().get_estrus().get_estrus_datetime()
-        condition = f"id='{id}' and birthday='{str(birthday)}' and farm='{farm}' "
-        condition += f"and estrus_datetime='{str(estrus_datetime)}' "
-        sql_query = "UPDATE Weanings SET {setting} WHERE {condition};".format(
-            setting=", ".join(setting),
-            condition=condition
-        )
-
-        self.__query(sql_query)
+        sql_query, args = self.__generate_update_string(attributes, "Weanings")
+        self.__query(sql_query, args)
 
     def dict_to_individual(self, individual_dict: dict) -> Individual:
         """Transform a dictionary from query to an unique Individual instance.
@@ -1083,18 +4275,29 @@ class Model():
             gender=individual_dict.get("gender")
         )
 
-        birth_sow = Pig(
-            id=individual_dict.get("birth_sow_id"), 
-            farm=individual_dict.get("birth_sow_farm"), 
-            birthday=individual_dict.get("birth_sow_birthday")
+        birth_sow_key = (
+            individual_dict.get("birth_sow_id"), 
+            individual_dict.get("birth_sow_birthday"), 
+            individual_dict.get("birth_sow_farm")
         )
-        if not birth_sow.is_unique():
-            return None
-        
-        birth_estrus = Estrus(
-            sow=birth_sow, 
-            estrus_datetime=individual_dict.get("birth_estrus_datetime")
+        birth_estrus = self.__mapped(
+            "Estrus", birth_sow_key + (individual_dict.get("birth_estrus_datetime"),)
         )
+        if birth_estrus is None:
+            birth_sow = self.__mapped("Pigs", birth_sow_key)
+            if birth_sow is None:
+                birth_sow = Pig(
+                    id=individual_dict.get("birth_sow_id"), 
+                    farm=individual_dict.get("birth_sow_farm"), 
+                    birthday=individual_dict.get("birth_sow_birthday")
+                )
+            if not birth_sow.is_unique():
+                return None
+            
+            birth_estrus = Estrus(
+                sow=birth_sow, 
+                estrus_datetime=individual_dict.get("birth_estrus_datetime")
+            )
         if not birth_estrus.is_unique():
             return None
         
@@ -1107,17 +4310,28 @@ class Model():
         individual.set_birth_litter(birth_farrowing)
 
         try:
-            nurse_sow = Pig(
-                id=individual_dict.get("nurse_sow_id"), 
-                farm=individual_dict.get("nurse_sow_farm"), 
-                birthday=individual_dict.get("nurse_sow_birthday")
+            nurse_sow_key = (
+                individual_dict.get("nurse_sow_id"), 
+                individual_dict.get("nurse_sow_birthday"), 
+                individual_dict.get("nurse_sow_farm")
             )
-            if not nurse_sow.is_unique():
-                raise ZeroDivisionError()
-            nurse_estrus = Estrus(
-                sow=nurse_sow, 
-                estrus_datetime=individual_dict.get("nurse_estrus_datetime")
+            nurse_estrus = self.__mapped(
+                "Estrus", nurse_sow_key + (individual_dict.get("nurse_estrus_datetime"),)
             )
+            if nurse_estrus is None:
+                nurse_sow = self.__mapped("Pigs", nurse_sow_key)
+                if nurse_sow is None:
+                    nurse_sow = Pig(
+                        id=individual_dict.get("nurse_sow_id"), 
+                        farm=individual_dict.get("nurse_sow_farm"), 
+                        birthday=individual_dict.get("nurse_sow_birthday")
+                    )
+                if not nurse_sow.is_unique():
+                    raise ZeroDivisionError()
+                nurse_estrus = Estrus(
+                    sow=nurse_sow, 
+                    estrus_datetime=individual_dict.get("nurse_estrus_datetime")
+                )
             if not nurse_estrus.is_unique():
                 raise ZeroDivisionError()
             nurse_weaning = Weaning(farrowing=Farrowing(estrus=nurse_estrus))
@@ -1189,13 +4403,93 @@ class Model():
             raise ValueError(msg)
         
         attributes = self.__get_individual_attributes(individual)
-        sql_query = self.__generate_insert_string(attributes, "Individuals")
+        sql_query, args = self.__generate_insert_string(attributes, "Individuals")
+
+        try:
+            self.__query(sql_query, args)
+        except pymysql.err.IntegrityError:
+            msg = "Litter does not exist in the database."
+            raise KeyError(msg)
+
+    def insert_individuals(
+        self, 
+        individuals: Iterable[Individual], 
+        chunk_size: int = 500
+    ) -> list[tuple[Individual, Exception]]:
+        """Insert many individual records to the database in one transaction.
+
+        :param individuals: unique Individual instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (individual, error) for records which were not \
+            inserted.
+        """
+
+        individuals = list(individuals)
+        for individual in individuals:
+            type_check(individual, "individual", Individual)
+
+        return self.__write_many(
+            "Individuals", individuals, self.__get_individual_attributes, chunk_size
+        )
+
+    def upsert_individual(self, individual: Individual) -> UpsertStatus:
+        """Insert or update an individual record in one statement.
+
+        Non-key attributes of an existing record are overwritten by the 
+        non-empty attributes of `individual`.
+
+        :param individual: an unique Individual.
+        :raises: TypeError, ValueError, KeyError.
+        :return: whether the record was inserted, updated or unchanged.
+        """
+
+        type_check(individual, "individual", Individual)
+        if not individual.is_unique():
+            msg = f"individual should be unique. Got {individual}."
+            logging.error(msg)
+            raise ValueError(msg)
 
         try:
-            self.__query(sql_query)
+            return self.__write_one("Individuals", self.__get_individual_attributes(individual))
         except pymysql.err.IntegrityError:
             msg = "Litter does not exist in the database."
+            msg += f"\n Get {individual}"
+            logging.error(msg)
             raise KeyError(msg)
+
+    def upsert_individuals(
+        self, 
+        individuals: Iterable[Individual], 
+        chunk_size: int = 500, 
+        report_changes: bool = False
+    ) -> list[tuple[Individual, UpsertStatus | Exception]]:
+        """Insert or update many individual records in one transaction.
+
+        :param individuals: unique Individual instances.
+        :param chunk_size: maximum rows per INSERT statement.
+        :param report_changes: send rows one by one and report the \
+            UpsertStatus of every row.
+        :raises TypeError: if a record is not an instance of its class or \
+            chunk_size is not an int.
+        :raises ValueError: if chunk_size is smaller than 1. A record which \
+            is not unique is not raised, it is returned with a ValueError.
+        :return: a list of (individual, error) for records which were not \
+            written, plus (individual, UpsertStatus) for the others if \
+            report_changes.
+        """
+
+        individuals = list(individuals)
+        for individual in individuals:
+            type_check(individual, "individual", Individual)
+
+        return self.__write_many(
+            "Individuals", individuals, self.__get_individual_attributes, chunk_size, 
+            upsert=True, report_changes=report_changes
+        )
         
     def find_individuals(
         self,
@@ -1204,7 +4498,12 @@ class Model():
         smaller: dict = {},
         larger_equal: dict = {},
         smaller_equal: dict = {},
-        order_by: str = None
+        order_by: str = None, 
+        columns: list = None, 
+        limit: int = None, 
+        after: tuple = None, 
+        within: dict = {}, 
+        eager: bool = False
     ) -> list[Individual]:
         """ Find all individuals satisfy the conditions. 
 
@@ -1218,27 +4517,105 @@ class Model():
         :param smaller: query will be `key`<`value`
         :param larger_equal: query will be `key`>=`value`
         :param smaller_equal: query will be `key`<=`value`
+        :param within: query will be `key` IN (`values`). A tuple key \
+            compares several columns as a row.
         :param order_by: `column_name` `ASC|DESC`
+        :param columns: columns to select. Primary keys are always selected.
+        :param limit: maximum number of results.
+        :param after: values of the `order_by` columns of the last result \
+            from the previous page. Only results after it are returned.
+        :param eager: load the whole birth and nurse litters with their estrus and sows in the same query \
+            through JOIN, instead of key-only stubs. Can not be used with \
+            `columns`.
         :raises: TypeError, ValueError.
         """
 
-        sql_query = self.__generate_qeury_string(
+        type_check(eager, "eager", bool)
+        if eager:
+            return [
+                self.__link_individual(parts) for parts in self.__query_lineage(
+                    "Individuals", equal, larger, smaller, larger_equal, smaller_equal, 
+                    order_by, columns, limit, after, within
+                )
+            ]
+
+        sql_query, args = self.__generate_qeury_string(
             table_name="Individuals", 
             equal=equal, 
             larger=larger, 
             smaller=smaller, 
             larger_equal=larger_equal, 
             smaller_equal=smaller_equal, 
-            order_by=order_by
+            order_by=order_by, 
+            columns=columns, 
+            limit=limit, 
+            after=after, 
+            within=within
         )
 
-        results = self.__query(sql_query)
+        results = self.__query(sql_query, args)
         weanings = []
         for dictionary in results:
             weanings.append(self.dict_to_individual(dictionary))
 
         return weanings
 
+    def iter_individuals(
+        self,
+        equal: dict = {},
+        larger: dict = {},
+        smaller: dict = {},
+        larger_equal: dict = {},
+        smaller_equal: dict = {},
+        order_by: str = None, 
+        chunk_size: int = 1000, 
+        raw: bool = False
+    ) -> Iterator[Individual | dict]:
+        """ Lazily iterate all individuals satisfy the conditions with bounded 
+        memory. Empty conditions iterate the whole table.
+
+        Please make sure:
+        * Keys of the dictionary should be same as attributes.
+        * Different conditions will be connected by AND.
+        * Sow should be listed as id, birthday, ...
+        
+        :param equal: query will be `key`=`value`
+        :param larger: query will be `key`>`value`
+        :param smaller: query will be `key`<`value`
+        :param larger_equal: query will be `key`>=`value`
+        :param smaller_equal: query will be `key`<=`value`
+        :param order_by: `column_name` `ASC|DESC`
+        :param chunk_size: rows fetched from the server per round trip.
+        :param raw: yield row dicts instead of Individual objects.
+        :raises: TypeError, ValueError.
+        """
+
+        return self.__iter(
+            "Individuals", self.dict_to_individual, equal, larger, smaller, 
+            larger_equal, smaller_equal, order_by, chunk_size, raw
+        )
+
+    def find_individuals_frame(
+        self, 
+        columns: list = None, 
+        order_by: str = None, 
+        limit: int = None, 
+        chunk_size: int = 10000, 
+        **conditions
+    ) -> pd.DataFrame:
+        """ Same as `find_individuals` but return a typed DataFrame of the rows. See 
+        `query_frame`.
+
+        :param columns: columns to select. Primary keys are always selected.
+        :param order_by: `column_name` `ASC|DESC`
+        :param limit: maximum number of rows.
+        :param chunk_size: rows fetched per round trip.
+        :param conditions: equal, larger, smaller, larger_equal, \
+            smaller_equal and within as in `find_individuals`.
+        :raises: TypeError, ValueError.
+        """
+        return self.query_frame("Individuals", conditions, columns, order_by, limit, chunk_size)
+
     def update_individual(self, individual: Individual) -> None:
         """ Update attributes of an Individual in the database.
 
@@ -1254,23 +4631,5 @@ class Model():
             raise ValueError(msg)
         
         attributes = self.__get_individual_attributes(individual)
-        setting = []
-        for key, value in attributes.items():
-            if value is not None:
-                setting.append("{key}='{value}'".format(key=key, value=value))
-        estrus = individual.get_birth_litter().get_estrus()
-        id = estrus.get_sow().get_id()
-        birthday = estrus.get_sow().get_birthday()
-        farm = estrus.get_sow().get_farm()
-        estrus_datetime = estrus.get_estrus_datetime()
-        in_litter_id = individual.get_in_litter_id()
-        condition = f"birth_sow_id='{id}' and birth_sow_birthday="
-        condition += f"'{str(birthday)}' and birth_sow_farm='{farm}' and "
-        condition += f"birth_estrus_datetime='{str(estrus_datetime)}' and "
-        condition += f"in_litter_id='{in_litter_id}'"
-        sql_query = "UPDATE Individuals SET {setting} WHERE {condition};".format(
-            setting=", ".join(setting),
-            condition=condition
-        )
-
-        self.__query(sql_query)
+        sql_query, args = self.__generate_update_string(attributes, "Individuals")
+        self.__query(sql_query, args)
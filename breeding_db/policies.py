@@ -0,0 +1,141 @@
+"""Policies resolving conflicts of imports without asking the user."""
+
+__all__ = [
+    "ConflictPolicy",
+    "AlwaysUpdatePolicy",
+    "NeverUpdatePolicy",
+    "NewestWinsPolicy",
+    "ReviewPolicy"
+]
+
+import os
+import logging
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+from breeding_db.general import type_check
+
+
+class ConflictPolicy(ABC):
+    """ Decide conflicts found by `ExcelReader` in bulk, instead of asking \
+    the user row by row.
+
+    Conflicts are collected while a sheet is read, and each method is \
+    called once per kind of conflict with all of them.
+    """
+
+    @abstractmethod
+    def resolve_updates(self, name: str, conflicts: list[tuple]) -> list[bool]:
+        """ Decide whether existing records are updated by the records read.
+
+        :param name: name of the records, e.g. "豬隻".
+        :param conflicts: (record read, existing record) pairs which differ.
+        :return: for every conflict, True to update the existing record, \
+            False to keep it and report the record read.
+        """
+
+    @abstractmethod
+    def resolve_matches(self, name: str, matches: list[tuple]) -> list[int | None]:
+        """ Choose one of several records matching a reference of a record \
+        read, e.g. sires with the same id and breed.
+
+        :param name: name of the reference, e.g. "父畜".
+        :param matches: (record read, matching records) pairs.
+        :return: for every pair, the index of the chosen matching record, \
+            or None to report the record read.
+        """
+
+
+class AlwaysUpdatePolicy(ConflictPolicy):
+    """ Update every existing record. Ambiguous matches are reported."""
+
+    def resolve_updates(self, name: str, conflicts: list[tuple]) -> list[bool]:
+        return [True] * len(conflicts)
+
+    def resolve_matches(self, name: str, matches: list[tuple]) -> list[int | None]:
+        return [None] * len(matches)
+
+
+class NeverUpdatePolicy(ConflictPolicy):
+    """ Keep every existing record and report the records read. Ambiguous \
+    matches are reported.
+    """
+
+    def resolve_updates(self, name: str, conflicts: list[tuple]) -> list[bool]:
+        return [False] * len(conflicts)
+
+    def resolve_matches(self, name: str, matches: list[tuple]) -> list[int | None]:
+        return [None] * len(matches)
+
+
+class NewestWinsPolicy(AlwaysUpdatePolicy):
+    """ The newest data wins: records read always update existing records, \
+    and the youngest pig is chosen among ambiguous matches, like readers \
+    choose the youngest sow of an id.
+    """
+
+    def resolve_matches(self, name: str, matches: list[tuple]) -> list[int | None]:
+        return [
+            max(range(len(options)), key=lambda i: options[i].get_birthday())
+            for _, options in matches
+        ]
+
+
+class ReviewPolicy(ConflictPolicy):
+
+    def __init__(self, path: str):
+        """ Defer every conflict to a review csv. Existing records are kept \
+        and ambiguous matches are left unresolved, so the records read are \
+        also in the report of the reader.
+
+        Conflicts of all sheets are appended to the same csv, one row per \
+        conflict with columns "項目", "讀到的資料" and "已有的資料". \
+        Matching records are numbered in the last column.
+
+        :param path: path of the review csv, including filename.
+        :raises: TypeError, FileNotFoundError.
+        """
+
+        type_check(path, "path", str)
+        directory = os.path.dirname(path)
+        if directory != "" and not os.path.isdir(directory):
+            msg = f"Directory {directory} does not exist."
+            logging.error(msg)
+            raise FileNotFoundError(msg)
+        self.__path = path
+
+    def __save(self, rows: list[dict]) -> None:
+        """ Append rows to the review csv, with a header if it is new."""
+
+        if len(rows) == 0:
+            return
+        pd.DataFrame(rows).to_csv(
+            self.__path,
+            mode="a",
+            header=not os.path.isfile(self.__path),
+            index=False
+        )
+
+    def resolve_updates(self, name: str, conflicts: list[tuple]) -> list[bool]:
+        self.__save([
+            {"項目": name, "讀到的資料": str(record), "已有的資料": str(found)}
+            for record, found in conflicts
+        ])
+        return [False] * len(conflicts)
+
+    def resolve_matches(self, name: str, matches: list[tuple]) -> list[int | None]:
+        self.__save([
+            {
+                "項目": name,
+                "讀到的資料": str(record),
+                "已有的資料": "\n".join(
+                    f"{i}: {option}" for i, option in enumerate(options)
+                )
+            }
+            for record, options in matches
+        ])
+        return [None] * len(matches)
+
+    def get_path(self) -> str:
+        return self.__path
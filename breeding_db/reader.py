@@ -1,31 +1,572 @@
-"""Read data from excel, create instances, insert them into db and create 
+"""Read data from excel, create instances, insert them into db and create
 report csv file.
 """
 import os
 import logging
 from datetime import timedelta
+from collections.abc import Iterator
 
 import pandas as pd
 
 from breeding_db.general import ask, ask_multiple, type_check
 from breeding_db.models import Model
+from breeding_db.indexes import HerdIndex, SowTimeline
+from breeding_db.linking import LinkStatus, link_latest
+from breeding_db.policies import ConflictPolicy
 from breeding_db.data_structures import Farrowing, Weaning, Individual
 from breeding_db.data_structures import Pig, Estrus, Mating, PregnantStatus
 
 
+class Candidate():
+
+    def __init__(self, index, row: dict, record):
+        """ A record read from a row of a sheet, waiting to be written.
+
+        Stages of an import add references found in the row and errors to \
+        the candidate. Only candidates without error are written.
+
+        :param index: index of the row in the sheet.
+        :param row: the row, with column names of the sheet.
+        :param record: the record created from the row, e.g. a Pig.
+        """
+
+        self.__index = index
+        self.__row = row
+        self.__record = record
+        self.__references = {}
+        self.__errors = []
+
+    def __str__(self) -> str:
+        return f"Candidate {self.__index}: {self.__record}, errors: {self.__errors}"
+
+    def get_index(self):
+        return self.__index
+
+    def get_row(self) -> dict:
+        return dict(self.__row)
+
+    def get_record(self):
+        return self.__record
+
+    def set_reference(self, name: str, value) -> None:
+        """ Keep a value read from the row which is resolved later, e.g. the \
+        tag of a sow.
+        """
+
+        type_check(name, "name", str)
+        self.__references[name] = value
+
+    def get_reference(self, name: str):
+        return self.__references.get(name)
+
+    def add_error(self, message: str) -> None:
+        type_check(message, "message", str)
+        self.__errors.append(message)
+
+    def get_errors(self) -> list[str]:
+        return list(self.__errors)
+
+    def is_valid(self) -> bool:
+        return len(self.__errors) == 0
+
+
 class ExcelReader():
-    
-    def __init__(self, path: str) -> None:
+
+    # Rows written together. A failed import keeps the committed batches,
+    # which are found as existing data when the import is run again.
+    BATCH_SIZE = 500
+
+    # Columns of the sheets and their names in the readers.
+    PIG_COLUMNS = {
+        "品種": "Breed",
+        "耳號": "ID",
+        "生日": "Birthday",
+        "父畜": "Sire",
+        "母畜": "Dam",
+        "登錄號": "reg_id",
+        "中文名": "Chinese_name",
+        "性別": "Gender",
+        "出生胎次": "litter"
+    }
+    ESTRUS_COLUMNS = {
+        "出生年品種耳號": "ID",
+        "胎次": "Parity",
+        "發情日期": "Estrus_date",
+        "發情時間": "Estrus_time",
+        "21天測孕": "21th_day_test",
+        "60天測孕": "60th_day_test"
+    }
+    MATING_COLUMNS = {
+        "出生年品種耳號": "SOW_ID",
+        "胎次": "Parity",
+        "配種日期": "Estrus_date",
+        "配種時間": "Estrus_time",
+        "與配公豬": "BOAR_ID"
+    }
+    FARROWING_COLUMNS = {
+        "出生年品種耳號": "birthyear_breed_id",
+        "分娩日期": "farrowing_date",
+        "(公) 小豬": "n_of_male",
+        "(母) 小豬": "n_of_female",
+        "胎號": "litter_id",
+        "壓": "crushed",
+        "黑": "black",
+        "弱": "weak",
+        "畸": "malformation",
+        "死": "dead",
+    }
+    WEANING_COLUMNS = {
+        "出生年品種耳號": "birthyear_breed_id",
+        "離乳日期": "weaning_date",
+        "哺乳數": "total_nursed_piglets",
+        "離乳數": "total_weaning_piglets",
+    }
+    INDIVIDUAL_COLUMNS = {
+        "親生母豬出生年品種耳號": "birth_sow_birthyear_breed_id",
+        "親生母豬胎號": "birth_litter_id",
+        "寄養母豬出生年品種耳號": "nurse_sow_birthyear_breed_id",
+        "寄養母豬胎號": "nurse_litter_id",
+        "小豬序號": "in_litter_id",
+        "性別": "gender",
+        "出生重": "born_weight",
+        "離乳重": "weaning_weight"
+    }
+
+    def __init__(
+            self,
+            path: str,
+            prefetch: bool = False,
+            policy: ConflictPolicy = None
+        ) -> None:
         """Read data from excel and insert data into database.
 
+        Every `read_and_insert_*` runs three stages, which can also be \
+        called one by one:
+        1. `validate_*` reads the sheet into candidates and checks their \
+            formats, without touching the database.
+        2. `resolve_*` finds sows, parents and parent events of the \
+            candidates in bulk.
+        3. `write_*` resolves conflicting duplicates, then writes the \
+            candidates with batched upserts.
+
+        Conflicting duplicates and ambiguous matches, e.g. several possible \
+        sires, are collected while a stage runs and resolved afterwards in \
+        bulk, by `policy` or by asking the user.
+
+        Usage, checking a sheet before importing it:
+        ```
+        candidates = reader.validate_pigs("farm", input_path="pigs.xlsx")
+        print(reader.make_report(candidates))
+        ```
+
         :param path: path to the database settings.
+        :param prefetch: load all pigs and estrus of the farm once per \
+            sheet, instead of the ones referenced by the sheet. Faster for \
+            sheets covering most of the farm.
+        :param policy: resolves conflicts without asking, so that imports \
+            can run unattended, see `breeding_db.policies`. The user is \
+            asked if None.
         """
         type_check(path, "path", str)
+        type_check(prefetch, "prefetch", bool)
+        if policy is not None:
+            type_check(policy, "policy", ConflictPolicy)
         if not os.path.isfile(path):
             msg = f"Path {path} does not exist."
             logging.error(msg)
             raise FileNotFoundError(msg)
         self.model = Model(path)
+        self.prefetch = prefetch
+        self.policy = policy
+
+    def __read_sheet(
+            self,
+            input_path: str | None,
+            dataframe: pd.DataFrame | None,
+            sheet_name: str,
+            columns: dict,
+            required: list = None
+        ) -> pd.DataFrame:
+        """ Read a sheet of the excel or the dataframe, drop empty rows and \
+        rename the columns by `columns`.
+
+        :param input_path: path of the source excel, including filename.
+        :param dataframe: the source dataframe, not modified.
+        :param sheet_name: sheet to read from the excel.
+        :param columns: {name in the sheet: name in the reader}.
+        :param required: renamed columns which must exist, all of them if None.
+        :raises: ValueError, FileNotFoundError, TypeError, KeyError.
+        """
+
+        if input_path is None and dataframe is None:
+            msg = "You must choose to read from an excel file or a dataframe."
+            logging.error(msg)
+            raise ValueError(msg)
+
+        if input_path is not None:
+            type_check(input_path, "input_path", str)
+            if not os.path.isfile(input_path):
+                msg = f"File {input_path} does not exist."
+                logging.error(msg)
+                raise FileNotFoundError(msg)
+            dataframe = pd.read_excel(io=input_path, sheet_name=sheet_name)
+        type_check(dataframe, "dataframe", pd.DataFrame)
+
+        # Standardize the dataframe.
+        dataframe = dataframe.dropna(how="all").rename(columns=columns)
+        if required is None:
+            required = list(columns.values())
+        if not set(required).issubset(dataframe.columns):
+            msg = "Missing key(s) in source excel or DataFrame."
+            logging.error(msg)
+            raise KeyError(msg)
+        return dataframe.astype("object")
+
+    def __new_candidate(
+            self,
+            index,
+            data_row: pd.Series,
+            columns: dict,
+            record
+        ) -> Candidate:
+        """ Create a candidate of a row, with column names of the sheet."""
+
+        names = {value: key for key, value in columns.items()}
+        return Candidate(index, data_row.rename(index=names).to_dict(), record)
+
+    def make_report(self, candidates: list[Candidate]) -> pd.DataFrame:
+        """ Return rows of candidates with errors, with an additional \
+        "錯誤訊息" column.
+
+        :param candidates: candidates of a sheet.
+        """
+
+        rows = []
+        for candidate in candidates:
+            if candidate.is_valid():
+                continue
+            row = candidate.get_row()
+            row["錯誤訊息"] = " ".join(candidate.get_errors())
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+    def __save_report(
+            self,
+            candidates: list[Candidate],
+            output_path: str,
+            output_filename: str
+        ) -> None:
+
+        type_check(output_path, "output_path", str)
+        type_check(output_filename, "output_filename", str)
+        report = self.make_report(candidates)
+        report.to_csv(os.path.join(output_path, output_filename))
+
+    def __batches(self, items: list) -> Iterator[list]:
+        """ Yield slices of `BATCH_SIZE` items."""
+
+        for start in range(0, len(items), self.BATCH_SIZE):
+            yield items[start:start + self.BATCH_SIZE]
+
+    def __find_within(
+            self,
+            find,
+            columns: str | tuple,
+            values: list,
+            **conditions
+        ) -> list:
+        """ Find records whose `columns` are in `values` with `find`, one \
+        query per `BATCH_SIZE` values.
+        """
+
+        values = list(dict.fromkeys(values))
+        found = []
+        for batch in self.__batches(values):
+            found.extend(find(within={columns: batch}, **conditions))
+        return found
+
+    def __index_pigs(self, ids: list[str], farm: str = None) -> HerdIndex:
+        """ Return a `HerdIndex` of pigs with the ids in `farm`, in any farm \
+        if `farm` is None. All pigs of the farm are loaded if prefetch is on.
+
+        Pigs of the sheet can be added to the index, so later rows find them \
+        before they are written.
+        """
+
+        if self.prefetch:
+            return HerdIndex(self.model, farm)
+        herd = HerdIndex(None, farm)
+        equal = {} if farm is None else {"farm": farm}
+        for pig in self.__find_within(self.model.find_pigs, "id", ids, equal=equal):
+            herd.add(pig)
+        return herd
+
+    def __index_estrus(self, sows: list[Pig], farm: str) -> SowTimeline:
+        """ Return a `SowTimeline` of estrus of the sows. All estrus of the \
+        farm are loaded if prefetch is on.
+        """
+
+        if self.prefetch:
+            return SowTimeline(self.model, farm)
+        timeline = SowTimeline(None, farm)
+        keys = [(sow.get_id(), sow.get_birthday(), sow.get_farm()) for sow in sows]
+        for estrus in self.__find_within(
+            self.model.find_estrus, ("id", "birthday", "farm"), keys
+        ):
+            timeline.add(estrus)
+        return timeline
+
+    def __find_sow(
+            self,
+            herd: HerdIndex,
+            birth_year: str | None,
+            breed: str | None,
+            id: str,
+            farm: str
+        ) -> Pig | None:
+        """ Find the youngest sow of an id, with birth year and breed if \
+        they are known. Return None if not found.
+        """
+
+        if birth_year is not None and breed is not None:
+            return herd.find_pig_by_tag(birth_year, breed, id, farm, "F")
+        found = herd.find_pigs(id, farm=farm, gender="F")
+        return found[-1] if len(found) > 0 else None
+
+    def __link_to_sows(
+            self,
+            sows: dict,
+            times: dict,
+            find,
+            sow_of,
+            time_of,
+            tolerance: timedelta = None
+        ) -> dict:
+        """ Link records to the latest parent event of their sow at or \
+        before their time in bulk, see `link_latest`.
+
+        A record may have several possible sows, e.g. all sows of a tag, \
+        and is linked to the latest parent event of any of them.
+
+        Parents of all sows are found with `find` in one query per \
+        `BATCH_SIZE` sows. Windows of the gaps are still checked when the \
+        parent is set.
+
+        :param sows: {key: sow or list of sows} of the records.
+        :param times: {key: time} of the records, with the keys of `sows`.
+        :param find: `find_*` method of the model returning the parents.
+        :param sow_of: function returning the sow of a parent.
+        :param time_of: function returning the time of a parent.
+        :param tolerance: parents further than it are not linked.
+        :return: {key: parent, or None if not found} of the records.
+        """
+
+        if len(sows) == 0:
+            return {}
+
+        # Records with the same sows share a group, parents are repeated in
+        # every group of their sow.
+        groups = {} # sorted keys of sows: group
+        sow_groups = {} # key of a sow: groups
+        records = {}
+        for key, found in sows.items():
+            sow_keys = tuple(sorted({
+                self.__pig_key(sow) for sow in (found if isinstance(found, list) else [found])
+            }))
+            if sow_keys not in groups:
+                groups[sow_keys] = len(groups)
+                for sow_key in sow_keys:
+                    sow_groups.setdefault(sow_key, []).append(groups[sow_keys])
+            records[key] = (groups[sow_keys], times[key])
+        records = pd.DataFrame.from_dict(records, orient="index", columns=["group", "time"])
+        parents = pd.DataFrame(
+            [
+                (group, time_of(parent), parent)
+                for parent in self.__find_within(
+                    find, ("id", "birthday", "farm"), list(sow_groups)
+                )
+                for group in sow_groups.get(self.__pig_key(sow_of(parent)), [])
+            ],
+            columns=["group", "time", "parent"]
+        )
+        links = link_latest(records, parents, ["group"], "time", "time", tolerance=tolerance)
+        return {
+            key: link["parent"] if link["status"] is LinkStatus.LINKED else None
+            for key, link in links.iterrows()
+        }
+
+    def __resolve_updates(self, name: str, conflicts: list[tuple]) -> list[bool]:
+        """ Decide whether existing records are updated by the records \
+        read, see `ConflictPolicy.resolve_updates`.
+        """
+
+        if self.policy is not None:
+            return self.policy.resolve_updates(name, conflicts)
+        decisions = []
+        for record, found in conflicts:
+            msg = f"遇到重複{name}，是否更新資料？Y：更新，N：不更新"
+            msg += f"\n讀到的{name}：{record}"
+            msg += f"\n已有的{name}：{found}"
+            decisions.append(ask(msg))
+        return decisions
+
+    def __resolve_matches(self, name: str, matches: list[tuple]) -> list[int | None]:
+        """ Choose one of several matching records of each record read, \
+        see `ConflictPolicy.resolve_matches`.
+        """
+
+        if self.policy is not None:
+            return self.policy.resolve_matches(name, matches)
+        return [
+            ask_multiple(f"找到多隻可能的{name}，請選擇其中之一", options)
+            for _, options in matches
+        ]
+
+    def __write(
+            self,
+            candidates: list[Candidate],
+            table_name: str,
+            find,
+            key_of,
+            upsert,
+            name: str,
+            update: bool = True
+        ) -> None:
+        """ Write valid candidates, `BATCH_SIZE` records per transaction.
+
+        Existing records are found with `find` in one query per \
+        `BATCH_SIZE` candidates. Candidates equal to an existing record are \
+        skipped, different ones are collected and resolved together before \
+        anything is written.
+
+        A later candidate with the key of an earlier one of the sheet is not \
+        an existing record. It shares the outcome of the earlier one if they \
+        are equal, or if existing records are kept. Otherwise it is reported.
+
+        :param candidates: candidates of a sheet.
+        :param table_name: table of the records, see `Model.PRIMARY_KEYS`.
+        :param find: `find_*` method of the model.
+        :param key_of: function returning the primary key of a record.
+        :param upsert: function writing a list of records, returning \
+            (record, error) of the records not written.
+        :param name: name of the records in messages.
+        :param update: update existing records, otherwise they are kept.
+        """
+
+        valid = [candidate for candidate in candidates if candidate.is_valid()]
+        existing = {}
+        for record in self.__find_within(
+            find,
+            Model.PRIMARY_KEYS[table_name],
+            [key_of(candidate.get_record()) for candidate in valid]
+        ):
+            existing[key_of(record)] = record
+
+        writing = []
+        conflicts = []
+        first = {} # key: first candidate of the key in the sheet
+        repeated = [] # (candidate, first candidate of its key)
+        for candidate in valid:
+            record = candidate.get_record()
+            key = key_of(record)
+            earlier = first.get(key)
+            if earlier is not None:
+                if earlier.get_record() == record or not update:
+                    repeated.append((candidate, earlier))
+                else:
+                    candidate.add_error(f"{name}與表中前面的資料重複且數據不相符")
+                continue
+            first[key] = candidate
+            found = existing.get(key)
+            if found is not None:
+                if found == record or not update:
+                    continue
+                conflicts.append((candidate, found))
+            writing.append(candidate)
+
+        decisions = self.__resolve_updates(
+            name, [(candidate.get_record(), found) for candidate, found in conflicts]
+        )
+        for (candidate, _), decision in zip(conflicts, decisions):
+            if not decision:
+                candidate.add_error(f"{name}已存在於資料庫且與資料庫中數據不相符")
+        # Keep the order of the sheet, parents before their offspring.
+        writing = [candidate for candidate in writing if candidate.is_valid()]
+
+        for batch in self.__batches(writing):
+            by_record = {id(candidate.get_record()): candidate for candidate in batch}
+            with self.model.transaction():
+                failures = upsert([candidate.get_record() for candidate in batch])
+            for record, _ in failures:
+                by_record[id(record)].add_error("寫入資料庫失敗")
+
+        # Repeated rows are reported with their first row.
+        for candidate, earlier in repeated:
+            for error in earlier.get_errors():
+                candidate.add_error(error)
+
+    @staticmethod
+    def __pig_key(pig: Pig) -> tuple:
+        return (pig.get_id(), pig.get_birthday(), pig.get_farm())
+
+    @staticmethod
+    def __estrus_key(estrus: Estrus) -> tuple:
+        sow = estrus.get_sow()
+        return (sow.get_id(), sow.get_birthday(), sow.get_farm(), estrus.get_estrus_datetime())
+
+    def __upsert_pigs(self, pigs: list[Pig]) -> list[tuple[Pig, Exception]]:
+        """ Upsert pigs, parents in the list before their offspring.
+
+        `Model.upsert_pigs` groups rows by their columns, so one call may \
+        write an offspring before its parent. Pigs are written in \
+        generations instead. Parents must be earlier in the list.
+        """
+
+        generations = {}
+        for pig in pigs:
+            generation = 0
+            for parent in (pig.get_sire(), pig.get_dam()):
+                if parent is not None:
+                    generation = max(
+                        generation, generations.get(self.__pig_key(parent), -1) + 1
+                    )
+            generations[self.__pig_key(pig)] = generation
+
+        failures = []
+        for generation in sorted(set(generations.values())):
+            failures.extend(self.model.upsert_pigs([
+                pig for pig in pigs
+                if generations[self.__pig_key(pig)] == generation
+            ]))
+        return failures
+
+    def __upsert_farrowings(
+            self,
+            farrowings: list[Farrowing]
+        ) -> list[tuple[Farrowing, Exception]]:
+        """ Upsert farrowings, then update estrus of the written ones with \
+        born alive piglets to pregnant. A farrowing whose estrus is not \
+        updated is reported as not written.
+        """
+
+        failures = self.model.upsert_farrowings(farrowings)
+        failed = {id(farrowing) for farrowing, _ in failures}
+        pregnant = {}
+        for farrowing in farrowings:
+            if id(farrowing) in failed:
+                continue
+            born_alive = farrowing.get_born_alive()
+            estrus = farrowing.get_estrus()
+            if born_alive is not None and born_alive > 0 \
+                and estrus.get_pregnant() != PregnantStatus.YES:
+                estrus.set_pregnant(PregnantStatus.YES)
+                pregnant[id(estrus)] = farrowing
+        estrus_failures = self.model.upsert_estrus_many(
+            [farrowing.get_estrus() for farrowing in pregnant.values()]
+        )
+        for estrus, error in estrus_failures:
+            failures.append((pregnant[id(estrus)], error))
+        return failures
 
     def __remove_dash_from_id(self, id: str) -> str:
         """ Remove the dash and none numeric characters in an id, and add a 
@@ -116,19 +657,32 @@ class ExcelReader():
 
         return (year, breed, self.__remove_dash_from_id(id))
 
-    def read_and_insert_pigs(
-        self, 
+    def __read_tag(self, tag: str) -> tuple[str | None, str | None, str]:
+        """ Seperate a {birth_year}{breed}{id} tag of a sheet, see \
+        `__seperate_year_breed_id`.
+
+        :param tag: a tag, should be in format {birth_year}{breed}{id}.
+        :raises: TypeError, ValueError if the birth year is not digits.
+        """
+
+        year, breed, id = self.__seperate_year_breed_id(tag)
+        if year is not None and not year.isdigit():
+            msg = f"Birth year of tag {tag} should be digits."
+            logging.error(msg)
+            raise ValueError(msg)
+        return (year, breed, id)
+
+    def validate_pigs(
+        self,
         farm: str,
-        input_path: str = None, 
+        input_path: str = None,
         dataframe: pd.DataFrame = None,
-        output_path: str = os.path.curdir, 
-        output_filename: str = "output.csv",
         allow_none: bool = False
-    ) -> None:
-        """Read pigs data in the source excel or dataframe, insert them into 
-        database and create a report csv containing error data.
+    ) -> list[Candidate]:
+        """Read pigs in the source excel or dataframe into candidates and
+        check their formats, without touching the database.
 
-        Choose reading from excel or dataframe by pathing corresponding 
+        Choose reading from excel or dataframe by pathing corresponding
         parameter.
 
         If read from excel, "基本資料" sheet will be used.
@@ -142,86 +696,42 @@ class ExcelReader():
         6. 登錄號
         7. 中文名
         8. 性別
+        9. 出生胎次
+
+        Candidates are sorted by birthday, so parents come before their
+        offspring.
 
         :param farm: current farm.
-        :param input_path: path of the source csv, including filename.
+        :param input_path: path of the source excel, including filename.
         :param dataframe: the source dataframe.
-        :param output_path: path to save the report.
-        :param output_filename: name of the report.
-        :param allow_none: allow empty non-primary key. 
+        :param allow_none: allow empty non-primary key.
         :raises: ValueError, FileNotFoundError, TypeError, KeyError.
         """
 
-        # Type check.
-        if input_path is None and dataframe is None:
-            msg = "You must choose to read from an excel file or a dataframe."
-            logging.error(msg)
-            raise ValueError(msg)
-        
-        if input_path is not None:
-            type_check(input_path, "input_path", str)
-            if not os.path.isfile(input_path):
-                msg = f"File {input_path} does not exist."
-                logging.error(msg)
-                raise FileNotFoundError(msg)
-            dataframe = pd.read_excel(io=input_path, sheet_name="基本資料")
-
-        if dataframe is not None:
-            type_check(dataframe, "dataframe", pd.DataFrame)
-        
+        dataframe = self.__read_sheet(
+            input_path, dataframe, "基本資料", self.PIG_COLUMNS
+        )
         type_check(farm, "farm", str)
-        type_check(output_path, "output_path", str)
-        type_check(output_filename, "output_filename", str)
         type_check(allow_none, "allow_none", bool)
+        dataframe = dataframe.sort_values(by="Birthday", na_position="first")
 
-        # Standardize the dataframe.
-        dataframe.dropna(how = 'all', inplace = True)
-        dataframe = dataframe.rename(columns={
-            "品種": "Breed", 
-            "耳號": "ID", 
-            "生日": "Birthday", 
-            "父畜": "Sire", 
-            "母畜": "Dam", 
-            "登錄號": "reg_id", 
-            "中文名": "Chinese_name", 
-            "性別": "Gender", 
-            "出生胎次": "litter"
-        })
-        required_columns = [
-            "Breed", 
-            "ID", 
-            "Birthday", 
-            "Sire", 
-            "Dam", 
-            "reg_id", 
-            "Chinese_name", 
-            "Gender", 
-            "litter"
-        ]
-        if not set(required_columns).issubset(dataframe.columns):
-            msg = "Missing key(s) in source excel or DataFrame."
-            logging.error(msg)
-            raise KeyError(msg)
-        dataframe = dataframe.astype("object")
-        dataframe.sort_values(by="Birthday", inplace=True, na_position="first")
-
-        # Create pigs.
-        report_pigs = []
-        for _, data_row in dataframe.iterrows():
-            error_messages = []
+        candidates = []
+        for index, data_row in dataframe.iterrows():
             pig = Pig()
+            candidate = self.__new_candidate(index, data_row, self.PIG_COLUMNS, pig)
+            candidates.append(candidate)
 
             # Set id.
             id = data_row.get("ID")
             if pd.isna(id):
-                error_messages.append("耳號不可為空")
+                candidate.add_error("耳號不可為空")
             else:
                 try:
                     pig.set_id(self.__remove_dash_from_id(str(id)))
                 except ValueError:
-                    error_messages.append("耳號長度過長")
+                    candidate.add_error("耳號長度過長")
                 except TypeError:
-                    error_messages.append("耳號格式錯誤")
+                    candidate.add_error("耳號格式錯誤")
 
             # Set farm
             pig.set_farm(farm)
@@ -233,9 +743,9 @@ class ExcelReader():
                     raise SyntaxError()
                 pig.set_birthday(date.date())
             except ValueError:
-                error_messages.append("生日日期格式錯誤")
+                candidate.add_error("生日日期格式錯誤")
             except SyntaxError:
-                error_messages.append("生日不可為空")
+                candidate.add_error("生日不可為空")
 
             # Set gender
             gender = str(data_row.get("Gender"))
@@ -246,9 +756,9 @@ class ExcelReader():
                     raise ZeroDivisionError()
                 pig.set_gender(gender)
             except KeyError:
-                error_messages.append("性別格式錯誤")
+                candidate.add_error("性別格式錯誤")
             except SyntaxError:
-                error_messages.append("性別不可為空")
+                candidate.add_error("性別不可為空")
             except ZeroDivisionError:
                 pass # Skip
 
@@ -262,26 +772,21 @@ class ExcelReader():
                 breed.capitalize()
                 pig.set_breed(breed)
             except ValueError:
-                error_messages.append("品種未定義")
+                candidate.add_error("品種未定義")
             except SyntaxError:
-                error_messages.append("品種不可為空")
+                candidate.add_error("品種不可為空")
             except ZeroDivisionError:
                 pass # Skip
 
-            # Set reg id
+            # Set reg id. Duplicates are checked when resolving.
             reg_id = data_row.get("reg_id")
             if pd.notna(reg_id) and reg_id != "無登":
                 try:
-                    reg_id = str(reg_id)
-                    if len(self.model.find_pigs(equal={"reg_id":reg_id})) > 0:
-                        raise KeyError()
-                    pig.set_reg_id(reg_id)
+                    pig.set_reg_id(str(reg_id))
                 except ValueError:
-                    error_messages.append("登錄號格式錯誤")
-                except KeyError:
-                    error_messages.append("登錄號重複")
+                    candidate.add_error("登錄號格式錯誤")
                 except TypeError:
-                    error_messages.append("登錄號格式錯誤")
+                    candidate.add_error("登錄號格式錯誤")
 
             # Set Chinese name
             chinese_name = data_row.get("Chinese_name")
@@ -289,85 +794,27 @@ class ExcelReader():
                 try:
                     pig.set_chinese_name(chinese_name)
                 except ValueError:
-                    error_messages.append("中文名長度過長")
-
-            # Set sire
-            sire = Pig()
-            sire_id = data_row.get("Sire")
-            try:
-                if not allow_none and pd.isna(sire_id):
-                    raise SyntaxError()
-                elif allow_none and pd.isna(sire_id):
-                    raise ZeroDivisionError() #Skip
-                sire_breed = sire_id[0].capitalize()
-                sire.set_breed(sire_breed)
-                sire_id = self.__remove_dash_from_id(sire_id)
-                sire.set_id(sire_id)
-                smaller = {} if pig.get_birthday() is None else {"birthday": pig.get_birthday()}
-                found = self.model.find_pigs(
-                    equal={
-                        "id": sire.get_id(), 
-                        "breed": sire.get_breed(), 
-                        "gender": "M"
-                    }, 
-                    smaller=smaller
-                )
-                if len(found) == 0:
-                    raise KeyError
-                if len(found) == 1:
-                    pig.set_sire(found[0])
-                else:
-                    choice = ask_multiple("找到多隻可能的父畜，請選擇其中之一", found)
-                    if choice is None:
-                        raise KeyError()
-                    pig.set_sire(found[choice])
-            except SyntaxError:
-                error_messages.append("父畜不能為空")
-            except ValueError:
-                error_messages.append("父畜品種未定義或耳號格式錯誤")
-            except KeyError:
-                error_messages.append("資料庫中沒有父畜的資料")
-            except ZeroDivisionError:
-                pass
+                    candidate.add_error("中文名長度過長")
 
-            # Set dam
-            dam = Pig()
-            dam_id = data_row.get("Dam")
-            try:
-                if not allow_none and pd.isna(dam_id):
-                    raise SyntaxError()
-                elif allow_none and pd.isna(dam_id):
-                    raise ZeroDivisionError() #Skip
-                dam_breed = dam_id[0].capitalize()
-                dam.set_breed(dam_breed)
-                dam_id = self.__remove_dash_from_id(dam_id)
-                dam.set_id(dam_id)
-                smaller = {} if pig.get_birthday() is None else {"birthday": pig.get_birthday()}
-                found = self.model.find_pigs(
-                    equal={
-                        "id": dam.get_id(), 
-                        "breed": dam.get_breed(), 
-                        "gender": "F"
-                    }, 
-                    smaller=smaller
-                )
-                if len(found) == 0:
-                    raise KeyError
-                if len(found) == 1:
-                    pig.set_dam(found[0])
-                else:
-                    choice = ask_multiple("找到多隻可能的母畜，請選擇其中之一", found)
-                    if choice is None:
-                        raise KeyError()
-                    pig.set_dam(found[choice])
-            except SyntaxError:
-                error_messages.append("母畜不能為空")
-            except ValueError:
-                error_messages.append("母畜品種未定義或耳號格式錯誤")
-            except KeyError:
-                error_messages.append("資料庫中沒有母畜的資料")
-            except ZeroDivisionError:
-                pass
+            # Read sire and dam. They are found when resolving.
+            for column, gender, name in (("Sire", "M", "父畜"), ("Dam", "F", "母畜")):
+                parent = Pig()
+                parent_id = data_row.get(column)
+                try:
+                    if not allow_none and pd.isna(parent_id):
+                        raise SyntaxError()
+                    elif allow_none and pd.isna(parent_id):
+                        raise ZeroDivisionError() #Skip
+                    parent.set_breed(parent_id[0].capitalize())
+                    parent.set_id(self.__remove_dash_from_id(parent_id))
+                    parent.set_gender(gender)
+                    candidate.set_reference(column, parent)
+                except SyntaxError:
+                    candidate.add_error(f"{name}不能為空")
+                except (TypeError, ValueError):
+                    candidate.add_error(f"{name}品種未定義或耳號格式錯誤")
+                except ZeroDivisionError:
+                    pass
 
             litter = data_row.get("litter")
             try:
@@ -380,174 +827,185 @@ class ExcelReader():
             except ZeroDivisionError:
                 pass
             except SyntaxError:
-                error_messages.append("出生胎次格式錯誤")
+                candidate.add_error("出生胎次格式錯誤")
             except TypeError:
-                error_messages.append("出生胎次格式錯誤")
+                candidate.add_error("出生胎次格式錯誤")
             except ValueError:
-                error_messages.append("出生胎次數值超出範圍")
+                candidate.add_error("出生胎次數值超出範圍")
 
-            # If error then put into report.
-            if len(error_messages) > 0:
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = " ".join(error_messages)
-                report_pigs.append(data_dict)
-                continue
+        return candidates
 
-            # Check duplicate.
-            found = self.model.find_pig(pig)
-            if found is None:
-                self.model.insert_pig(pig)
-                continue
-            if found == pig:
-                continue
-            msg = "遇到重複豬隻，是否更新資料？Y：更新，N：不更新"
-            msg += f"\n讀到的豬：{pig}"
-            msg += f"\n已有的豬：{found}"
-            if not ask(msg):
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = "豬隻已存在於資料庫且與資料庫中數據不相符"
-                report_pigs.append(data_dict)
-                continue
-            self.model.update_pig(pig)
-
-        report_dataframe = pd.DataFrame(report_pigs)
-        report_dataframe = report_dataframe.rename(columns={
-            "Breed": "品種", 
-            "ID": "耳號", 
-            "Birthday": "生日", 
-            "Sire": "父畜", 
-            "Dam": "母畜", 
-            "reg_id": "登錄號", 
-            "Chinese_name": "中文名", 
-            "Gender": "性別"
-        })
-        report_dataframe.to_csv(os.path.join(output_path, output_filename))
+    def resolve_pigs(self, candidates: list[Candidate]) -> None:
+        """ Check registration ids and find sires and dams of valid \
+        candidates from `validate_pigs`.
 
-    def read_and_insert_estrus(
-        self, 
+        Pigs with the registration ids or the ids of the parents are found \
+        in bulk. Parents may also be earlier candidates of the sheet. If \
+        several pigs may be the parent, one is chosen after all candidates \
+        are resolved, see `policy`.
+
+        :param candidates: candidates from `validate_pigs`.
+        """
+
+        valid = [candidate for candidate in candidates if candidate.is_valid()]
+        ids = []
+        reg_ids = []
+        for candidate in valid:
+            for column in ("Sire", "Dam"):
+                if candidate.get_reference(column) is not None:
+                    ids.append(candidate.get_reference(column).get_id())
+            if candidate.get_record().get_reg_id() is not None:
+                reg_ids.append(candidate.get_record().get_reg_id())
+
+        # Parents may come from other farms.
+        herd = self.__index_pigs(ids)
+        if not self.prefetch:
+            for pig in self.__find_within(self.model.find_pigs, "reg_id", reg_ids):
+                herd.add(pig)
+
+        matches = {"Sire": [], "Dam": []}
+        for candidate in valid:
+            pig = candidate.get_record()
+
+            # Check reg id.
+            if pig.get_reg_id() is not None:
+                found = herd.find_pig_by_reg_id(pig.get_reg_id())
+                if found is not None and self.__pig_key(found) != self.__pig_key(pig):
+                    candidate.add_error("登錄號重複")
+
+            # Set sire and dam.
+            for column, name in (("Sire", "父畜"), ("Dam", "母畜")):
+                parent = candidate.get_reference(column)
+                if parent is None:
+                    continue
+                found = herd.find_pigs(
+                    parent.get_id(),
+                    breed=parent.get_breed(),
+                    gender=parent.get_gender(),
+                    born_before=pig.get_birthday()
+                )
+                if len(found) == 0:
+                    candidate.add_error(f"資料庫中沒有{name}的資料")
+                elif len(found) == 1:
+                    self.__set_parent(pig, column, found[0])
+                else:
+                    matches[column].append((candidate, found))
+
+            # Later rows may be offspring of this pig.
+            if candidate.is_valid():
+                herd.add(pig)
+
+        # Choose among possible parents after reading the sheet.
+        for column, name in (("Sire", "父畜"), ("Dam", "母畜")):
+            choices = self.__resolve_matches(
+                name,
+                [(candidate.get_record(), found) for candidate, found in matches[column]]
+            )
+            for (candidate, found), choice in zip(matches[column], choices):
+                if choice is None:
+                    candidate.add_error(f"資料庫中沒有{name}的資料")
+                else:
+                    self.__set_parent(candidate.get_record(), column, found[choice])
+
+    @staticmethod
+    def __set_parent(pig: Pig, column: str, parent: Pig) -> None:
+        if column == "Sire":
+            pig.set_sire(parent)
+        else:
+            pig.set_dam(parent)
+
+    def write_pigs(self, candidates: list[Candidate]) -> None:
+        """ Write valid candidates from `resolve_pigs` with batched upserts.
+
+        :param candidates: candidates from `resolve_pigs`.
+        """
+
+        self.__write(
+            candidates, "Pigs", self.model.find_pigs, self.__pig_key,
+            self.__upsert_pigs, "豬隻"
+        )
+
+    def read_and_insert_pigs(
+        self,
         farm: str,
-        input_path: str = None, 
+        input_path: str = None,
         dataframe: pd.DataFrame = None,
-        output_path: str = os.path.curdir, 
+        output_path: str = os.path.curdir,
         output_filename: str = "output.csv",
         allow_none: bool = False
     ) -> None:
-        """Read estrus data in the source excel or dataframe, insert them into 
+        """Read pigs data in the source excel or dataframe, insert them into
         database and create a report csv containing error data.
 
-        Choose reading from excel or dataframe by pathing corresponding 
-        parameter
+        Runs `validate_pigs`, `resolve_pigs` and `write_pigs`.
 
-        If read from excel, "配種資料" sheet will be used.
+        :param farm: current farm.
+        :param input_path: path of the source excel, including filename.
+        :param dataframe: the source dataframe.
+        :param output_path: path to save the report.
+        :param output_filename: name of the report.
+        :param allow_none: allow empty non-primary key.
+        :raises: ValueError, FileNotFoundError, TypeError, KeyError.
+        """
+
+        candidates = self.validate_pigs(farm, input_path, dataframe, allow_none)
+        self.resolve_pigs(candidates)
+        self.write_pigs(candidates)
+        self.__save_report(candidates, output_path, output_filename)
+
+    def validate_estrus(
+        self,
+        farm: str,
+        input_path: str = None,
+        dataframe: pd.DataFrame = None,
+        allow_none: bool = False
+    ) -> list[Candidate]:
+        """Read estrus in the source excel or dataframe into candidates and
+        check their formats, without touching the database.
+
+        Choose reading from excel or dataframe by pathing corresponding
+        parameter.
+
+        If read from excel, "發情資料" sheet will be used.
 
         The source excel or dataframe must have below columns:
-        1. 生日年品種耳號
+        1. 出生年品種耳號
         2. 胎次
-        3. 配種日期
-        4. 配種時間
-
-        Estrus datetime and parity is checked.
+        3. 發情日期
+        4. 發情時間
 
         :param farm: current farm.
-        :param input_path: path of the source csv, including filename.
+        :param input_path: path of the source excel, including filename.
         :param dataframe: the source dataframe.
-        :param output_path: path to save the report.
-        :param output_filename: name of the report.
-        :param allow_none: allow empty non-primary key. 
+        :param allow_none: allow empty non-primary key.
         :raises: ValueError, FileNotFoundError, TypeError, KeyError.
         """
-        # Type check.
-        if input_path is None and dataframe is None:
-            msg = "You must choose to read from an excel file or a dataframe."
-            logging.error(msg)
-            raise ValueError(msg)
-        
-        if input_path is not None:
-            type_check(input_path, "input_path", str)
-            if not os.path.isfile(input_path):
-                msg = f"File {input_path} does not exist."
-                logging.error(msg)
-                raise FileNotFoundError(msg)
-            dataframe = pd.read_excel(
-                io=input_path, 
-                sheet_name="發情資料"
-            )
 
-        if dataframe is not None:
-            type_check(dataframe, "dataframe", pd.DataFrame)
-        
+        dataframe = self.__read_sheet(
+            input_path, dataframe, "發情資料", self.ESTRUS_COLUMNS,
+            ["ID", "Parity", "Estrus_date", "Estrus_time"]
+        )
         type_check(farm, "farm", str)
-        type_check(output_path, "output_path", str)
-        type_check(output_filename, "output_filename", str)
         type_check(allow_none, "allow_none", bool)
+        dataframe = dataframe.sort_values(by="Estrus_date", na_position="first")
 
-        # Standardize the dataframe.
-        dataframe.dropna(how="all", inplace=True)
-        dataframe = dataframe.rename(columns={
-            "出生年品種耳號": "ID", 
-            "胎次": "Parity", 
-            "發情日期": "Estrus_date",
-            "發情時間": "Estrus_time", 
-            "21天測孕": "21th_day_test", 
-            "60天測孕": "60th_day_test"
-        })
-        required_columns = [
-            "ID", 
-            "Parity", 
-            "Estrus_date", 
-            "Estrus_time"
-        ]
-        if not set(required_columns).issubset(dataframe.columns):
-            msg = "Missing key(s) in source excel or DataFrame."
-            logging.error(msg)
-            raise KeyError(msg)
-        dataframe = dataframe.astype("object")
-        dataframe.sort_values(by="Estrus_date", inplace=True, na_position="first")
-
-        # Create estrus.
-        report_estrus = []
-        for _, data_row in dataframe.iterrows():
-            error_messages = []
+        candidates = []
+        for index, data_row in dataframe.iterrows():
             estrus = Estrus()
+            candidate = self.__new_candidate(index, data_row, self.ESTRUS_COLUMNS, estrus)
+            candidates.append(candidate)
 
-            # Set pig.
+            # Read sow. It is found when resolving.
             id = data_row.get("ID")
             try:
                 if pd.isna(id):
                     raise SyntaxError()
-                id = str(id)
                 # id in excel may contain birth_year, breed and id.
-                birth_year, breed, id = self.__seperate_year_breed_id(id)
-                equal = {"id": id, "farm": farm, "gender": "F"}
-                larger = {}
-                smaller = {}
-                if birth_year is not None and breed is not None:
-                    larger["birthday"] = f"{birth_year}-01-01"
-                    smaller["birthday"] = f"{birth_year}-12-31"
-                    equal["breed"] = breed
-                pigs = self.model.find_pigs(
-                    equal=equal, 
-                    smaller_equal=smaller,
-                    larger_equal=larger, 
-                    order_by="birthday DESC"
-                )
-                if len(pigs) == 0:
-                    raise KeyError()
-                # Use the youngest sow.
-                estrus.set_sow(pigs[0])
+                candidate.set_reference("sow", self.__read_tag(str(id)))
             except SyntaxError:
-                error_messages.append("耳號不可為空")
-            except TypeError:
-                error_messages.append("耳號格式錯誤")
-            except ValueError as e:
-                # Distinguish differen ValueError by content.
-                if "birthday" in e:
-                    error_messages.append("配種日期比資料中的母豬生日早")
-                else:
-                    # Should not happen since the pig came from database.
-                    raise e
-            except KeyError:
-                error_messages.append("資料庫中無母豬資料")
+                candidate.add_error("耳號不可為空")
+            except (TypeError, ValueError):
+                candidate.add_error("耳號格式錯誤")
 
             # Set estrus datetime.
             date = data_row.get("Estrus_date")
@@ -563,73 +1021,26 @@ class ExcelReader():
                     estrus_datetime += f"{time.strftime('%H:%M:%S')}"
                 estrus.set_estrus_datetime(estrus_datetime)
             except SyntaxError:
-                error_messages.append("配種日期不能為空")
-            except TypeError:
-                error_messages.append("配種日期或配種時間格式錯誤")
-            except ValueError as e:
-                # Distinguish differen ValueError by content.
-                if "birthday" in e.args[0]:
-                    error_messages.append("配種日期比資料中的母豬生日早")
-                else:
-                    error_messages.append("配種日期或配種時間格式錯誤")
+                candidate.add_error("配種日期不能為空")
+            except (TypeError, ValueError):
+                candidate.add_error("配種日期或配種時間格式錯誤")
 
-            # Set parity.
+            # Set parity. It is compared with other estrus when resolving.
             parity = data_row.get("Parity")
             try:
                 if not allow_none and pd.isna(parity):
                     raise SyntaxError()
                 if allow_none and pd.isna(parity):
                     raise ZeroDivisionError()
-                # Check parity.
-                # Need to find estrus record through primary key.
-                # Since missing primary key isn't allowed, just skip this step.
-                parity = int(parity)
-                if estrus.get_sow() is None:
-                    raise ZeroDivisionError()
-                if estrus.get_estrus_datetime() is None:
-                    raise ZeroDivisionError()
-                found = self.model.find_estrus(
-                    equal={
-                        "id": estrus.get_sow().get_id(), 
-                        "birthday": estrus.get_sow().get_birthday(), 
-                        "farm": estrus.get_sow().get_farm()
-                    }, 
-                    smaller={"estrus_datetime": estrus.get_estrus_datetime()}, 
-                    order_by="parity DESC"
-                )
-                if len(found) > 0 and parity < found[0].get_parity():
-                    error_messages.append("發情日期比前一胎次發情紀錄的發情日期早")
-                    raise ZeroDivisionError()
-                found = self.model.find_estrus(
-                    equal={
-                        "id": estrus.get_sow().get_id(), 
-                        "birthday": estrus.get_sow().get_birthday(), 
-                        "farm": estrus.get_sow().get_farm()
-                    }, 
-                    larger={"estrus_datetime": estrus.get_estrus_datetime()}, 
-                    order_by="parity ASC"
-                )
-                if len(found) > 0 and parity > found[0].get_parity():
-                    error_messages.append("發情日期比後一胎次發情紀錄的發情日期晚")
-                    raise ZeroDivisionError()
-                found = self.model.find_estrus(
-                    equal={
-                        "id": estrus.get_sow().get_id(), 
-                        "birthday": estrus.get_sow().get_birthday(), 
-                        "farm": estrus.get_sow().get_farm(), 
-                        "parity": parity
-                    }, 
-                    order_by="estrus_datetime DESC"
-                )
-                estrus.set_parity(parity)
+                estrus.set_parity(int(parity))
             except SyntaxError:
-                error_messages.append("胎次不可為空")
+                candidate.add_error("胎次不可為空")
             except ZeroDivisionError:
                 pass # Skip
             except TypeError:
-                error_messages.append("胎次格式錯誤")
+                candidate.add_error("胎次格式錯誤")
             except ValueError:
-                error_messages.append("胎次超出範圍(1~12)")
+                candidate.add_error("胎次超出範圍(1~12)")
 
             # Set pregnant.
             test_21 = data_row.get("21th_day_test")
@@ -641,161 +1052,157 @@ class ExcelReader():
             else:
                 estrus.set_pregnant(PregnantStatus.UNKNOWN)
 
-            # If error then put into report.
-            if len(error_messages) > 0:
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = " ".join(error_messages)
-                report_estrus.append(data_dict)
-                continue
+        return candidates
 
-            # Check duplicate.
-            found = self.model.find_estrus(equal={
-                "id": estrus.get_sow().get_id(), 
-                "birthday": estrus.get_sow().get_birthday(),
-                "farm": estrus.get_sow().get_farm(), 
-                "estrus_datetime": estrus.get_estrus_datetime()
-            })
-            if len(found) == 0:
-                self.model.insert_estrus(estrus)
-                continue
-            if found[0] == estrus:
-                continue
-            dt = estrus.get_estrus_datetime().date() # Shorter
-            found_dt = found[0].get_estrus_datetime().date() # Shorter
-            if dt - timedelta(3) <= found_dt <= dt:
-                # New mating data.
-                continue
-            msg = "遇到重複發情紀錄，是否更新資料？Y：更新，N：不更新"
-            msg += f"\n讀到的發情紀錄：{estrus}"
-            msg += f"\n已有的發情紀錄：{found[0]}"
-            if not ask(msg):
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = "發情紀錄已存在於資料庫且與資料庫中數據不相符"
-                report_estrus.append(data_dict)
-                continue
-            self.model.update_estrus(estrus)
-        
-        report_dataframe = pd.DataFrame(report_estrus)
-        report_dataframe = report_dataframe.rename(columns={
-            "ID": "生日年品種耳號", 
-            "Parity": "胎次", 
-            "Estrus_date": "配種日期",
-            "Estrus_time": "配種時間",
-            "21th_day_test": "21天測孕", 
-            "60th_day_test": "60天測孕"
-        })
-        report_dataframe.to_csv(os.path.join(output_path, output_filename))
+    def resolve_estrus(self, farm: str, candidates: list[Candidate]) -> None:
+        """ Find sows of valid candidates from `validate_estrus` and check \
+        their parities against other estrus of the sows.
 
-    def read_and_insert_matings(
-        self, 
+        Sows and their estrus are found in bulk. Earlier candidates of the \
+        sheet count as estrus of the sows.
+
+        :param farm: current farm.
+        :param candidates: candidates from `validate_estrus`.
+        """
+
+        type_check(farm, "farm", str)
+        valid = [candidate for candidate in candidates if candidate.is_valid()]
+        herd = self.__index_pigs(
+            [candidate.get_reference("sow")[2] for candidate in valid], farm
+        )
+
+        # Set sows.
+        for candidate in valid:
+            estrus = candidate.get_record()
+            birth_year, breed, id = candidate.get_reference("sow")
+            try:
+                # Use the youngest sow.
+                sow = self.__find_sow(herd, birth_year, breed, id, farm)
+                if sow is None:
+                    raise KeyError()
+                estrus.set_sow(sow)
+            except ValueError as e:
+                # Distinguish differen ValueError by content.
+                if "birthday" in e.args[0]:
+                    candidate.add_error("配種日期比資料中的母豬生日早")
+                else:
+                    # Should not happen since the pig came from database.
+                    raise e
+            except KeyError:
+                candidate.add_error("資料庫中無母豬資料")
+
+        # Check parities.
+        valid = [candidate for candidate in valid if candidate.is_valid()]
+        timeline = self.__index_estrus(
+            [candidate.get_record().get_sow() for candidate in valid], farm
+        )
+        for candidate in valid:
+            estrus = candidate.get_record()
+            parity = estrus.get_parity()
+            if parity is not None:
+                sow = estrus.get_sow()
+                estrus_datetime = estrus.get_estrus_datetime()
+                previous = timeline.get_previous_parity(sow, estrus_datetime)
+                following = timeline.get_next_parity(sow, estrus_datetime)
+                if previous is not None and parity < previous:
+                    candidate.add_error("發情日期比前一胎次發情紀錄的發情日期早")
+                elif following is not None and parity > following:
+                    candidate.add_error("發情日期比後一胎次發情紀錄的發情日期晚")
+            if candidate.is_valid():
+                timeline.add(estrus)
+
+    def write_estrus(self, candidates: list[Candidate]) -> None:
+        """ Write valid candidates from `resolve_estrus` with batched \
+        upserts. Estrus already in the database are kept, since a later \
+        mating of the same estrus is recorded with its own row.
+
+        :param candidates: candidates from `resolve_estrus`.
+        """
+
+        self.__write(
+            candidates, "Estrus", self.model.find_estrus, self.__estrus_key,
+            self.model.upsert_estrus_many, "發情紀錄", update=False
+        )
+
+    def read_and_insert_estrus(
+        self,
         farm: str,
-        input_path: str = None, 
+        input_path: str = None,
         dataframe: pd.DataFrame = None,
-        output_path: str = os.path.curdir, 
+        output_path: str = os.path.curdir,
         output_filename: str = "output.csv",
+        allow_none: bool = False
     ) -> None:
-        """Read data from excel or dataframe and insert Mating objects into 
-        database.
+        """Read estrus data in the source excel or dataframe, insert them into
+        database and create a report csv containing error data.
 
-        Choose to read data from excel or dataframe by passing in 
-        corresponding arguments.
+        Runs `validate_estrus`, `resolve_estrus` and `write_estrus`.
 
         :param farm: current farm.
-        :param input_path: path of the source csv, including filename.
+        :param input_path: path of the source excel, including filename.
         :param dataframe: the source dataframe.
         :param output_path: path to save the report.
         :param output_filename: name of the report.
-        :param allow_none: allow empty non-primary key. 
+        :param allow_none: allow empty non-primary key.
         :raises: ValueError, FileNotFoundError, TypeError, KeyError.
         """
 
-        # Type check.
-        if input_path is None and dataframe is None:
-            msg = "You must choose to read from an excel file or a dataframe."
-            logging.error(msg)
-            raise ValueError(msg)
-        
-        if input_path is not None:
-            type_check(input_path, "input_path", str)
-            if not os.path.isfile(input_path):
-                msg = f"File {input_path} does not exist."
-                logging.error(msg)
-                raise FileNotFoundError(msg)
-            dataframe = pd.read_excel(
-                io=input_path, 
-                sheet_name="配種資料"
-            )
+        candidates = self.validate_estrus(farm, input_path, dataframe, allow_none)
+        self.resolve_estrus(farm, candidates)
+        self.write_estrus(candidates)
+        self.__save_report(candidates, output_path, output_filename)
 
-        if dataframe is not None:
-            type_check(dataframe, "dataframe", pd.DataFrame)
-        
-        type_check(farm, "farm", str)
-        type_check(output_path, "output_path", str)
-        type_check(output_filename, "output_filename", str)
+    def validate_matings(
+        self,
+        farm: str,
+        input_path: str = None,
+        dataframe: pd.DataFrame = None
+    ) -> list[Candidate]:
+        """Read matings in the source excel or dataframe into candidates and
+        check their formats, without touching the database.
 
-        # Standardize the dataframe.
-        dataframe.dropna(how="all", inplace=True)
-        rename_dict = {
-            "出生年品種耳號": "SOW_ID", 
-            "胎次": "Parity", 
-            "配種日期": "Estrus_date",
-            "配種時間": "Estrus_time", 
-            "與配公豬": "BOAR_ID"
-        }
-        dataframe = dataframe.rename(columns=rename_dict)
-        if not set(rename_dict.values()).issubset(dataframe.columns):
-            msg = "Missing key(s) in source excel or DataFrame."
-            logging.error(msg)
-            raise KeyError(msg)
-        dataframe = dataframe.astype("object")
+        Choose to read data from excel or dataframe by passing in
+        corresponding arguments.
 
-        # Create matings.
-        report_matings = []
-        for _, data_row in dataframe.iterrows():
-            error_messages = []
+        If read from excel, "配種資料" sheet will be used.
+
+        The source excel or dataframe must have below columns:
+        1. 出生年品種耳號
+        2. 胎次
+        3. 配種日期
+        4. 配種時間
+        5. 與配公豬
+
+        :param farm: current farm.
+        :param input_path: path of the source excel, including filename.
+        :param dataframe: the source dataframe.
+        :raises: ValueError, FileNotFoundError, TypeError, KeyError.
+        """
+
+        dataframe = self.__read_sheet(
+            input_path, dataframe, "配種資料", self.MATING_COLUMNS
+        )
+        type_check(farm, "farm", str)
+
+        candidates = []
+        for index, data_row in dataframe.iterrows():
             mating = Mating()
+            candidate = self.__new_candidate(index, data_row, self.MATING_COLUMNS, mating)
+            candidates.append(candidate)
 
-            # Set estrus.
-            estrus = Estrus()
+            # Read sow. It is found when resolving.
             sow_id = data_row.get("SOW_ID")
             try:
                 if pd.isna(sow_id):
                     raise SyntaxError()
-                sow_id = str(sow_id)
-                # dam_id in excel may contain birth_year, breed and id.
-                birth_year, breed, sow_id = self.__seperate_year_breed_id(sow_id)
-                equal = {"id": sow_id, "farm": farm, "gender": "F"}
-                larger = {}
-                smaller = {}
-                if birth_year is not None and breed is not None:
-                    larger["birthday"] = f"{birth_year}-01-01"
-                    smaller["birthday"] = f"{birth_year}-12-31"
-                    equal["breed"] = breed
-                found = self.model.find_pigs(
-                    equal=equal, 
-                    smaller_equal=smaller,
-                    larger_equal=larger, 
-                    order_by="birthday DESC"
-                )
-                if len(found) == 0:
-                    raise KeyError()
-                # Use the youngest sow.
-                estrus.set_sow(found[0])
+                # sow_id in excel may contain birth_year, breed and id.
+                candidate.set_reference("sow", self.__read_tag(str(sow_id)))
             except SyntaxError:
-                error_messages.append("母豬耳號不可為空")
-            except TypeError:
-                error_messages.append("耳號格式錯誤")
-            except ValueError as e:
-                # Distinguish differen ValueError by content.
-                if "birthday" in e:
-                    error_messages.append("配種日期比資料中的母豬生日早")
-                else:
-                    # Should not happen since the pig came from database.
-                    raise e
-            except KeyError:
-                error_messages.append("資料庫中無母豬資料")
+                candidate.add_error("母豬耳號不可為空")
+            except (TypeError, ValueError):
+                candidate.add_error("耳號格式錯誤")
 
-            # Set estrus datetime.
+            # Set mating datetime. The estrus is found around it when resolving.
             date = data_row.get("Estrus_date")
             time = data_row.get("Estrus_time")
             try:
@@ -803,303 +1210,339 @@ class ExcelReader():
                     raise SyntaxError()
                 date = pd.to_datetime(date)
                 if pd.isna(time):
-                    estrus_datetime = f"{date.strftime('%Y-%m-%d')} 10:00:00"
+                    mating_datetime = f"{date.strftime('%Y-%m-%d')} 10:00:00"
                 else:
-                    estrus_datetime = f"{date.strftime('%Y-%m-%d')} "
-                    estrus_datetime += f"{time.strftime('%H:%M:%S')}"
-                estrus.set_estrus_datetime(estrus_datetime)
+                    mating_datetime = f"{date.strftime('%Y-%m-%d')} "
+                    mating_datetime += f"{time.strftime('%H:%M:%S')}"
+                mating.set_mating_datetime(mating_datetime)
             except SyntaxError:
-                error_messages.append("配種日期不能為空")
-            except TypeError:
-                error_messages.append("配種日期或配種時間格式錯誤")
-            except ValueError as e:
-                # Distinguish differen ValueError by content.
-                if "birthday" in e.args[0]:
-                    error_messages.append("配種日期比資料中的母豬生日早")
-                else:
-                    error_messages.append("配種日期或配種時間格式錯誤")
-
-            if estrus.is_unique():
-                equal = {
-                    "id": estrus.get_sow().get_id(), 
-                    "farm": estrus.get_sow().get_farm(), 
-                    "birthday": estrus.get_sow().get_birthday()
-                }
-                smaller_equal = {
-                    "estrus_datetime": estrus.get_estrus_datetime()
-                }
-                larger_equal = {
-                    "estrus_datetime": estrus.get_estrus_datetime() - timedelta(3)
-                }
-                found = self.model.find_estrus(
-                    equal=equal, 
-                    smaller_equal=smaller_equal, 
-                    larger_equal=larger_equal, 
-                    order_by="estrus_datetime DESC"
-                )
-                if len(found) > 0:
-                    try:
-                        mating.set_estrus(found[0])
-                    except ValueError as e:
-                        if "gap between" in e:
-                            error_messages.append("配種日期與發情日期間距太長")
-                        elif "than estrus datetime" in e:
-                            error_messages.append("配種日期早於發情日期")
-                        elif "Boar birthday" in e:
-                            error_messages.append("公豬生日晚於發情日期")
-                        else:
-                            error_messages.append("未知錯誤")
-                    estrus = found[0]
-                else:
-                    error_messages.append("資料庫中沒有發情資料")
+                candidate.add_error("配種日期不能為空")
+            except (TypeError, ValueError):
+                candidate.add_error("配種日期或配種時間格式錯誤")
 
-            # Set boar.
+            # Read boar. It is found when resolving.
             boar_id = data_row.get("BOAR_ID")
             try:
                 if pd.isna(boar_id):
                     raise SyntaxError()
-                birth_year, breed, boar_id = self.__seperate_year_breed_id(boar_id)
-                equal = {"id": boar_id, "farm": farm, "gender": "M"}
-                larger = {}
-                smaller = {}
-                if birth_year is not None and breed is not None:
-                    larger["birthday"] = f"{birth_year}-01-01"
-                    smaller["birthday"] = f"{birth_year}-12-31"
-                    equal["breed"] = breed
-                found = self.model.find_pigs(
-                    equal=equal, 
-                    smaller_equal=smaller, 
-                    larger_equal=larger
-                )
-                if len(found) == 0:
-                    raise KeyError()
-                if len(found) == 1:
-                    mating.set_boar(found[0])
-                    raise ZeroDivisionError()
-                chosen = ask_multiple("找到多頭公豬，選擇下列何者？", found)
-                if chosen is None:
-                    raise KeyError()
-                mating.set_boar(found[chosen])
+                candidate.set_reference("boar", self.__read_tag(boar_id))
             except SyntaxError:
-                error_messages.append("公豬耳號不能為空")
-            except KeyError:
-                error_messages.append("資料庫無公豬資料")
-            except TypeError:
-                error_messages.append("公豬耳號格式錯誤")
-            except ValueError as e:
-                if "estrus date" in e.args[0]:
-                    error_messages.append("公豬生日晚於母豬發情日期")
-                elif "mating date" in e.args[0]:
-                    error_messages.append("公豬生日晚於配種日期")
-            except ZeroDivisionError:
-                pass
+                candidate.add_error("公豬耳號不能為空")
+            except (TypeError, ValueError):
+                candidate.add_error("公豬耳號格式錯誤")
 
-            # Set mating dateteime.
-            date = data_row.get("Estrus_date")
-            time = data_row.get("Estrus_time")
+        return candidates
+
+    def resolve_matings(self, farm: str, candidates: list[Candidate]) -> None:
+        """ Find sows, estrus and boars of valid candidates from \
+        `validate_matings`.
+
+        Sows and boars are found in bulk. Every mating is linked to the \
+        latest estrus of its sow at most 3 days earlier, in one query per \
+        `BATCH_SIZE` sows. If several boars match, one is chosen after all \
+        candidates are resolved, see `policy`.
+
+        :param farm: current farm.
+        :param candidates: candidates from `validate_matings`.
+        """
+
+        type_check(farm, "farm", str)
+        valid = [candidate for candidate in candidates if candidate.is_valid()]
+        herd = self.__index_pigs(
+            [candidate.get_reference("sow")[2] for candidate in valid]
+            + [candidate.get_reference("boar")[2] for candidate in valid],
+            farm
+        )
+
+        # Link to estrus.
+        sows = {}
+        times = {}
+        for i, candidate in enumerate(valid):
+            birth_year, breed, sow_id = candidate.get_reference("sow")
+            # Use the youngest sow.
+            sow = self.__find_sow(herd, birth_year, breed, sow_id, farm)
+            if sow is None:
+                candidate.add_error("資料庫中無母豬資料")
+                continue
+            mating_datetime = candidate.get_record().get_mating_datetime()
+            if sow.get_birthday() > mating_datetime.date():
+                candidate.add_error("配種日期比資料中的母豬生日早")
+                continue
+            sows[i] = sow
+            times[i] = mating_datetime
+        links = self.__link_to_sows(
+            sows, times, self.model.find_estrus, Estrus.get_sow,
+            Estrus.get_estrus_datetime, tolerance=timedelta(3)
+        )
+
+        boars = {}
+        for i, candidate in enumerate(valid):
+            if i not in sows:
+                continue
+            mating = candidate.get_record()
+
+            # Set estrus.
+            if links[i] is None:
+                candidate.add_error("資料庫中沒有發情資料")
+                continue
             try:
-                if pd.isna(date):
-                    raise SyntaxError()
-                date = pd.to_datetime(date)
-                if pd.isna(time):
-                    mating_datetime = f"{date.strftime('%Y-%m-%d')} 10:00:00"
-                else:
-                    mating_datetime = f"{date.strftime('%Y-%m-%d')} "
-                    mating_datetime += f"{time.strftime('%H:%M:%S')}"
-                mating.set_mating_datetime(mating_datetime)
-            except SyntaxError:
-                error_messages.append("配種日期不能為空")
-            except TypeError:
-                error_messages.append("配種日期或配種時間格式錯誤")
+                mating.set_estrus(links[i])
             except ValueError as e:
                 if "gap between" in e.args[0]:
-                    error_messages.append("配種日期與發情日其間隔過長")
+                    candidate.add_error("配種日期與發情日期間距太長")
                 elif "than estrus datetime" in e.args[0]:
-                    error_messages.append("發情日期晚於配種日期")
-                elif "Boar birthday" in e.args[0]:
-                    error_messages.append("公豬生日晚於配種日期")
+                    candidate.add_error("配種日期早於發情日期")
                 else:
-                    error_messages.append("未知錯誤")
+                    candidate.add_error("未知錯誤")
 
-            if len(error_messages) > 0:
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = " ".join(error_messages)
-                report_matings.append(data_dict)
-                continue
-            
-            # Check duplicate.
-            found = self.model.find_matings(equal={
-                "sow_id": mating.get_estrus().get_sow().get_id(), 
-                "sow_birthday": mating.get_estrus().get_sow().get_birthday(), 
-                "sow_farm": mating.get_estrus().get_sow().get_farm(), 
-                "estrus_datetime": mating.get_estrus().get_estrus_datetime(), 
-                "mating_datetime": mating.get_mating_datetime()
-            })
+            # Find boars.
+            birth_year, breed, boar_id = candidate.get_reference("boar")
+            boars[i] = herd.find_pigs(
+                boar_id, farm=farm, breed=breed, gender="M", birth_year=birth_year
+            )
 
-            if len(found) == 0:
-                self.model.insert_mating(mating)
-                continue
-            if found[0] == mating:
-                continue
+        # Choose among possible boars after reading the sheet.
+        ambiguous = [i for i in boars if len(boars[i]) > 1]
+        choices = {i: 0 for i in boars if len(boars[i]) == 1}
+        choices.update(zip(ambiguous, self.__resolve_matches(
+            "公豬", [(valid[i].get_record(), boars[i]) for i in ambiguous]
+        )))
 
-            msg = "遇到重複配種紀錄，是否更新資料？Y：更新，N：不更新"
-            msg += f"\n讀到的配種紀錄：{mating}"
-            msg += f"\n已有的配種紀錄：{found[0]}"
-            if not ask(msg):
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = "配種紀錄已存在於資料庫且與資料庫中數據不相符"
-                report_matings.append(data_dict)
-                continue
-            self.model.update_mating(mating)
-
-        report_dataframe = pd.DataFrame(report_matings)
-        report_dataframe = report_dataframe.rename(columns={
-            "SOW_ID": "生日年品種耳號", 
-            "Parity": "胎次", 
-            "Estrus_date": "配種日期",
-            "Estrus_time": "配種時間", 
-            "BOAR_ID": "與配公豬"
-        })
-        report_dataframe.to_csv(os.path.join(output_path, output_filename))
+        # Set boars.
+        for i, found in boars.items():
+            candidate = valid[i]
+            try:
+                if choices.get(i) is None:
+                    raise KeyError()
+                candidate.get_record().set_boar(found[choices[i]])
+            except KeyError:
+                candidate.add_error("資料庫無公豬資料")
+            except ValueError as e:
+                if "estrus date" in e.args[0]:
+                    candidate.add_error("公豬生日晚於母豬發情日期")
+                elif "mating date" in e.args[0]:
+                    candidate.add_error("公豬生日晚於配種日期")
+                else:
+                    candidate.add_error("未知錯誤")
 
-    def read_and_insert_farrowings(
-        self, 
+    def write_matings(self, candidates: list[Candidate]) -> None:
+        """ Write valid candidates from `resolve_matings` with batched \
+        upserts.
+
+        :param candidates: candidates from `resolve_matings`.
+        """
+
+        def key_of(mating: Mating) -> tuple:
+            return self.__estrus_key(mating.get_estrus()) + (mating.get_mating_datetime(),)
+
+        self.__write(
+            candidates, "Matings", self.model.find_matings, key_of,
+            self.model.upsert_matings, "配種紀錄"
+        )
+
+    def read_and_insert_matings(
+        self,
         farm: str,
-        input_path: str = None, 
+        input_path: str = None,
         dataframe: pd.DataFrame = None,
-        output_path: str = os.path.curdir, 
+        output_path: str = os.path.curdir,
         output_filename: str = "output.csv",
-        allow_none: bool = False
     ) -> None:
-        """Read data from excel or dataframe and insert Farrowing objects 
-        into database.
+        """Read data from excel or dataframe and insert Mating objects into
+        database.
 
-        Choose to read data from excel or dataframe by passing in 
-        corresponding arguments.
+        Runs `validate_matings`, `resolve_matings` and `write_matings`.
 
         :param farm: current farm.
-        :param input_path: path of the source csv, including filename.
+        :param input_path: path of the source excel, including filename.
         :param dataframe: the source dataframe.
         :param output_path: path to save the report.
         :param output_filename: name of the report.
-        :param allow_none: allow empty non-primary key. 
         :raises: ValueError, FileNotFoundError, TypeError, KeyError.
         """
 
-        # Type check.
-        if input_path is None and dataframe is None:
-            msg = "You must choose to read from an excel file or a dataframe."
-            logging.error(msg)
-            raise ValueError(msg)
-        
-        if input_path is not None:
-            type_check(input_path, "input_path", str)
-            if not os.path.isfile(input_path):
-                msg = f"File {input_path} does not exist."
-                logging.error(msg)
-                raise FileNotFoundError(msg)
-            dataframe = pd.read_excel(
-                io=input_path, 
-                sheet_name="分娩資料"
+        candidates = self.validate_matings(farm, input_path, dataframe)
+        self.resolve_matings(farm, candidates)
+        self.write_matings(candidates)
+        self.__save_report(candidates, output_path, output_filename)
+
+    def __read_numeric(
+            self,
+            candidate: Candidate,
+            data_row: pd.Series,
+            allow_none: bool,
+            arg_name: str,
+            arg_chinese: str,
+            setting_func
+        ) -> None:
+        """ Set an integer column of a farrowing or weaning row with \
+        `setting_func`, adding errors to the candidate.
+        """
+
+        arg = data_row.get(arg_name)
+        try:
+            if allow_none and pd.isna(arg):
+                raise ZeroDivisionError()
+            if not allow_none and pd.isna(arg):
+                raise SyntaxError()
+            setting_func(int(arg))
+        except ZeroDivisionError:
+            pass
+        except SyntaxError:
+            candidate.add_error(f"{arg_chinese}不能為空")
+        except TypeError:
+            candidate.add_error(f"{arg_chinese}格式錯誤")
+        except ValueError as e:
+            if "invalid literal" in e.args[0]:
+                candidate.add_error(f"{arg_chinese}格式錯誤")
+            elif "total born" in e.args[0]:
+                candidate.add_error("總出生數超出上限(30)")
+            elif "litter_id must be" in e.args[0]:
+                candidate.add_error("胎號大小錯誤")
+            elif "smaller than 30." in e.args[0]:
+                candidate.add_error(f"{arg_chinese}需小於30")
+            elif "or equal to 30. " in e.args[0]:
+                candidate.add_error(f"{arg_chinese}需小於30")
+            elif "total_nursed_piglets must be more than " in e.args[0]:
+                candidate.add_error("離乳數需小於等於哺乳數")
+            elif "than 0" in e.args[0] or "greater or equal to 0. " in e.args[0]:
+                candidate.add_error(f"{arg_chinese}不能低於0")
+            else:
+                candidate.add_error("未知錯誤")
+
+    def __read_sow_tag(
+            self,
+            candidate: Candidate,
+            data_row: pd.Series,
+            column: str
+        ) -> None:
+        """ Keep the {birth_year}{breed}{id} tag of the sow of a farrowing or \
+        weaning row as the "sow" reference.
+        """
+
+        birthyear_breed_id = data_row.get(column)
+        try:
+            if pd.isna(birthyear_breed_id):
+                raise SyntaxError()
+            candidate.set_reference(
+                "sow", self.__read_tag(birthyear_breed_id)
             )
+        except SyntaxError:
+            candidate.add_error("耳號不能為空")
+        except (TypeError, ValueError):
+            candidate.add_error("耳號格式錯誤")
+
+    def __link_by_tags(
+            self,
+            farm: str,
+            candidates: list[Candidate],
+            times: list,
+            find,
+            sow_of,
+            time_of,
+            time_column: str
+        ) -> dict:
+        """ Find the latest parent event at or before its time of any sow \
+        matching the tag of every candidate.
+
+        Tags with birth year match all sows of the id born in the year, of \
+        any breed, and their parents are linked in bulk. Other tags match \
+        any sow with the id, with one query per candidate.
 
-        if dataframe is not None:
-            type_check(dataframe, "dataframe", pd.DataFrame)
-        
+        :param farm: current farm.
+        :param candidates: valid candidates with a "sow" reference.
+        :param times: times of the candidates.
+        :param find: `find_*` method of the model returning the parents.
+        :param sow_of: function returning the sow of a parent.
+        :param time_of: function returning the time of a parent.
+        :param time_column: column of `time_of` in the database.
+        :return: {position of the candidate: parent or None}.
+        """
+
+        herd = self.__index_pigs(
+            [
+                candidate.get_reference("sow")[2] for candidate in candidates
+                if candidate.get_reference("sow")[0] is not None
+            ],
+            farm
+        )
+        sows = {}
+        links = {}
+        for i, candidate in enumerate(candidates):
+            year, _, id = candidate.get_reference("sow")
+            if year is None:
+                found = find(
+                    equal={"id": id, "farm": farm},
+                    smaller_equal={time_column: times[i]},
+                    order_by=f"{time_column} DESC",
+                    limit=1
+                )
+                links[i] = found[0] if len(found) > 0 else None
+                continue
+            found = herd.find_pigs(id, farm=farm, birth_year=year)
+            if len(found) == 0:
+                links[i] = None
+            else:
+                sows[i] = found
+        links.update(self.__link_to_sows(
+            sows, {i: times[i] for i in sows}, find, sow_of, time_of
+        ))
+        return links
+
+    def validate_farrowings(
+        self,
+        farm: str,
+        input_path: str = None,
+        dataframe: pd.DataFrame = None,
+        allow_none: bool = False
+    ) -> list[Candidate]:
+        """Read farrowings in the source excel or dataframe into candidates
+        and check their formats, without touching the database.
+
+        Choose to read data from excel or dataframe by passing in
+        corresponding arguments.
+
+        If read from excel, "分娩資料" sheet will be used.
+
+        :param farm: current farm.
+        :param input_path: path of the source excel, including filename.
+        :param dataframe: the source dataframe.
+        :param allow_none: allow empty non-primary key.
+        :raises: ValueError, FileNotFoundError, TypeError, KeyError.
+        """
+
+        dataframe = self.__read_sheet(
+            input_path, dataframe, "分娩資料", self.FARROWING_COLUMNS
+        )
         type_check(farm, "farm", str)
-        type_check(output_path, "output_path", str)
-        type_check(output_filename, "output_filename", str)
         type_check(allow_none, "allow_none", bool)
-        
-        # Standardize the dataframe.
-        dataframe.dropna(how = 'all', inplace = True)
-        rename_dict = {
-            "出生年品種耳號": "birthyear_breed_id", 
-            "分娩日期": "farrowing_date", 
-            "(公) 小豬": "n_of_male", 
-            "(母) 小豬": "n_of_female", 
-            "胎號": "litter_id",
-            "壓": "crushed", 
-            "黑": "black", 
-            "弱": "weak", 
-            "畸": "malformation", 
-            "死": "dead", 
-        }
-        dataframe = dataframe.rename(columns=rename_dict)
-        if not set(rename_dict.values()).issubset(dataframe.columns):
-            msg = "Missing key(s) in source excel or DataFrame."
-            logging.error(msg)
-            raise KeyError(msg)
-        dataframe = dataframe.astype("object")
-        
-        # Create farrowings.
-        report_farrowings = []
-        for _, data_row in dataframe.iterrows():
-            error_messages = []
+
+        candidates = []
+        for index, data_row in dataframe.iterrows():
             farrowing = Farrowing()
-            
-            # Set farrowing date first to do qeury in the finding estrus step.
+            candidate = self.__new_candidate(
+                index, data_row, self.FARROWING_COLUMNS, farrowing
+            )
+            candidates.append(candidate)
+
+            # Set farrowing date. The estrus is found before it when resolving.
             farrowing_date = data_row.get("farrowing_date")
             try:
                 if pd.isna(farrowing_date):
                     raise SyntaxError()
-                # pd.Timestamp is a child class of datetime.date 
-                # It will confuse general.transform_date(), so do the 
+                # pd.Timestamp is a child class of datetime.date
+                # It will confuse general.transform_date(), so do the
                 # transformation here.
-                farrowing_date = farrowing_date.date()
-                farrowing.set_farrowing_date(farrowing_date)
+                farrowing.set_farrowing_date(farrowing_date.date())
             except SyntaxError:
-                error_messages.append("分娩日期不能為空")
-            except TypeError:
-                error_messages.append("分娩日期格式錯誤")
-            except ValueError as e:
-                if "longer than" in e.args[0]:
-                    error_messages.append("分娩日期與發情日期間隔過長")
-                elif "shorter than" in e.args[0]:
-                    error_messages.append("分娩日期與發情日期間隔過短")
-                else:
-                    error_messages.append("分娩日期格式錯誤")
+                candidate.add_error("分娩日期不能為空")
+            except (TypeError, ValueError):
+                candidate.add_error("分娩日期格式錯誤")
 
-            # Set estrus.
-            birthyear_breed_id = data_row.get("birthyear_breed_id")
-            try:
-                if pd.isna(birthyear_breed_id):
-                    raise SyntaxError()
-                year, breed, id = self.__seperate_year_breed_id(birthyear_breed_id)
-                equal = {"id": id, "farm": farm}
-                larger_equal = {}
-                smaller_equal = {}
-                if year is not None:
-                    larger_equal["birthday"] = f"{year}-01-01"
-                    smaller_equal["birthday"] = f"{year}-12-31"
-                if not pd.isna(farrowing_date):
-                    smaller_equal["estrus_datetime"] = f"{farrowing_date} 10:00:00"
-                found = self.model.find_estrus(
-                    equal=equal, 
-                    smaller_equal=smaller_equal, 
-                    larger_equal=larger_equal, 
-                    order_by="estrus_datetime DESC"
-                )
-                if len(found) == 0:
-                    raise KeyError()
-                farrowing.set_estrus(found[0])
-            except SyntaxError:
-                error_messages.append("耳號不能為空")
-            except KeyError:
-                error_messages.append("資料庫中無所屬發情資料")
-            except TypeError:
-                error_messages.append("耳號格式錯誤")
-            except ValueError as e:
-                if "longer than" in e.args[0]:
-                    error_messages.append("分娩日期與發情日期間隔過長")
-                elif "shorter than" in e.args[0]:
-                    error_messages.append("分娩日期與發情日期間隔過短")
-                else:
-                    error_messages.append("未知錯誤")
+            self.__read_sow_tag(candidate, data_row, "birthyear_breed_id")
 
             # Set litter_id
             litter_id = data_row.get("litter_id")
-
             try:
                 if pd.isna(litter_id) and allow_none:
                     raise ZeroDivisionError()
@@ -1114,462 +1557,319 @@ class ExcelReader():
             except ZeroDivisionError:
                 pass
             except SyntaxError:
-                error_messages.append("胎號不能為空")
+                candidate.add_error("胎號不能為空")
             except TypeError:
-                error_messages.append("胎號格式錯誤")
+                candidate.add_error("胎號格式錯誤")
             except ValueError as e:
                 if "numeric" in e.args[0]:
-                    error_messages.append("胎號格式錯誤")
+                    candidate.add_error("胎號格式錯誤")
                 elif "in range" in e.args[0]:
-                    error_messages.append("胎號大小錯誤，須介於1000~9999")
+                    candidate.add_error("胎號大小錯誤，須介於1000~9999")
                 else:
-                    error_messages.append("未知錯誤")
+                    candidate.add_error("未知錯誤")
 
             # Set numeric attributes.
-            def set_numeric(arg_name, arg_chinese, setting_func):
-                arg = data_row.get(arg_name)
-                try:
-                    if allow_none and pd.isna(arg):
-                        raise ZeroDivisionError()
-                    if not allow_none and pd.isna(arg):
-                        raise SyntaxError()
-                    setting_func(int(arg))
-                except ZeroDivisionError:
-                    pass
-                except SyntaxError:
-                    error_messages.append(f"{arg_chinese}不能為空")
-                except TypeError:
-                    error_messages.append(f"{arg_chinese}格式錯誤")
-                except ValueError as e:
-                    if "invalid literal" in e.args[0]:
-                        error_messages.append(f"{arg_chinese}格式錯誤")
-                    elif "total born" in e.args[0]:
-                        error_messages.append("總出生數超出上限(30)")
-                    elif "than 0" in e.args[0]:
-                        error_messages.append(f"{arg_chinese}不能低於0")
-                    elif "litter_id must be" in e.args[0]:
-                        error_messages.append("胎號大小錯誤")
-                    else:
-                        error_messages.append("未知錯誤")
-            
-            set_numeric("crushed", "壓", farrowing.set_crushed)
-            set_numeric("black", "黑", farrowing.set_black)
-            set_numeric("weak", "弱", farrowing.set_weak)
-            set_numeric("malformation", "畸", farrowing.set_malformation)
-            set_numeric("dead", "死", farrowing.set_dead)
-            set_numeric("n_of_male", "(公)小豬", farrowing.set_n_of_male)
-            set_numeric("n_of_female", "(母)小豬", farrowing.set_n_of_female)
-            set_numeric("litter_id", "胎號", farrowing.set_litter_id)
-
-            if len(error_messages) > 0:
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = " ".join(error_messages)
-                report_farrowings.append(data_dict)
-                continue
+            for arg_name, arg_chinese, setting_func in (
+                ("crushed", "壓", farrowing.set_crushed),
+                ("black", "黑", farrowing.set_black),
+                ("weak", "弱", farrowing.set_weak),
+                ("malformation", "畸", farrowing.set_malformation),
+                ("dead", "死", farrowing.set_dead),
+                ("n_of_male", "(公)小豬", farrowing.set_n_of_male),
+                ("n_of_female", "(母)小豬", farrowing.set_n_of_female),
+                ("litter_id", "胎號", farrowing.set_litter_id)
+            ):
+                self.__read_numeric(
+                    candidate, data_row, allow_none, arg_name, arg_chinese, setting_func
+                )
 
-            # Update estrus pregnant status.
-            estrus = found[0]
-            if farrowing.get_born_alive() > 0:
-                estrus.set_pregnant(PregnantStatus.YES)
-                self.model.update_estrus(estrus)
-            
-            # Check duplicate
-            found = self.model.find_farrowings(equal={
-                "id": farrowing.get_estrus().get_sow().get_id(), 
-                "farm": farrowing.get_estrus().get_sow().get_farm(), 
-                "birthday": farrowing.get_estrus().get_sow().get_birthday(), 
-                "estrus_datetime": farrowing.get_estrus().get_estrus_datetime()
-            })
+        return candidates
 
-            if len(found) == 0:
-                self.model.insert_farrowing(farrowing)
-                continue
-            if found[0] == farrowing:
-                continue
+    def resolve_farrowings(self, farm: str, candidates: list[Candidate]) -> None:
+        """ Find the estrus of valid candidates from `validate_farrowings`, \
+        the latest one of the sow at or before 10 o'clock of the farrowing \
+        date.
 
-            msg = "遇到重複分娩紀錄，是否更新資料？Y：更新，N：不更新"
-            msg += f"\n讀到的分娩紀錄：{farrowing}"
-            msg += f"\n已有的分娩紀錄：{found[0]}"
-            if not ask(msg):
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = "分娩紀錄已存在於資料庫且與資料庫中數據不相符"
-                report_farrowings.append(data_dict)
+        :param farm: current farm.
+        :param candidates: candidates from `validate_farrowings`.
+        """
+
+        type_check(farm, "farm", str)
+        valid = [candidate for candidate in candidates if candidate.is_valid()]
+        times = [
+            (
+                pd.Timestamp(candidate.get_record().get_farrowing_date())
+                + pd.Timedelta(hours=10)
+            ).to_pydatetime()
+            for candidate in valid
+        ]
+        links = self.__link_by_tags(
+            farm, valid, times, self.model.find_estrus, Estrus.get_sow,
+            Estrus.get_estrus_datetime, "estrus_datetime"
+        )
+
+        for i, candidate in enumerate(valid):
+            if links[i] is None:
+                candidate.add_error("資料庫中無所屬發情資料")
                 continue
-            self.model.update_farrowing(farrowing)
+            try:
+                candidate.get_record().set_estrus(links[i])
+            except ValueError as e:
+                if "longer than" in e.args[0]:
+                    candidate.add_error("分娩日期與發情日期間隔過長")
+                elif "shorter than" in e.args[0]:
+                    candidate.add_error("分娩日期與發情日期間隔過短")
+                else:
+                    candidate.add_error("未知錯誤")
 
-        report_dataframe = pd.DataFrame(report_farrowings)
-        report_dataframe = report_dataframe.rename(columns={
-            value: key for key, value in rename_dict.items()
-        })
-        report_dataframe.to_csv(os.path.join(output_path, output_filename))
+    def write_farrowings(self, candidates: list[Candidate]) -> None:
+        """ Write valid candidates from `resolve_farrowings` with batched \
+        upserts. Estrus of written farrowings with born alive piglets are \
+        updated to pregnant in the same transaction.
 
-    def read_and_insert_weanings(
-        self, 
+        :param candidates: candidates from `resolve_farrowings`.
+        """
+
+        self.__write(
+            candidates, "Farrowings", self.model.find_farrowings,
+            lambda farrowing: self.__estrus_key(farrowing.get_estrus()),
+            self.__upsert_farrowings, "分娩紀錄"
+        )
+
+    def read_and_insert_farrowings(
+        self,
         farm: str,
-        input_path: str = None, 
+        input_path: str = None,
         dataframe: pd.DataFrame = None,
-        output_path: str = os.path.curdir, 
+        output_path: str = os.path.curdir,
         output_filename: str = "output.csv",
         allow_none: bool = False
     ) -> None:
-        """Read data from excel or dataframe and insert Weaning objects 
+        """Read data from excel or dataframe and insert Farrowing objects
         into database.
 
-        Choose to read data from excel or dataframe by passing in 
-        corresponding arguments.
+        Runs `validate_farrowings`, `resolve_farrowings` and \
+        `write_farrowings`.
 
         :param farm: current farm.
-        :param input_path: path of the source csv, including filename.
+        :param input_path: path of the source excel, including filename.
         :param dataframe: the source dataframe.
         :param output_path: path to save the report.
         :param output_filename: name of the report.
-        :param allow_none: allow empty non-primary key. 
+        :param allow_none: allow empty non-primary key.
         :raises: ValueError, FileNotFoundError, TypeError, KeyError.
         """
 
-        # Type check.
-        if input_path is None and dataframe is None:
-            msg = "You must choose to read from an excel file or a dataframe."
-            logging.error(msg)
-            raise ValueError(msg)
-        
-        if input_path is not None:
-            type_check(input_path, "input_path", str)
-            if not os.path.isfile(input_path):
-                msg = f"File {input_path} does not exist."
-                logging.error(msg)
-                raise FileNotFoundError(msg)
-            dataframe = pd.read_excel(
-                io=input_path, 
-                sheet_name="離乳資料"
-            )
+        candidates = self.validate_farrowings(farm, input_path, dataframe, allow_none)
+        self.resolve_farrowings(farm, candidates)
+        self.write_farrowings(candidates)
+        self.__save_report(candidates, output_path, output_filename)
 
-        if dataframe is not None:
-            type_check(dataframe, "dataframe", pd.DataFrame)
-        
+    def validate_weanings(
+        self,
+        farm: str,
+        input_path: str = None,
+        dataframe: pd.DataFrame = None,
+        allow_none: bool = False
+    ) -> list[Candidate]:
+        """Read weanings in the source excel or dataframe into candidates
+        and check their formats, without touching the database.
+
+        Choose to read data from excel or dataframe by passing in
+        corresponding arguments.
+
+        If read from excel, "離乳資料" sheet will be used.
+
+        :param farm: current farm.
+        :param input_path: path of the source excel, including filename.
+        :param dataframe: the source dataframe.
+        :param allow_none: allow empty non-primary key.
+        :raises: ValueError, FileNotFoundError, TypeError, KeyError.
+        """
+
+        dataframe = self.__read_sheet(
+            input_path, dataframe, "離乳資料", self.WEANING_COLUMNS
+        )
         type_check(farm, "farm", str)
-        type_check(output_path, "output_path", str)
-        type_check(output_filename, "output_filename", str)
         type_check(allow_none, "allow_none", bool)
 
-        # Standardize the dataframe.
-        dataframe.dropna(how = 'all', inplace = True)
-        rename_dict = {
-            "出生年品種耳號": "birthyear_breed_id", 
-            "離乳日期": "weaning_date", 
-            "哺乳數": "total_nursed_piglets", 
-            "離乳數": "total_weaning_piglets", 
-        }
-        dataframe = dataframe.rename(columns=rename_dict)
-        if not set(rename_dict.values()).issubset(dataframe.columns):
-            msg = "Missing key(s) in source excel or DataFrame."
-            logging.error(msg)
-            raise KeyError(msg)
-        dataframe = dataframe.astype("object")
-
-        # Create weanings.
-        report_weanings = []
-        for _, data_row in dataframe.iterrows():
-            error_messages = []
+        candidates = []
+        for index, data_row in dataframe.iterrows():
             weaning = Weaning()
+            candidate = self.__new_candidate(
+                index, data_row, self.WEANING_COLUMNS, weaning
+            )
+            candidates.append(candidate)
 
-            # Set weaning date first to do query in the finding farrowing step.
+            # Set weaning date. The farrowing is found before it when resolving.
             weaning_date = data_row.get("weaning_date")
             try:
                 if pd.isna(weaning_date):
                     raise SyntaxError()
-                # pd.Timestamp is a child class of datetime.date 
-                # It will confuse general.transform_date(), so do the 
+                # pd.Timestamp is a child class of datetime.date
+                # It will confuse general.transform_date(), so do the
                 # transformation here.
-                weaning_date = weaning_date.date()
-                weaning.set_weaning_date(weaning_date)
+                weaning.set_weaning_date(weaning_date.date())
             except SyntaxError:
-                error_messages.append("離乳日期不能為空")
-            except TypeError:
-                error_messages.append("離乳日期格式錯誤")
-            except ValueError as e:
-                if "too long" in e.args[0]:
-                    error_messages.append("分娩日期與離乳日期間隔過長")
-                elif "too short" in e.args[0]:
-                    error_messages.append("分娩日期與離乳日期間隔過短")
-                else:
-                    error_messages.append("離乳日期格式錯誤")
+                candidate.add_error("離乳日期不能為空")
+            except (TypeError, ValueError):
+                candidate.add_error("離乳日期格式錯誤")
 
-            # Set farrowing.
-            birthyear_breed_id = data_row.get("birthyear_breed_id")
-            try:
-                if pd.isna(birthyear_breed_id):
-                    raise SyntaxError()
-                year, breed, id = self.__seperate_year_breed_id(birthyear_breed_id)
-                equal = {"id": id, "farm": farm}
-                larger_equal = {}
-                smaller_equal = {}
-                if year is not None:
-                    larger_equal["birthday"] = f"{year}-01-01"
-                    smaller_equal["birthday"] = f"{year}-12-31"
-                if not pd.isna(weaning_date):
-                    smaller_equal["farrowing_date"] = weaning_date
-                found = self.model.find_farrowings(
-                    equal=equal, 
-                    smaller_equal=smaller_equal, 
-                    larger_equal=larger_equal, 
-                    order_by="farrowing_date DESC"
+            self.__read_sow_tag(candidate, data_row, "birthyear_breed_id")
+
+            # Set numeric attributes.
+            for arg_name, arg_chinese, setting_func in (
+                ("total_nursed_piglets", "哺乳數", weaning.set_total_nursed_piglets),
+                ("total_weaning_piglets", "離乳數", weaning.set_total_weaning_piglets)
+            ):
+                self.__read_numeric(
+                    candidate, data_row, allow_none, arg_name, arg_chinese, setting_func
                 )
-                if len(found) == 0:
-                    raise KeyError()
-                weaning.set_farrowing(found[0])
-            except SyntaxError:
-                error_messages.append("耳號不能為空")
-            except KeyError:
-                error_messages.append("資料庫中無所屬發情資料")
-            except TypeError:
-                error_messages.append("耳號格式錯誤")
+
+        return candidates
+
+    def resolve_weanings(self, farm: str, candidates: list[Candidate]) -> None:
+        """ Find the farrowing of valid candidates from `validate_weanings`, \
+        the latest one of the sow at or before the weaning date.
+
+        :param farm: current farm.
+        :param candidates: candidates from `validate_weanings`.
+        """
+
+        type_check(farm, "farm", str)
+        valid = [candidate for candidate in candidates if candidate.is_valid()]
+        times = [candidate.get_record().get_weaning_date() for candidate in valid]
+        links = self.__link_by_tags(
+            farm, valid, times, self.model.find_farrowings,
+            lambda farrowing: farrowing.get_estrus().get_sow(),
+            Farrowing.get_farrowing_date, "farrowing_date"
+        )
+
+        for i, candidate in enumerate(valid):
+            if links[i] is None:
+                candidate.add_error("資料庫中無所屬發情資料")
+                continue
+            try:
+                candidate.get_record().set_farrowing(links[i])
             except ValueError as e:
                 if "too long" in e.args[0]:
-                    error_messages.append("分娩日期與離乳日期間隔過長")
+                    candidate.add_error("分娩日期與離乳日期間隔過長")
                 elif "too short" in e.args[0]:
-                    error_messages.append("分娩日期與離乳日期間隔過短")
+                    candidate.add_error("分娩日期與離乳日期間隔過短")
                 else:
-                    error_messages.append("未知錯誤")
-
-            # Set numeric attributes.
-            def set_numeric(arg_name, arg_chinese, setting_func):
-                arg = data_row.get(arg_name)
-                try:
-                    if allow_none and pd.isna(arg):
-                        raise ZeroDivisionError()
-                    if not allow_none and pd.isna(arg):
-                        raise SyntaxError()
-                    setting_func(int(arg))
-                except ZeroDivisionError:
-                    pass
-                except SyntaxError:
-                    error_messages.append(f"{arg_chinese}不能為空")
-                except TypeError:
-                    error_messages.append(f"{arg_chinese}格式錯誤")
-                except ValueError as e:
-                    if "invalid literal" in e.args[0]:
-                        error_messages.append(f"{arg_chinese}格式錯誤")
-                    elif "smaller than 30." in e.args[0]:
-                        error_messages.append(f"{arg_chinese}需小於30")
-                    elif "or equal to 30. " in e.args[0]:
-                        error_messages.append(f"{arg_chinese}需小於30")
-                    elif "total_nursed_piglets must be more than " in e.args[0]:
-                        error_messages.append("離乳數需小於等於哺乳數")
-                    elif "greater or equal to 0. " in e.args[0]:
-                        error_messages.append(f"{arg_chinese}不能低於0")
-                    elif "than 0" in e.args[0]:
-                        error_messages.append(f"{arg_chinese}不能低於0")
-                    else:
-                        error_messages.append("未知錯誤")
-
-            set_numeric("total_nursed_piglets", "哺乳數", weaning.set_total_nursed_piglets)
-            set_numeric("total_weaning_piglets", "離乳數", weaning.set_total_weaning_piglets)
-
-            if len(error_messages) > 0:
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = " ".join(error_messages)
-                report_weanings.append(data_dict)
-                continue
+                    candidate.add_error("未知錯誤")
 
-            # Check duplicate.
-            id = weaning.get_farrowing().get_estrus().get_sow().get_id()
-            birthday = weaning.get_farrowing().get_estrus().get_sow().get_birthday()
-            estrus_datetime = weaning.get_farrowing().get_estrus().get_estrus_datetime()
-            found = self.model.find_weanings(equal={
-                "id": id, 
-                "birthday": birthday, 
-                "estrus_datetime": estrus_datetime
-            })
+    def write_weanings(self, candidates: list[Candidate]) -> None:
+        """ Write valid candidates from `resolve_weanings` with batched \
+        upserts.
 
-            if len(found) == 0:
-                self.model.insert_weaning(weaning)
-                continue
-            if found[0] == weaning:
-                continue
-            
-            msg = "遇到重複離乳紀錄，是否更新資料？Y：更新，N：不更新"
-            msg += f"\n讀到的離乳紀錄：{weaning}"
-            msg += f"\n已有的離乳紀錄：{found[0]}"
-            if not ask(msg):
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = "離乳紀錄已存在於資料庫且與資料庫中數據不相符"
-                report_weanings.append(data_dict)
-                continue
-            self.model.update_weaning(weaning)
+        :param candidates: candidates from `resolve_weanings`.
+        """
 
-        report_dataframe = pd.DataFrame(report_weanings)
-        report_dataframe = report_dataframe.rename(columns={
-            value: key for key, value in rename_dict.items()
-        })
-        report_dataframe.to_csv(os.path.join(output_path, output_filename))
+        self.__write(
+            candidates, "Weanings", self.model.find_weanings,
+            lambda weaning: self.__estrus_key(weaning.get_farrowing().get_estrus()),
+            self.model.upsert_weanings, "離乳紀錄"
+        )
 
-    def read_and_insert_individuals(
-                self, 
+    def read_and_insert_weanings(
+        self,
         farm: str,
-        input_path: str = None, 
+        input_path: str = None,
         dataframe: pd.DataFrame = None,
-        output_path: str = os.path.curdir, 
+        output_path: str = os.path.curdir,
         output_filename: str = "output.csv",
         allow_none: bool = False
     ) -> None:
-        """Read data from excel or dataframe and insert Individual objects 
+        """Read data from excel or dataframe and insert Weaning objects
         into database.
 
-        Choose to read data from excel or dataframe by passing in 
-        corresponding arguments.
+        Runs `validate_weanings`, `resolve_weanings` and `write_weanings`.
 
         :param farm: current farm.
-        :param input_path: path of the source csv, including filename.
+        :param input_path: path of the source excel, including filename.
         :param dataframe: the source dataframe.
         :param output_path: path to save the report.
         :param output_filename: name of the report.
-        :param allow_none: allow empty non-primary key. 
+        :param allow_none: allow empty non-primary key.
         :raises: ValueError, FileNotFoundError, TypeError, KeyError.
         """
 
-        # Type check.
-        if input_path is None and dataframe is None:
-            msg = "You must choose to read from an excel file or a dataframe."
-            logging.error(msg)
-            raise ValueError(msg)
-        
-        if input_path is not None:
-            type_check(input_path, "input_path", str)
-            if not os.path.isfile(input_path):
-                msg = f"File {input_path} does not exist."
-                logging.error(msg)
-                raise FileNotFoundError(msg)
-            dataframe = pd.read_excel(
-                io=input_path, 
-                sheet_name="小豬出生資料"
-            )
+        candidates = self.validate_weanings(farm, input_path, dataframe, allow_none)
+        self.resolve_weanings(farm, candidates)
+        self.write_weanings(candidates)
+        self.__save_report(candidates, output_path, output_filename)
 
-        if dataframe is not None:
-            type_check(dataframe, "dataframe", pd.DataFrame)
-        
+    def validate_individuals(
+        self,
+        farm: str,
+        input_path: str = None,
+        dataframe: pd.DataFrame = None,
+        allow_none: bool = False
+    ) -> list[Candidate]:
+        """Read piglets in the source excel or dataframe into candidates and
+        check their formats, without touching the database.
+
+        Choose to read data from excel or dataframe by passing in
+        corresponding arguments.
+
+        If read from excel, "小豬出生資料" sheet will be used.
+
+        :param farm: current farm.
+        :param input_path: path of the source excel, including filename.
+        :param dataframe: the source dataframe.
+        :param allow_none: allow empty non-primary key.
+        :raises: ValueError, FileNotFoundError, TypeError, KeyError.
+        """
+
+        dataframe = self.__read_sheet(
+            input_path, dataframe, "小豬出生資料", self.INDIVIDUAL_COLUMNS
+        )
         type_check(farm, "farm", str)
-        type_check(output_path, "output_path", str)
-        type_check(output_filename, "output_filename", str)
         type_check(allow_none, "allow_none", bool)
 
-        # Standardize the dataframe.
-        dataframe.dropna(how = 'all', inplace = True)
-        rename_dict = {
-            "親生母豬出生年品種耳號": "birth_sow_birthyear_breed_id", 
-            "親生母豬胎號": "birth_litter_id", 
-            "寄養母豬出生年品種耳號": "nurse_sow_birthyear_breed_id", 
-            "寄養母豬胎號": "nurse_litter_id", 
-            "小豬序號": "in_litter_id", 
-            "性別": "gender", 
-            "出生重": "born_weight", 
-            "離乳重": "weaning_weight"
-        }
-        dataframe = dataframe.rename(columns=rename_dict)
-        if not set(rename_dict.values()).issubset(dataframe.columns):
-            msg = "Missing key(s) in source excel or DataFrame."
-            logging.error(msg)
-            raise KeyError(msg)
-        dataframe = dataframe.astype("object")
-
-        # Create individuals.
-        report_individuals = []
-        for _, data_row in dataframe.iterrows():
-            error_messages = []
+        candidates = []
+        for index, data_row in dataframe.iterrows():
             individual = Individual()
-            
-            # Set birth litter.
-            birthyear_breed_id = data_row.get("birth_sow_birthyear_breed_id")
-            birth_litter_id = data_row.get("birth_litter_id")
-            try:
-                if pd.isna(birthyear_breed_id) or pd.isna(birth_litter_id):
-                    raise SyntaxError()
-                birth_litter_id = str(int(birth_litter_id))
-                birthyear, breed, id = self.__seperate_year_breed_id(birthyear_breed_id)
-                equal = {"id": id, "litter_id": birth_litter_id, "farm": farm}
-                if birthyear is not None:
-                    larger_equal = {"birthday": f"{birthyear}-01-01"}
-                    smaller_equal = {"birthday": f"{birthyear}-12-31"}
-                found = self.model.find_farrowings(
-                    equal=equal, 
-                    larger_equal=larger_equal, 
-                    smaller_equal=smaller_equal, 
-                    order_by="farrowing_date DESC"
-                )
-                if len(found) == 0:
-                    raise KeyError()
-                farrowing = found[0]
-                individual.set_birth_litter(farrowing)
-            except SyntaxError:
-                error_messages.append("親生母豬出生年品種耳號和胎號不能為空")
-            except KeyError:
-                error_messages.append("資料庫中沒有出生時的分娩資料")
-            except TypeError:
-                error_messages.append("搜尋出生胎次時出現未知錯誤")
-            except ValueError as e:
-                if "earlier" in e.args[0]:
-                    error_messages.append("出生胎次與離乳胎次時間配對錯誤")
-                else:
-                    error_messages.append("搜尋出生胎次時出現未知錯誤")
-
-            # Set nurse litter.
-            birthyear_breed_id = data_row.get("nurse_sow_birthyear_breed_id")
-            nurse_litter_id = data_row.get("nurse_litter_id")
-            try:
-                if pd.isna(birthyear_breed_id) or pd.isna(nurse_litter_id):
-                    raise SyntaxError()
-                nurse_litter_id = str(int(nurse_litter_id))
-                birthyear, breed, id = self.__seperate_year_breed_id(birthyear_breed_id)
-                equal = {"id": id, "litter_id": nurse_litter_id, "farm": farm}
-                if birthyear is not None:
-                    larger_equal = {"birthday": f"{birthyear}-01-01"}
-                    smaller_equal = {"birthday": f"{birthyear}-12-31"}
-                found = self.model.find_farrowings(
-                    equal=equal, 
-                    larger_equal=larger_equal, 
-                    smaller_equal=smaller_equal, 
-                    order_by="farrowing_date DESC"
-                )
-                if len(found) == 0:
-                    raise KeyError()
-                farrowing = found[0]
-                found = self.model.find_weanings(equal={
-                    "id": farrowing.get_estrus().get_sow().get_id(), 
-                    "farm": farm, 
-                    "birthday": farrowing.get_estrus().get_sow().get_birthday(), 
-                    "estrus_datetime": farrowing.get_estrus().get_estrus_datetime()
-                })
-                if len(found) == 0:
-                    raise KeyError()
-                weaning = found[0]
-                individual.set_nurse_litter(weaning)
-            except SyntaxError:
-                error_messages.append("寄養母豬出生年品種耳號和胎號不能為空")
-            except KeyError:
-                error_messages.append("資料庫中沒有離乳時的離乳資料")
-            except TypeError:
-                error_messages.append("搜尋離乳胎次時出現未知錯誤")
-            except ValueError as e:
-                if "earlier" in e.args[0]:
-                    error_messages.append("出生胎次與離乳胎次時間配對錯誤")
-                else:
-                    error_messages.append("搜尋離乳胎次時出現未知錯誤")
+            candidate = self.__new_candidate(
+                index, data_row, self.INDIVIDUAL_COLUMNS, individual
+            )
+            candidates.append(candidate)
+
+            # Read birth and nurse litters. They are found when resolving.
+            for prefix, name, stage in (
+                ("birth", "親生", "出生"), ("nurse", "寄養", "離乳")
+            ):
+                birthyear_breed_id = data_row.get(f"{prefix}_sow_birthyear_breed_id")
+                litter_id = data_row.get(f"{prefix}_litter_id")
+                try:
+                    if pd.isna(birthyear_breed_id) or pd.isna(litter_id):
+                        raise SyntaxError()
+                    candidate.set_reference(
+                        f"{prefix}_litter",
+                        self.__read_tag(birthyear_breed_id)
+                        + (str(int(litter_id)),)
+                    )
+                except SyntaxError:
+                    candidate.add_error(f"{name}母豬出生年品種耳號和胎號不能為空")
+                except (TypeError, ValueError):
+                    candidate.add_error(f"搜尋{stage}胎次時出現未知錯誤")
 
             # Set in_litter_id
             in_litter_id = data_row.get("in_litter_id")
             try:
                 if pd.isna(in_litter_id):
                     raise SyntaxError()
-                individual.set_in_litter_id(str(int(in_litter_id)))                
+                individual.set_in_litter_id(str(int(in_litter_id)))
             except SyntaxError:
-                error_messages.append("小豬序號不能為空")
+                candidate.add_error("小豬序號不能為空")
             except TypeError:
-                error_messages.append("小豬序號格式錯誤")
+                candidate.add_error("小豬序號格式錯誤")
             except ValueError as e:
-                if "numeric" in e.args[0]:
-                    error_messages.append("小豬序號格式錯誤")
                 if "range" in e.args[0]:
-                    error_messages.append("小豬序號數值不在1~30內")
+                    candidate.add_error("小豬序號數值不在1~30內")
+                else:
+                    candidate.add_error("小豬序號格式錯誤")
 
             # Set gender
             gender = data_row.get("gender")
@@ -1582,82 +1882,143 @@ class ExcelReader():
             except ZeroDivisionError:
                 pass
             except SyntaxError:
-                error_messages.append()
+                candidate.add_error("性別不能為空")
             except TypeError:
-                error_messages.append("性別格式錯誤")
+                candidate.add_error("性別格式錯誤")
             except ValueError:
-                error_messages.append("性別未定義")
+                candidate.add_error("性別未定義")
+
+            # Set weights
+            for column, name, setting_func in (
+                ("born_weight", "出生重", individual.set_born_weight),
+                ("weaning_weight", "離乳重", individual.set_weaning_weight)
+            ):
+                weight = data_row.get(column)
+                try:
+                    if pd.isna(weight) and allow_none:
+                        raise ZeroDivisionError()
+                    if pd.isna(weight) and not allow_none:
+                        raise SyntaxError()
+                    setting_func(float(weight))
+                except ZeroDivisionError:
+                    pass
+                except SyntaxError:
+                    candidate.add_error(f"{name}不能為空")
+                except TypeError:
+                    candidate.add_error(f"{name}格式錯誤")
+                except ValueError:
+                    candidate.add_error(f"{name}不能小於零")
+
+        return candidates
+
+    def resolve_individuals(self, farm: str, candidates: list[Candidate]) -> None:
+        """ Find birth and nurse litters of valid candidates from \
+        `validate_individuals`.
+
+        Piglets of a litter share the lookup, so every litter is queried \
+        once.
+
+        :param farm: current farm.
+        :param candidates: candidates from `validate_individuals`.
+        """
+
+        type_check(farm, "farm", str)
+        farrowings = {}
+        weanings = {}
 
-            # Set born weight
-            weight = data_row.get("born_weight")
+        def find_litter(reference: tuple, found: dict, find, litter_column: str, order_by: str):
+            if reference not in found:
+                birthyear, breed, id, litter_id = reference
+                equal = {"id": id, litter_column: litter_id, "farm": farm}
+                if birthyear is not None:
+                    equal["sow.birth_year"] = int(birthyear)
+                    equal["sow.breed"] = breed
+                litters = find(equal=equal, order_by=order_by, limit=1)
+                found[reference] = litters[0] if len(litters) > 0 else None
+            return found[reference]
+
+        for candidate in candidates:
+            if not candidate.is_valid():
+                continue
+            individual = candidate.get_record()
+
+            # Set birth litter.
+            farrowing = find_litter(
+                candidate.get_reference("birth_litter"), farrowings,
+                self.model.find_farrowings_with_lineage, "litter_id",
+                "farrowing_date DESC"
+            )
             try:
-                if pd.isna(weight) and allow_none:
-                    raise ZeroDivisionError()
-                if pd.isna(weight) and not allow_none:
-                    raise SyntaxError()
-                individual.set_born_weight(float(weight))
-            except ZeroDivisionError:
-                pass
-            except SyntaxError:
-                error_messages.append()
-            except TypeError:
-                error_messages.append("出生重格式錯誤")
-            except ValueError:
-                error_messages.append("出生重不能小於零")
+                if farrowing is None:
+                    raise KeyError()
+                individual.set_birth_litter(farrowing)
+            except KeyError:
+                candidate.add_error("資料庫中沒有出生時的分娩資料")
+            except ValueError as e:
+                if "earlier" in e.args[0]:
+                    candidate.add_error("出生胎次與離乳胎次時間配對錯誤")
+                else:
+                    candidate.add_error("搜尋出生胎次時出現未知錯誤")
 
-            # Set weaning weight
-            weight = data_row.get("weaning_weight")
+            # Set nurse litter. Weaning and its farrowing in one query.
+            weaning = find_litter(
+                candidate.get_reference("nurse_litter"), weanings,
+                self.model.find_weanings_with_lineage, "farrowing.litter_id",
+                "farrowing.farrowing_date DESC"
+            )
             try:
-                if pd.isna(weight) and allow_none:
-                    raise ZeroDivisionError()
-                if pd.isna(weight) and not allow_none:
-                    raise SyntaxError()
-                individual.set_weaning_weight(float(weight))
-            except ZeroDivisionError:
-                pass
-            except SyntaxError:
-                error_messages.append()
-            except TypeError:
-                error_messages.append("離乳重格式錯誤")
-            except ValueError:
-                error_messages.append("離乳重不能小於零")
+                if weaning is None:
+                    raise KeyError()
+                individual.set_nurse_litter(weaning)
+            except KeyError:
+                candidate.add_error("資料庫中沒有離乳時的離乳資料")
+            except ValueError as e:
+                if "earlier" in e.args[0]:
+                    candidate.add_error("出生胎次與離乳胎次時間配對錯誤")
+                else:
+                    candidate.add_error("搜尋離乳胎次時出現未知錯誤")
 
-            if len(error_messages) > 0:
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = " ".join(error_messages)
-                report_individuals.append(data_dict)
-                continue
+    def write_individuals(self, candidates: list[Candidate]) -> None:
+        """ Write valid candidates from `resolve_individuals` with batched \
+        upserts.
 
-            # Check duplicate.
-            id = individual.get_birth_litter().get_estrus().get_sow().get_id()
-            birthday = individual.get_birth_litter().get_estrus().get_sow().get_birthday()
-            estrus_datetime = individual.get_birth_litter().get_estrus().get_estrus_datetime()
-            found = self.model.find_individuals(equal={
-                "birth_sow_id": id, 
-                "birth_sow_birthday": birthday, 
-                "birth_sow_farm": farm, 
-                "birth_estrus_datetime": estrus_datetime, 
-                "in_litter_id": str(int(in_litter_id))
-            })
+        :param candidates: candidates from `resolve_individuals`.
+        """
 
-            if len(found) == 0:
-                self.model.insert_individual(individual)
-                continue
-            if found[0] == individual:
-                continue
-            
-            msg = "遇到重複小豬出生資料，是否更新資料？Y：更新，N：不更新"
-            msg += f"\n讀到的小豬出生資料：{individual}"
-            msg += f"\n已有的小豬出生資料：{found[0]}"
-            if not ask(msg):
-                data_dict = data_row.to_dict()
-                data_dict["錯誤訊息"] = "小豬出生資料已存在於資料庫且與資料庫中數據不相符"
-                report_individuals.append(data_dict)
-                continue
-            self.model.update_individual(individual)
+        def key_of(individual: Individual) -> tuple:
+            estrus = individual.get_birth_litter().get_estrus()
+            return self.__estrus_key(estrus) + (individual.get_in_litter_id(),)
+
+        self.__write(
+            candidates, "Individuals", self.model.find_individuals, key_of,
+            self.model.upsert_individuals, "小豬出生資料"
+        )
+
+    def read_and_insert_individuals(
+        self,
+        farm: str,
+        input_path: str = None,
+        dataframe: pd.DataFrame = None,
+        output_path: str = os.path.curdir,
+        output_filename: str = "output.csv",
+        allow_none: bool = False
+    ) -> None:
+        """Read data from excel or dataframe and insert Individual objects
+        into database.
+
+        Runs `validate_individuals`, `resolve_individuals` and \
+        `write_individuals`.
+
+        :param farm: current farm.
+        :param input_path: path of the source excel, including filename.
+        :param dataframe: the source dataframe.
+        :param output_path: path to save the report.
+        :param output_filename: name of the report.
+        :param allow_none: allow empty non-primary key.
+        :raises: ValueError, FileNotFoundError, TypeError, KeyError.
+        """
 
-        report_dataframe = pd.DataFrame(report_individuals)
-        report_dataframe = report_dataframe.rename(columns={
-            value: key for key, value in rename_dict.items()
-        })
-        report_dataframe.to_csv(os.path.join(output_path, output_filename))
+        candidates = self.validate_individuals(farm, input_path, dataframe, allow_none)
+        self.resolve_individuals(farm, candidates)
+        self.write_individuals(candidates)
+        self.__save_report(candidates, output_path, output_filename)
@@ -0,0 +1,202 @@
+import logging
+
+import pymysql
+
+
+class Migration():
+
+    def __init__(self, version: int, description: str, statements: tuple):
+        """ One step of the database schema.
+
+        :param version: version of the schema after this step, starts from 1.
+        :param description: what the step changes.
+        :param statements: DDL statements of the step, run in order.
+        """
+
+        self.__version = version
+        self.__description = description
+        self.__statements = statements
+
+    def get_version(self) -> int:
+        return self.__version
+
+    def get_description(self) -> str:
+        return self.__description
+
+    def get_statements(self) -> tuple:
+        return self.__statements
+
+
+# Table recording applied migrations.
+VERSION_TABLE = """CREATE TABLE IF NOT EXISTS SchemaVersion(
+    version smallint unsigned PRIMARY KEY,
+    description varchar(255) NOT NULL,
+    applied_at datetime NOT NULL DEFAULT CURRENT_TIMESTAMP
+);"""
+
+# Errors of a statement whose change already exists, e.g. an index created
+# before the version was recorded. Such statements are skipped.
+# 1060: duplicate column name, 1061: duplicate key name.
+EXISTING_ERRORS = (1060, 1061)
+
+MIGRATIONS = (
+    Migration(1, "Create tables", (
+        """CREATE TABLE IF NOT EXISTS Pigs(
+            id varchar(20),
+            birthday date,
+            farm varchar(20),
+            breed char(3),
+            dam_id varchar(20),
+            dam_birthday date,
+            dam_farm varchar(20),
+            sire_id varchar(20),
+            sire_birthday date,
+            sire_farm varchar(20),
+            reg_id char(6) UNIQUE,
+            gender char(10),
+            chinese_name char(5),
+            litter tinyint unsigned,
+            PRIMARY KEY (id, birthday, farm),
+            FOREIGN KEY (dam_id, dam_birthday, dam_farm) REFERENCES Pigs(id, birthday, farm),
+            FOREIGN KEY (sire_id, sire_birthday, sire_farm) REFERENCES Pigs(id, birthday, farm)
+        );""",
+        """CREATE TABLE IF NOT EXISTS Estrus(
+            id varchar(20),
+            birthday date,
+            farm varchar(20),
+            estrus_datetime datetime,
+            pregnant ENUM('Yes', 'No', 'Unknown', 'Abortion'),
+            parity tinyint unsigned,
+            PRIMARY KEY (id, birthday, farm, estrus_datetime),
+            FOREIGN KEY (id, birthday, farm) REFERENCES Pigs(id, birthday, farm)
+        );""",
+        """CREATE TABLE IF NOT EXISTS Matings(
+            sow_id varchar(20),
+            sow_birthday date,
+            sow_farm varchar(20),
+            estrus_datetime datetime,
+            mating_datetime datetime,
+            boar_id varchar(20) NOT NULL,
+            boar_birthday date NOT NULL,
+            boar_farm varchar(20) NOT NULL,
+            PRIMARY KEY (sow_id, sow_birthday, sow_farm, estrus_datetime, mating_datetime),
+            FOREIGN KEY (sow_id, sow_birthday, sow_farm, estrus_datetime) REFERENCES Estrus(id, birthday, farm, estrus_datetime),
+            FOREIGN KEY (boar_id, boar_birthday, boar_farm) REFERENCES Pigs(id, birthday, farm)
+        );""",
+        """CREATE TABLE IF NOT EXISTS Farrowings(
+            id varchar(20),
+            birthday date,
+            farm varchar(20),
+            estrus_datetime datetime,
+            farrowing_date date NOT NULL,
+            litter_id smallint unsigned,
+            crushed tinyint unsigned,
+            black tinyint unsigned,
+            weak tinyint unsigned,
+            malformation tinyint unsigned,
+            dead tinyint unsigned,
+            n_of_male tinyint unsigned,
+            n_of_female tinyint unsigned,
+            PRIMARY KEY (id, birthday, farm, estrus_datetime),
+            FOREIGN KEY (id, birthday, farm, estrus_datetime) REFERENCES Estrus (id, birthday, farm, estrus_datetime)
+        );""",
+        """CREATE TABLE IF NOT EXISTS Weanings(
+            id varchar(20),
+            birthday date,
+            farm varchar(20),
+            estrus_datetime datetime,
+            weaning_date date NOT NULL,
+            total_nursed_piglets tinyint unsigned,
+            total_weaning_piglets tinyint unsigned,
+            PRIMARY KEY (id, birthday, farm, estrus_datetime),
+            FOREIGN KEY (id, birthday, farm, estrus_datetime) REFERENCES Farrowings (id, birthday, farm, estrus_datetime)
+        );""",
+        """CREATE TABLE IF NOT EXISTS Individuals(
+            birth_sow_id varchar(20),
+            birth_sow_birthday date,
+            birth_sow_farm varchar(20),
+            birth_estrus_datetime datetime,
+            nurse_sow_id varchar(20),
+            nurse_sow_birthday date,
+            nurse_sow_farm varchar(20),
+            nurse_estrus_datetime datetime,
+            gender char(10),
+            in_litter_id varchar(3),
+            born_weight float unsigned,
+            weaning_weight float unsigned,
+            PRIMARY KEY (birth_sow_id, birth_sow_birthday, birth_sow_farm, birth_estrus_datetime, in_litter_id),
+            FOREIGN KEY (birth_sow_id, birth_sow_birthday, birth_sow_farm, birth_estrus_datetime) REFERENCES Farrowings (id, birthday, farm, estrus_datetime),
+            FOREIGN KEY (nurse_sow_id, nurse_sow_birthday, nurse_sow_farm, nurse_estrus_datetime) REFERENCES Weanings (id, birthday, farm, estrus_datetime)
+        );"""
+    )),
+    Migration(2, "Add indexes of reader lookups", (
+        # Sows and boars: farm, id and gender, maybe breed, in a birthday range.
+        "CREATE INDEX idx_pigs_farm_id ON Pigs (farm, id, gender, breed, birthday);",
+        # Sires and dams: id, breed and gender born before a piglet, any farm.
+        "CREATE INDEX idx_pigs_id_breed ON Pigs (id, breed, gender, birthday);",
+        # Estrus of a sow known by id, farm and birth year. Lookups with the
+        # exact birthday use the primary key.
+        "CREATE INDEX idx_estrus_farm_id ON Estrus (farm, id, birthday, estrus_datetime);",
+        # Farrowings of a sow by litter id.
+        "CREATE INDEX idx_farrowings_farm_id_litter ON Farrowings (farm, id, litter_id, birthday);",
+        # Latest farrowing of a sow before a weaning date.
+        "CREATE INDEX idx_farrowings_farm_id_date ON Farrowings (farm, id, farrowing_date);"
+    )),
+    Migration(3, "Add birth year of pigs", (
+        # Tags in excels are {birth_year}{breed}{id}.
+        "ALTER TABLE Pigs ADD COLUMN birth_year smallint unsigned AS (YEAR(birthday)) STORED;",
+        "CREATE INDEX idx_pigs_farm_id_year ON Pigs (farm, id, birth_year, breed);"
+    ))
+)
+
+
+def get_latest_version() -> int:
+    """ Return the version of the schema after all migrations."""
+
+    return MIGRATIONS[-1].get_version()
+
+
+def get_version(connection: pymysql.Connection) -> int:
+    """ Return the schema version of the database, 0 if nothing applied.
+
+    The version table is created if it does not exist.
+    """
+
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        cursor.execute(VERSION_TABLE)
+        cursor.execute("SELECT MAX(version) FROM SchemaVersion;")
+        version = cursor.fetchone()[0]
+    return 0 if version is None else version
+
+
+def migrate(connection: pymysql.Connection) -> list[Migration]:
+    """ Apply migrations newer than the database version, in order.
+
+    MySQL commits DDL implicitly, so each migration is recorded right after \
+    its statements. A failed migration can be rerun: changes which already \
+    exist are skipped.
+
+    :param connection: connection to the database, not in a transaction.
+    :return: applied migrations.
+    """
+
+    version = get_version(connection)
+    applied = []
+    with connection.cursor(pymysql.cursors.Cursor) as cursor:
+        for migration in MIGRATIONS:
+            if migration.get_version() <= version:
+                continue
+            for statement in migration.get_statements():
+                try:
+                    cursor.execute(statement)
+                except pymysql.err.OperationalError as error:
+                    if error.args[0] not in EXISTING_ERRORS:
+                        logging.error(error.args[1])
+                        raise error
+            cursor.execute(
+                "INSERT INTO SchemaVersion (version, description) VALUES (%s, %s);",
+                (migration.get_version(), migration.get_description())
+            )
+            connection.commit()
+            applied.append(migration)
+    return applied
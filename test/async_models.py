@@ -0,0 +1,73 @@
+import asyncio
+import unittest
+
+from breeding_db.async_models import AsyncModel
+from breeding_db.data_structures import *
+
+
+class AsyncModelTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.model = AsyncModel("test/helper/database_settings.json", concurrency=3)
+
+    def tearDown(self):
+        self.model.get_model()._truncate_all()
+        self.model.close()
+        self.model = None
+
+    async def test_concurrent_lookups(self):
+
+        pigs = [
+            Pig(id=f"12345{i}", birthday="1999-05-12", farm="test farm", breed="L")
+            for i in range(5)
+        ]
+        self.assertEqual([], await self.model.insert_pigs(pigs))
+
+        found = await asyncio.gather(*[self.model.find_pig(pig) for pig in pigs])
+        self.assertEqual(pigs, found)
+        found = await self.model.find_pigs(equal={"farm": "test farm"}, order_by="id ASC")
+        self.assertEqual(pigs, found)
+
+        pigs[0].set_chinese_name("小花")
+        await self.model.update_pig(pigs[0])
+        found = await self.model.find_pig(pigs[0])
+        self.assertEqual("小花", found.get_chinese_name())
+
+    async def test_more_calls_than_connections(self):
+
+        # Calls beyond the pool size wait for a free connection.
+        size = self.model.get_model().get_pool().get_size()
+        pigs = [
+            Pig(id=f"1234{i:02d}", birthday="1999-05-12", farm="test farm", breed="L")
+            for i in range(size * 3)
+        ]
+        self.assertEqual([], await self.model.insert_pigs(pigs))
+        found = await asyncio.gather(*[self.model.find_pig(pig) for pig in pigs])
+        self.assertEqual(pigs, found)
+        self.assertLessEqual(self.model.get_model().get_pool().get_open_count(), size)
+
+    async def test_surface(self):
+
+        with self.assertRaises(AttributeError):
+            self.model.iter_pigs
+        with self.assertRaises(AttributeError):
+            self.model._delete_all
+        with self.assertRaises(ValueError):
+            AsyncModel("test/helper/database_settings.json", concurrency=0)
+        size = self.model.get_model().get_pool().get_size()
+        with self.assertRaises(ValueError):
+            AsyncModel("test/helper/database_settings.json", concurrency=size + 1)
+
+    async def test_aclose(self):
+
+        # Closing waits for running calls without blocking other coroutines.
+        pig = Pig(id="123456", birthday="1999-05-12", farm="test farm")
+        async with AsyncModel("test/helper/database_settings.json") as model:
+            insert = asyncio.create_task(model.insert_pig(pig))
+            await asyncio.sleep(0)
+        self.assertIsNone(await insert)
+        self.assertEqual(pig, await self.model.find_pig(pig))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+import unittest
+from datetime import date, datetime
+
+from breeding_db.models import Model
+from breeding_db.indexes import HerdIndex, SowTimeline
+from breeding_db.data_structures import *
+
+
+class HerdIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.model = Model("test/helper/database_settings.json")
+        pigs = [
+            Pig(id="123456", birthday="2021-03-01", farm="test farm", breed="L", gender="F"), 
+            Pig(id="123456", birthday="2022-02-01", farm="test farm", breed="L", gender="F", reg_id="654321"), 
+            Pig(id="123456", birthday="2022-08-01", farm="test farm", breed="L", gender="F"), 
+            Pig(id="123456", birthday="2020-05-01", farm="test farm", breed="Y", gender="M"), 
+            Pig(id="123456", birthday="2020-05-01", farm="other farm", breed="L", gender="F")
+        ]
+        self.model.insert_pigs(pigs)
+
+    def tearDown(self):
+        self.model._truncate_all()
+        self.model = None
+
+    def test_find(self):
+
+        herd = HerdIndex(self.model, "test farm")
+        self.assertEqual(4, herd.get_count())
+
+        pig = Pig(id="123456", birthday="2022-02-01", farm="test farm")
+        self.assertEqual(self.model.find_pig(pig), herd.find_pig(pig))
+        pig = Pig(id="123456", birthday="2020-05-01", farm="other farm")
+        self.assertIsNone(herd.find_pig(pig))
+        self.assertEqual(date(2022, 2, 1), herd.find_pig_by_reg_id("654321").get_birthday())
+        self.assertIsNone(herd.find_pig_by_reg_id("111111"))
+
+        # Same as the database lookups.
+        found = herd.find_pig_by_tag(2022, "L", "123456", "test farm", "F")
+        self.assertEqual(date(2022, 8, 1), found.get_birthday())
+        self.assertIsNone(herd.find_pig_by_tag(2022, "L", "123456", "test farm", "M"))
+        found = herd.find_pigs("123456", breed="L", gender="F", born_before=date(2022, 8, 1))
+        self.assertEqual(
+            self.model.find_pigs(
+                equal={"id": "123456", "breed": "L", "gender": "F", "farm": "test farm"}, 
+                smaller={"birthday": "2022-08-01"}
+            ), 
+            found
+        )
+        self.assertEqual(
+            found, 
+            herd.find_pigs("123456", breed="L", gender="F", born_before=datetime(2022, 8, 1, 12))
+        )
+        found = herd.find_pigs("123456", farm="test farm", gender="F")
+        self.assertEqual(date(2022, 8, 1), found[-1].get_birthday())
+        self.assertEqual([], herd.find_pigs("654321"))
+        with self.assertRaises(ValueError):
+            herd.find_pigs("123456", birth_year="22a")
+
+        # All farms.
+        herd = HerdIndex(self.model)
+        self.assertEqual(5, herd.get_count())
+        self.assertEqual(4, len(herd.find_pigs("123456", breed="L", gender="F")))
+
+    def test_add(self):
+
+        herd = HerdIndex(self.model, "test farm")
+
+        pig = Pig(id="654321", birthday="2023-01-01", farm="test farm", breed="D", gender="M")
+        herd.add(pig)
+        self.assertIs(pig, herd.find_pig(pig))
+        self.assertEqual([pig], herd.find_pigs("654321", breed="D", gender="M"))
+
+        # Replace a pig with the same primary keys.
+        pig = Pig(id="123456", birthday="2022-02-01", farm="test farm", breed="Y", gender="F")
+        herd.add(pig)
+        self.assertEqual(5, herd.get_count())
+        self.assertIsNone(herd.find_pig_by_reg_id("654321"))
+        self.assertIs(pig, herd.find_pig_by_tag(2022, "Y", "123456", "test farm"))
+        found = herd.find_pig_by_tag(2022, "L", "123456", "test farm")
+        self.assertEqual(date(2022, 8, 1), found.get_birthday())
+
+        # Pigs of other farms are ignored.
+        herd.add(Pig(id="111111", birthday="2023-01-01", farm="other farm"))
+        self.assertEqual(5, herd.get_count())
+        with self.assertRaises(ValueError):
+            herd.add(Pig(id="111111"))
+
+
+
+class SowTimelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.model = Model("test/helper/database_settings.json")
+        self.sow = Pig(id="123456", birthday="2020-01-01", farm="test farm", gender="F")
+        self.model.insert_pig(self.sow)
+        self.model.insert_estrus_many([
+            Estrus(sow=self.sow, estrus_datetime="2021-01-01 10:00:00", parity=1), 
+            Estrus(sow=self.sow, estrus_datetime="2021-06-01 10:00:00", parity=2), 
+            Estrus(sow=self.sow, estrus_datetime="2021-07-01 10:00:00"), 
+            Estrus(sow=self.sow, estrus_datetime="2022-01-01 10:00:00", parity=3)
+        ])
+
+    def tearDown(self):
+        self.model._truncate_all()
+        self.model = None
+
+    def test_parities(self):
+
+        timeline = SowTimeline(self.model, "test farm")
+        self.assertEqual(4, timeline.get_count())
+
+        self.assertEqual((None, 1), (
+            timeline.get_previous_parity(self.sow, datetime(2020, 12, 1)), 
+            timeline.get_next_parity(self.sow, datetime(2020, 12, 1))
+        ))
+        # Estrus at the datetime itself is excluded.
+        self.assertEqual((1, 3), (
+            timeline.get_previous_parity(self.sow, datetime(2021, 6, 1, 10)), 
+            timeline.get_next_parity(self.sow, datetime(2021, 6, 1, 10))
+        ))
+        # Estrus without parity is ignored.
+        self.assertEqual((2, 3), (
+            timeline.get_previous_parity(self.sow, datetime(2021, 8, 1)), 
+            timeline.get_next_parity(self.sow, datetime(2021, 8, 1))
+        ))
+        self.assertEqual([datetime(2021, 6, 1, 10)], timeline.find_datetimes(self.sow, 2))
+
+        other = Pig(id="654321", birthday="2020-01-01", farm="test farm")
+        self.assertIsNone(timeline.get_previous_parity(other, datetime(2021, 8, 1)))
+        with self.assertRaises(ValueError):
+            timeline.get_next_parity(Pig(id="123456"), datetime(2021, 8, 1))
+        with self.assertRaises(TypeError):
+            timeline.get_next_parity(self.sow, "2021-08-01")
+
+    def test_add(self):
+
+        timeline = SowTimeline(self.model, "test farm")
+
+        # Replace the parity of an existing estrus.
+        timeline.add(Estrus(sow=self.sow, estrus_datetime="2021-07-01 10:00:00", parity=2))
+        self.assertEqual(4, timeline.get_count())
+        self.assertEqual(
+            [datetime(2021, 6, 1, 10), datetime(2021, 7, 1, 10)], 
+            timeline.find_datetimes(self.sow, 2)
+        )
+
+        timeline.add(Estrus(sow=self.sow, estrus_datetime="2022-06-01 10:00:00", parity=3))
+        self.assertEqual(5, timeline.get_count())
+        self.assertEqual(3, timeline.get_previous_parity(self.sow, datetime(2023, 1, 1)))
+
+        # Removing the parity of an estrus keeps it out of lookups.
+        timeline.add(Estrus(sow=self.sow, estrus_datetime="2022-06-01 10:00:00"))
+        self.assertEqual(5, timeline.get_count())
+        self.assertIsNone(timeline.get_next_parity(self.sow, datetime(2022, 2, 1)))
+        self.assertEqual([datetime(2022, 1, 1, 10)], timeline.find_datetimes(self.sow, 3))
+
+        # Estrus of other farms are ignored.
+        other = Pig(id="123456", birthday="2020-01-01", farm="other farm")
+        timeline.add(Estrus(sow=other, estrus_datetime="2022-06-01 10:00:00", parity=3))
+        self.assertEqual(5, timeline.get_count())
+
+    def test_unordered_parities(self):
+
+        # Parities recorded out of order still give the largest before and the
+        # smallest after.
+        timeline = SowTimeline(None, "test farm")
+        timeline.add(Estrus(sow=self.sow, estrus_datetime="2021-01-01 10:00:00", parity=2))
+        timeline.add(Estrus(sow=self.sow, estrus_datetime="2021-06-01 10:00:00", parity=1))
+        timeline.add(Estrus(sow=self.sow, estrus_datetime="2022-01-01 10:00:00", parity=3))
+        self.assertEqual((2, 3), (
+            timeline.get_previous_parity(self.sow, datetime(2021, 8, 1)),
+            timeline.get_next_parity(self.sow, datetime(2021, 8, 1))
+        ))
+        self.assertEqual(1, timeline.get_next_parity(self.sow, datetime(2020, 12, 1)))
+
+        timeline.add(Estrus(sow=self.sow, estrus_datetime="2021-06-01 10:00:00", parity=4))
+        self.assertEqual((4, 2), (
+            timeline.get_previous_parity(self.sow, datetime(2021, 8, 1)),
+            timeline.get_next_parity(self.sow, datetime(2020, 12, 1))
+        ))
+
+
+if __name__ == '__main__':
+    unittest.main()
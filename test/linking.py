@@ -0,0 +1,116 @@
+import unittest
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from breeding_db.linking import LinkStatus, link_latest
+from breeding_db.data_structures import Farrowing
+
+
+class LinkLatestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.farrowings = pd.DataFrame({
+            "id": ["123456", "123456", "123456", "654321", None, "123456"], 
+            "birthday": [date(2020, 1, 1)] * 6, 
+            "farm": ["test farm"] * 6, 
+            "farrowing_date": [
+                datetime(2021, 5, 1, 10), 
+                datetime(2021, 2, 1, 10), 
+                datetime(2022, 6, 1, 10), 
+                datetime(2021, 5, 1, 10), 
+                datetime(2021, 5, 1, 10), 
+                None
+            ]
+        }, index=[10, 11, 12, 13, 14, 15])
+        self.estrus = pd.DataFrame({
+            "id": ["123456", "123456"], 
+            "birthday": [date(2020, 1, 1)] * 2, 
+            "farm": ["test farm"] * 2, 
+            "estrus_datetime": [datetime(2021, 1, 1, 10), datetime(2021, 1, 20, 12)], 
+            "parent": ["first", "second"]
+        })
+
+    def test_window(self):
+
+        links = link_latest(
+            self.farrowings, self.estrus, ["id", "birthday", "farm"], 
+            "farrowing_date", "estrus_datetime", 
+            Farrowing.PREGNANT_LOWER_BOUND, Farrowing.PREGNANT_UPPER_BOUND, 
+            in_days=True
+        )
+        self.assertEqual(list(self.farrowings.index), list(links.index))
+        self.assertEqual(
+            [
+                LinkStatus.LINKED, 
+                LinkStatus.TOO_SHORT, 
+                LinkStatus.TOO_LONG, 
+                LinkStatus.MISSING, 
+                LinkStatus.MISSING, 
+                LinkStatus.MISSING
+            ], 
+            list(links["status"])
+        )
+        self.assertEqual(["second"] * 3, list(links["parent"][:3]))
+        self.assertEqual(timedelta(101), links.loc[10, "gap"])
+
+    def test_tolerance(self):
+
+        links = link_latest(
+            self.farrowings, self.estrus, ["id", "birthday", "farm"], 
+            "farrowing_date", "estrus_datetime", tolerance=timedelta(3)
+        )
+        self.assertTrue((links["status"] == LinkStatus.MISSING).all())
+
+        # The latest parent at or before the record.
+        self.farrowings.loc[10, "farrowing_date"] = datetime(2021, 1, 20, 12)
+        self.farrowings.loc[11, "farrowing_date"] = datetime(2021, 1, 3, 10)
+        links = link_latest(
+            self.farrowings, self.estrus, ["id", "birthday", "farm"], 
+            "farrowing_date", "estrus_datetime", tolerance=timedelta(3)
+        )
+        self.assertEqual(["second", "first"], list(links["parent"][:2]))
+        self.assertEqual([LinkStatus.LINKED] * 2, list(links["status"][:2]))
+
+    def test_empty_parents(self):
+
+        # No sow has a parent yet, every record is missing.
+        links = link_latest(
+            self.farrowings, self.estrus.iloc[0:0], ["id", "birthday", "farm"], 
+            "farrowing_date", "estrus_datetime"
+        )
+        self.assertEqual(list(self.farrowings.index), list(links.index))
+        self.assertTrue((links["status"] == LinkStatus.MISSING).all())
+        self.assertTrue(links["parent"].isna().all())
+        self.assertTrue(links["gap"].isna().all())
+
+    def test_mixed_dtypes(self):
+
+        # Parents built from python objects, as readers do.
+        estrus = pd.DataFrame(
+            [
+                (row.id, row.birthday, row.farm, row.estrus_datetime.to_pydatetime(), row.parent) 
+                for row in self.estrus.itertuples()
+            ], 
+            columns=self.estrus.columns
+        ).astype("object")
+        farrowings = self.farrowings.copy()
+        farrowings["farrowing_date"] = farrowings["farrowing_date"].astype("datetime64[s]")
+        links = link_latest(
+            farrowings, estrus, ["id", "birthday", "farm"], 
+            "farrowing_date", "estrus_datetime"
+        )
+        self.assertEqual(["second"] * 3, list(links["parent"][:3]))
+
+    def test_missing_columns(self):
+
+        with self.assertRaises(KeyError):
+            link_latest(self.farrowings, self.estrus, ["id"], "estrus_datetime", "estrus_datetime")
+        with self.assertRaises(KeyError):
+            link_latest(self.farrowings, self.estrus, ["id"], "farrowing_date", "farrowing_date")
+        with self.assertRaises(TypeError):
+            link_latest(self.farrowings, self.estrus, "id", "farrowing_date", "estrus_datetime")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
 from datetime import date, datetime
 
-from breeding_db.models import Model
+import pymysql
+import pandas as pd
+
+from breeding_db import schema
+from breeding_db.models import Model, UpsertStatus, QueryCache, QueryStats, ConnectionPool
 from breeding_db.data_structures import *
 
 
@@ -11,12 +15,7 @@ class ModelTest(unittest.TestCase):
         self.model = Model("test/helper/database_settings.json")
 
     def tearDown(self):
-        self.model._delete_all("Individuals")
-        self.model._delete_all("Weanings")
-        self.model._delete_all("Farrowings")
-        self.model._delete_all("Matings")
-        self.model._delete_all("Estrus")
-        self.model._delete_all("Pigs")
+        self.model._truncate_all()
         self.model = None
 
     def test_generate_query_string(self):
@@ -28,25 +27,224 @@ class ModelTest(unittest.TestCase):
         larger_equal = {"total_weight": 100}
         
         got = self.model._Model__generate_qeury_string("Test", equal, larger, smaller, larger_equal, smaller_equal, "birthday DESC")
-        sql_query = "SELECT * FROM Test WHERE id='123456' AND "
-        sql_query += "birthday>'1999-05-12' AND farrowing_date<'2002-09-03' "
-        sql_query += "AND total_weight>='100' AND estrus_datetime<="
-        sql_query += "'2002-09-03 12:00:00' ORDER BY birthday DESC;"
-        self.assertEqual(got, sql_query)
+        sql_query = "SELECT * FROM Test WHERE id=%s AND "
+        sql_query += "birthday>%s AND farrowing_date<%s "
+        sql_query += "AND total_weight>=%s AND estrus_datetime<=%s "
+        sql_query += "ORDER BY birthday DESC;"
+        args = ("123456", "1999-05-12", "2002-09-03", 100, "2002-09-03 12:00:00")
+        self.assertEqual(got, (sql_query, args))
+
+        # Same statement shape should reuse the cached template.
+        equal = {"id": "654321"}
+        again = self.model._Model__generate_qeury_string("Test", equal, larger, smaller, larger_equal, smaller_equal, "birthday DESC")
+        self.assertIs(got[0], again[0])
+        self.assertEqual("654321", again[1][0])
+
+        with self.assertRaises(ValueError):
+            self.model._Model__generate_qeury_string("Test")
+
+        # Projection keeps primary keys, keyset follows order_by direction.
+        got = self.model._Model__generate_qeury_string(
+            "Pigs", 
+            equal={"farm": "test farm"}, 
+            order_by="birthday DESC", 
+            columns=["breed"], 
+            limit=10, 
+            after="2020-01-01"
+        )
+        sql_query = "SELECT id, birthday, farm, breed FROM Pigs "
+        sql_query += "WHERE farm=%s AND birthday<%s ORDER BY birthday DESC LIMIT %s;"
+        self.assertEqual(got, (sql_query, ("test farm", "2020-01-01", 10)))
+        got = self.model._Model__generate_qeury_string(
+            "Pigs", 
+            equal={"farm": "test farm"}, 
+            order_by="birthday, id", 
+            after=("2020-01-01", "123456")
+        )
+        sql_query = "SELECT * FROM Pigs WHERE farm=%s AND (birthday, id)>(%s, %s) "
+        sql_query += "ORDER BY birthday, id;"
+        self.assertEqual(got[0], sql_query)
+        with self.assertRaises(ValueError):
+            self.model._Model__generate_qeury_string(
+                "Pigs", equal={"farm": "test farm"}, order_by="birthday, id DESC", after=(1, 2)
+            )
+        with self.assertRaises(ValueError):
+            self.model._Model__generate_qeury_string("Pigs", equal={"farm": "test farm"}, after=1)
+        with self.assertRaises(ValueError):
+            self.model._Model__generate_qeury_string("Pigs", equal={"farm": "test farm"}, limit=0)
+
+        # IN and row-constructor IN.
+        got = self.model._Model__generate_qeury_string(
+            "Pigs", 
+            equal={"breed": "L"}, 
+            within={"farm": ["A", "B"], ("id", "birthday"): [("1", "2020-01-01")]}
+        )
+        sql_query = "SELECT * FROM Pigs WHERE breed=%s AND farm IN (%s, %s) "
+        sql_query += "AND (id, birthday) IN ((%s, %s));"
+        self.assertEqual(got, (sql_query, ("L", "A", "B", "1", "2020-01-01")))
+        with self.assertRaises(ValueError):
+            self.model._Model__generate_qeury_string("Pigs", within={"farm": []})
+        with self.assertRaises(ValueError):
+            self.model._Model__generate_qeury_string("Pigs", within={("id", "farm"): [("1",)]})
 
     def test_generate_insert_string(self):
 
         attributes = {
             "id": "123456", 
             "farm": "test farm", 
-            "birthday": date(1999, 5, 12)
+            "birthday": date(1999, 5, 12), 
+            "breed": None
         }
         got = self.model._Model__generate_insert_string(attributes, "Pigs")
-        self.assertEqual(got, "INSERT INTO Pigs (id, farm, birthday) VALUES ('123456', 'test farm', '1999-05-12');")
+        self.assertEqual(got, (
+            "INSERT INTO Pigs (id, farm, birthday) VALUES (%s, %s, %s);", 
+            ("123456", "test farm", date(1999, 5, 12))
+        ))
+
+    def test_generate_update_string(self):
+
+        attributes = {
+            "id": "123456", 
+            "farm": "test farm", 
+            "birthday": date(1999, 5, 12), 
+            "breed": "L", 
+            "chinese_name": None
+        }
+        got = self.model._Model__generate_update_string(attributes, "Pigs")
+        self.assertEqual(got, (
+            "UPDATE Pigs SET breed=%s WHERE id=%s AND birthday=%s AND farm=%s;", 
+            ("L", "123456", date(1999, 5, 12), "test farm")
+        ))
+
+        # Values with quotes should not break the statement.
+        pig = Pig(id="123456", birthday="1999-05-12", farm="test farm", chinese_name="小'黑")
+        self.model.insert_pig(pig)
+        self.assertEqual(pig, self.model.find_pig(pig))
 
     def test_connection(self):
         self.model._Model__query("SHOW TABLES;")
 
+    def test_connection_pool(self):
+
+        pool = self.model._Model__pool
+        self.model._Model__query("SHOW TABLES;")
+        self.model._Model__query("SHOW TABLES;")
+        # Both queries should share one connection.
+        self.assertEqual(1, pool.get_open_count())
+        self.assertEqual(1, pool.get_idle_count())
+
+        connections = [pool.acquire() for _ in range(pool.get_size())]
+        with self.assertRaises(TimeoutError):
+            pool.acquire(timeout=0.1)
+        for connection in connections:
+            pool.release(connection)
+        self.model.close()
+        self.assertEqual(0, pool.get_open_count())
+
+    def test_ensure_schema(self):
+
+        self.assertEqual(schema.get_latest_version(), self.model.ensure_schema())
+        # Applied migrations are not run again.
+        self.assertEqual(schema.get_latest_version(), self.model.ensure_schema())
+
+        with self.model.transaction():
+            with self.assertRaises(RuntimeError):
+                self.model.ensure_schema()
+
+    def test_truncate_all(self):
+
+        pig = Pig()
+        pig.set_id("123456")
+        pig.set_birthday("2022-12-17")
+        pig.set_farm("test_farm")
+        self.model.insert_pig(pig)
+        estrus = Estrus()
+        estrus.set_sow(pig)
+        estrus.set_estrus_datetime("2023-06-01 10:00:00")
+        self.model.insert_estrus(estrus)
+
+        with self.assertRaises(ValueError):
+            self.model._truncate_all(["Test"])
+        self.model._truncate_all(["Estrus"])
+        self.assertEqual(0, len(self.model.find_estrus(equal={"id": "123456"})))
+        self.assertIsNotNone(self.model.find_pig(pig))
+        self.model._truncate_all()
+        self.assertIsNone(self.model.find_pig(pig))
+
+        with self.model.transaction():
+            with self.assertRaises(RuntimeError):
+                self.model._truncate_all()
+
+    def test_rollback_after(self):
+
+        pig = Pig()
+        pig.set_id("123456")
+        pig.set_birthday("2022-12-17")
+        pig.set_farm("test_farm")
+        with self.model._rollback_after():
+            self.model.insert_pig(pig)
+            # Transactions become savepoints.
+            with self.model.transaction():
+                self.assertIsNotNone(self.model.find_pig(pig))
+        self.assertIsNone(self.model.get_session())
+        self.assertIsNone(self.model.find_pig(pig))
+
+    def test_transaction(self):
+
+        pig = Pig(id="123456", birthday="2022-05-12", farm="test farm")
+        with self.model.transaction():
+            self.model.insert_pig(pig)
+            # Inner failure only rolls back to its savepoint.
+            with self.assertRaises(KeyError):
+                with self.model.transaction():
+                    self.model.insert_pig(
+                        Pig(id="654321", birthday="2022-05-12", farm="test farm")
+                    )
+                    raise KeyError()
+        self.assertEqual(pig, self.model.find_pig(pig))
+        self.assertEqual(1, len(self.model.find_pigs(equal={"farm": "test farm"})))
+
+        other = Pig(id="111111", birthday="2022-05-12", farm="test farm")
+        with self.assertRaises(ValueError):
+            with self.model.transaction():
+                self.model.insert_pig(other)
+                raise ValueError()
+        self.assertIsNone(self.model.find_pig(other))
+        self.assertIsNone(self.model.get_session())
+
+        session = self.model.begin()
+        with self.assertRaises(RuntimeError):
+            self.model.begin()
+        self.model.insert_pig(other)
+        session.rollback()
+        self.assertIsNone(self.model.find_pig(other))
+
+    def test_identity_map(self):
+
+        sow = Pig(id="123456", birthday="2022-05-12", farm="test farm")
+        self.model.insert_pig(sow)
+        self.model.insert_estrus(Estrus(sow=sow, estrus_datetime="2023-05-12 12:00:00"))
+
+        # Without a session every hydration is a new object.
+        self.assertIsNot(self.model.find_pig(sow), self.model.find_pig(sow))
+
+        with self.model.transaction() as session:
+            found = self.model.find_pig(sow)
+            self.assertIs(found, self.model.find_pigs(equal={"id": "123456"})[0])
+            estrus = self.model.find_estrus(equal={"id": "123456"})[0]
+            self.assertIs(found, estrus.get_sow())
+            self.assertIs(estrus, self.model.find_estrus(equal={"id": "123456"})[0])
+
+            # Partial rows are not registered, written rows are reloaded.
+            session.get_identity_map().clear()
+            partial = self.model.find_pigs(equal={"id": "123456"}, columns=[])[0]
+            self.assertIsNot(partial, self.model.find_pig(sow))
+            found = self.model.find_pig(sow)
+            found.set_breed("L")
+            self.model.update_pig(found)
+            self.assertIsNot(found, self.model.find_pig(sow))
+            self.assertEqual("L", self.model.find_pig(sow).get_breed())
+
     def test_get_pig_attributes(self):
 
         pig = Pig()
@@ -142,6 +340,82 @@ class ModelTest(unittest.TestCase):
         returned_pig = self.model.find_pig(pig)
         self.assertEqual(pig, returned_pig)
 
+    def test_find_pig_by_tag(self):
+
+        self.model.ensure_schema()
+        for birthday in ["2021-03-01", "2022-02-01", "2022-08-01"]:
+            pig = Pig()
+            pig.set_id("123456")
+            pig.set_birthday(birthday)
+            pig.set_farm("test_farm")
+            pig.set_breed("L")
+            pig.set_gender("F")
+            self.model.insert_pig(pig)
+
+        # The youngest pig of the year.
+        found = self.model.find_pig_by_tag(2022, "L", "123456", "test_farm", "F")
+        self.assertEqual(date(2022, 8, 1), found.get_birthday())
+        found = self.model.find_pig_by_tag("2021", "L", "123456", "test_farm")
+        self.assertEqual(date(2021, 3, 1), found.get_birthday())
+        self.assertIsNone(self.model.find_pig_by_tag(2022, "Y", "123456", "test_farm"))
+        self.assertIsNone(self.model.find_pig_by_tag(2022, "L", "123456", "test_farm", "M"))
+        with self.assertRaises(ValueError):
+            self.model.find_pig_by_tag("22a", "L", "123456", "test_farm")
+
+    def test_find_pigs_paginated(self):
+
+        pigs = [
+            Pig(id="123456", birthday=f"2022-05-{day}", farm="test farm", breed="L") 
+            for day in range(10, 20)
+        ]
+        self.model.insert_pigs(pigs)
+
+        found = self.model.find_pigs(
+            equal={"farm": "test farm"}, order_by="birthday DESC", limit=1
+        )
+        self.assertEqual([pigs[-1]], found)
+        found = self.model.find_pigs(
+            equal={"farm": "test farm"}, columns=["gender"], limit=3
+        )
+        self.assertEqual(3, len(found))
+        self.assertIsNone(found[0].get_breed())
+
+        pages = []
+        after = None
+        while True:
+            page = self.model.find_pigs(
+                equal={"farm": "test farm"}, 
+                order_by="birthday ASC", 
+                limit=4, 
+                after=after
+            )
+            if len(page) == 0:
+                break
+            pages.append(page)
+            after = page[-1].get_birthday()
+        self.assertEqual([4, 4, 2], [len(page) for page in pages])
+        self.assertEqual(pigs, [pig for page in pages for pig in page])
+
+    def test_find_pigs_by_keys(self):
+
+        pigs = [
+            Pig(id=f"{i:06d}", birthday="2022-05-12", farm="test farm") 
+            for i in range(10)
+        ]
+        self.model.insert_pigs(pigs)
+
+        keys = [("000001", "2022-05-12", "test farm"), pigs[2], pigs[2]]
+        keys.append(("999999", "2022-05-12", "test farm"))
+        keys.extend((pig.get_id(), pig.get_birthday(), pig.get_farm()) for pig in pigs[5:])
+        found = self.model.find_pigs_by_keys(keys, chunk_size=2)
+        self.assertEqual(7, len(found))
+        self.assertEqual(pigs[1], found[("000001", date(2022, 5, 12), "test farm")])
+        self.assertNotIn(("999999", date(2022, 5, 12), "test farm"), found)
+        self.assertEqual({}, self.model.find_pigs_by_keys([]))
+
+        with self.assertRaises(ValueError):
+            self.model.find_pigs_by_keys([Pig(id="000001")])
+
     def test_update_pig(self):
 
         pig = Pig()
@@ -159,6 +433,49 @@ class ModelTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.model.update_pig(Pig())
 
+    def test_upsert_pig(self):
+
+        pig = Pig(id="123456", birthday="2022-05-12", farm="test farm", litter=1)
+        self.assertEqual(UpsertStatus.INSERTED, self.model.upsert_pig(pig))
+        self.assertEqual(UpsertStatus.UNCHANGED, self.model.upsert_pig(pig))
+        pig.set_litter(2)
+        self.assertEqual(UpsertStatus.UPDATED, self.model.upsert_pig(pig))
+        self.assertEqual(pig, self.model.find_pig(pig))
+        with self.assertRaises(ValueError):
+            self.model.upsert_pig(Pig(id="123456"))
+
+        other = Pig(id="654321", birthday="2022-05-12", farm="test farm")
+        results = self.model.upsert_pigs([pig, other], report_changes=True)
+        self.assertEqual(
+            [UpsertStatus.UNCHANGED, UpsertStatus.INSERTED], 
+            [status for _, status in results]
+        )
+        other.set_litter(3)
+        self.assertEqual([], self.model.upsert_pigs([pig, other]))
+        self.assertEqual(other, self.model.find_pig(other))
+
+    def test_upsert_reg_id_conflict(self):
+
+        pig = Pig(id="123456", birthday="2022-05-12", farm="test farm", reg_id="111111", litter=1)
+        self.model.insert_pig(pig)
+
+        # A new pig carrying the reg_id of another pig does not overwrite it.
+        new = Pig(id="654321", birthday="2022-05-12", farm="test farm", reg_id="111111", litter=2)
+        with self.assertRaises(KeyError):
+            self.model.upsert_pig(new)
+        results = self.model.upsert_pigs([new])
+        self.assertEqual([new], [pig for pig, _ in results])
+        self.assertIsInstance(results[0][1], pymysql.err.IntegrityError)
+        self.assertEqual(pig, self.model.find_pig(pig))
+        self.assertIsNone(self.model.find_pig(new))
+
+        # Two new pigs of the same reg_id, the first one is written.
+        first = Pig(id="222222", birthday="2022-05-12", farm="test farm", reg_id="222222")
+        second = Pig(id="333333", birthday="2022-05-12", farm="test farm", reg_id="222222")
+        results = self.model.upsert_pigs([first, second])
+        self.assertEqual([second], [pig for pig, _ in results])
+        self.assertEqual(first, self.model.find_pig(first))
+
     def test_insert_estrus(self):
 
         pig = Pig()
@@ -180,6 +497,73 @@ class ModelTest(unittest.TestCase):
         self.model.insert_pig(pig)
         self.model.insert_estrus(estrus)
 
+    def test_insert_estrus_many(self):
+
+        sow = Pig(id="123456", birthday="2022-05-12", farm="test farm")
+        self.model.insert_pig(sow)
+        orphan = Pig(id="654321", birthday="2022-05-12", farm="test farm")
+        estrus = [
+            Estrus(sow=sow, estrus_datetime=f"2023-05-{day} 12:00:00") 
+            for day in range(10, 20)
+        ]
+        estrus.append(Estrus(sow=orphan, estrus_datetime="2023-05-12 12:00:00"))
+        estrus[0].set_parity(1)
+
+        failures = self.model.insert_estrus_many(estrus, chunk_size=4)
+        self.assertEqual(1, len(failures))
+        self.assertEqual(orphan, failures[0][0].get_sow())
+        found = self.model.find_estrus(equal={"farm": "test farm"})
+        self.assertEqual(10, len(found))
+
+        with self.assertRaises(TypeError):
+            self.model.insert_estrus_many([sow])
+
+    def test_find_estrus_by_keys(self):
+
+        sow = Pig(id="123456", birthday="2022-05-12", farm="test farm")
+        self.model.insert_pig(sow)
+        estrus = [
+            Estrus(sow=sow, estrus_datetime=f"2023-05-{day} 12:00:00")
+            for day in range(10, 20)
+        ]
+        self.model.insert_estrus_many(estrus)
+
+        found = self.model.find_estrus_by_keys([
+            ("123456", "2022-05-12", "test farm", "2023-05-10 12:00:00"), 
+            estrus[5]
+        ])
+        self.assertEqual(2, len(found))
+        key = ("123456", date(2022, 5, 12), "test farm", datetime(2023, 5, 10, 12))
+        self.assertEqual(estrus[0], found[key])
+
+    def test_iter_estrus(self):
+
+        sow = Pig(id="123456", birthday="2022-05-12", farm="test farm")
+        self.model.insert_pig(sow)
+        estrus = [
+            Estrus(sow=sow, estrus_datetime=f"2023-05-{day} 12:00:00")
+            for day in range(10, 20)
+        ]
+        self.model.insert_estrus_many(estrus)
+
+        found = list(self.model.iter_estrus(
+            equal={"farm": "test farm"},
+            order_by="estrus_datetime ASC",
+            chunk_size=3
+        ))
+        self.assertEqual(estrus, found)
+        rows = list(self.model.iter_estrus(raw=True, chunk_size=4))
+        self.assertEqual(10, len(rows))
+        self.assertEqual("123456", rows[0]["id"])
+
+        # Stop early and the pool should still be usable.
+        for _ in self.model.iter_estrus(chunk_size=2):
+            break
+        self.assertEqual(10, len(self.model.find_estrus(equal={"farm": "test farm"})))
+
+        with self.assertRaises(ValueError):
+            list(self.model.iter_estrus(chunk_size=0))
+
     def test_insert_mating(self):
 
         sow = Pig()
@@ -492,6 +876,76 @@ class ModelTest(unittest.TestCase):
         found = self.model.find_farrowings(equal={"farm": "test farm"})
         self.assertEqual(len(found), 2)
 
+    def test_query_frame(self):
+
+        sow = Pig(id="123456", farm="test farm", birthday="1999-05-12", breed="L")
+        self.model.insert_pig(sow)
+        for year in (2000, 2001):
+            estrus = Estrus(sow=sow, estrus_datetime=f"{year}-05-12 12:00:00")
+            self.model.insert_estrus(estrus)
+            self.model.insert_farrowing(
+                Farrowing(estrus=estrus, farrowing_date=f"{year}-09-03", n_of_male=year - 1999)
+            )
+
+        frame = self.model.find_farrowings_frame(
+            equal={"farm": "test farm"}, 
+            columns=["farrowing_date", "n_of_male", "crushed"], 
+            order_by="farrowing_date ASC", 
+            chunk_size=1
+        )
+        self.assertEqual(2, len(frame))
+        self.assertEqual("UInt8", str(frame["n_of_male"].dtype))
+        self.assertEqual("category", str(frame["farm"].dtype))
+        self.assertTrue(str(frame["farrowing_date"].dtype).startswith("datetime64"))
+        self.assertEqual(2, frame["n_of_male"].iloc[1])
+        self.assertTrue(frame["crushed"].isna().all())
+
+        frame = self.model.query_frame("Pigs")
+        self.assertEqual(["L"], list(frame["breed"]))
+        frame = self.model.query_frame("Pigs", {"equal": {"farm": "no farm"}})
+        self.assertEqual(0, len(frame))
+        with self.assertRaises(ValueError):
+            self.model.query_frame("Pigs", {"equals": {"farm": "test farm"}})
+
+    def test_bulk_load(self):
+
+        pigs = pd.DataFrame({
+            "id": ["123456", "123457"], 
+            "birthday": ["1999-05-12", "1999-06-12"], 
+            "farm": ["test farm", "test farm"], 
+            "chinese_name": ["小\t花", None]
+        })
+        try:
+            self.assertEqual(2, self.model.bulk_load("Pigs", pigs))
+        except RuntimeError:
+            self.skipTest("LOCAL_INFILE is not enabled.")
+        found = self.model.find_pig(Pig(id="123456", farm="test farm", birthday="1999-05-12"))
+        self.assertEqual("小\t花", found.get_chinese_name())
+        # Existing rows are skipped.
+        self.assertEqual(0, self.model.bulk_load("Pigs", pigs))
+
+        estrus = pd.DataFrame({
+            "id": ["123456", "654321"], 
+            "birthday": ["1999-05-12", "1999-05-12"], 
+            "farm": ["test farm", "test farm"], 
+            "estrus_datetime": ["2000-05-12 12:00:00", "2000-05-12 12:00:00"]
+        })
+        # Both modes roll back a load with rows referencing missing pigs.
+        with self.assertRaises(pymysql.err.IntegrityError):
+            self.model.bulk_load("Estrus", estrus)
+        self.assertEqual(0, len(self.model.find_estrus(equal={"farm": "test farm"})))
+        with self.assertRaises(pymysql.err.IntegrityError):
+            self.model.bulk_load("Estrus", estrus, check_foreign_keys=False)
+        self.assertEqual(0, len(self.model.find_estrus(equal={"farm": "test farm"})))
+        self.assertEqual(1, self.model.bulk_load("Estrus", estrus.iloc[:1], check_foreign_keys=False))
+
+        with self.assertRaises(ValueError):
+            self.model.bulk_load("Pigs", pigs.drop(columns="farm"))
+        with self.assertRaises(ValueError):
+            self.model.bulk_load("Pigs", pigs.assign(weight=1))
+        with self.assertRaises(ValueError):
+            self.model.bulk_load("Pigs", pigs.assign(birth_year=1999))
+
     def test_update_farrowing(self):
         
         sow = Pig(id="123456", farm="test farm", birthday="1999-05-12")
@@ -649,6 +1103,70 @@ class ModelTest(unittest.TestCase):
         found = self.model.find_weanings(equal={"weaning_date": "2001-09-24"})
         self.assertEqual(found[0], weaning)
 
+    def test_find_weanings_with_lineage(self):
+
+        sow = Pig(id="123456", birthday="1999-05-12", farm="test farm", breed="L")
+        self.model.insert_pig(sow)
+        estrus = Estrus(sow=sow, estrus_datetime="2000-05-12 12:00:00", parity=1)
+        self.model.insert_estrus(estrus)
+        farrowing = Farrowing(estrus=estrus, farrowing_date="2000-09-03", litter_id="3")
+        self.model.insert_farrowing(farrowing)
+        weaning = Weaning(farrowing=farrowing, weaning_date="2000-09-24")
+        self.model.insert_weaning(weaning)
+
+        found = self.model.find_weanings_with_lineage(
+            equal={"id": "123456", "farrowing.litter_id": 3}, 
+            order_by="weaning_date DESC"
+        )
+        self.assertEqual([weaning], found)
+        found_farrowing = found[0].get_farrowing()
+        self.assertEqual("3", found_farrowing.get_litter_id())
+        self.assertEqual(1, found_farrowing.get_estrus().get_parity())
+        self.assertEqual("L", found_farrowing.get_estrus().get_sow().get_breed())
+
+        found = self.model.find_farrowings(equal={"id": "123456"}, eager=True)
+        self.assertEqual("L", found[0].get_estrus().get_sow().get_breed())
+        with self.assertRaises(ValueError):
+            self.model.find_farrowings(equal={"id": "123456"}, eager=True, columns=[])
+
+    def test_aggregate(self):
+
+        sow = Pig(id="123456", birthday="1999-05-12", farm="test farm", breed="L")
+        self.model.insert_pig(sow)
+        for year in (2000, 2001):
+            estrus = Estrus(sow=sow, estrus_datetime=f"{year}-05-12 12:00:00")
+            self.model.insert_estrus(estrus)
+            farrowing = Farrowing(
+                estrus=estrus, farrowing_date=f"{year}-09-03", n_of_male=5, n_of_female=year - 1995
+            )
+            self.model.insert_farrowing(farrowing)
+            weaning = Weaning(
+                farrowing=farrowing, weaning_date=f"{year}-09-24", total_weaning_piglets=8
+            )
+            self.model.insert_weaning(weaning)
+
+        got = self.model.aggregate(
+            "Weanings", 
+            group_by=["id", "YEAR(farrowing.farrowing_date)"], 
+            metrics={
+                "born_alive": "SUM(farrowing.n_of_male + farrowing.n_of_female)", 
+                "weaned": "SUM(total_weaning_piglets)"
+            }, 
+            where={"equal": {"farm": "test farm"}}, 
+            order_by="born_alive DESC", 
+            lineage=True
+        )
+        self.assertEqual([11, 10], list(got["born_alive"]))
+        self.assertEqual([2001, 2000], list(got["YEAR(farrowing.farrowing_date)"]))
+        self.assertEqual([8, 8], list(got["weaned"]))
+
+        got = self.model.aggregate("Farrowings", metrics={"litters": "COUNT(*)"})
+        self.assertEqual(2, got["litters"].iloc[0])
+        with self.assertRaises(ValueError):
+            self.model.aggregate("Farrowings", metrics={"litters": "COUNT(weight)"})
+        with self.assertRaises(ValueError):
+            self.model.aggregate("Farrowings", group_by=["weaning.id"])
+
     def test_update_weaning(self):
 
         sow = Pig(id="123456", birthday="1999-05-12", farm="test farm")
@@ -827,5 +1345,113 @@ class ModelTest(unittest.TestCase):
         self.assertEqual(0.9, got[0].get_born_weight())
 
 
+class ConnectionPoolTestCase(unittest.TestCase):
+
+    def test_arguments(self):
+
+        # Connections are opened lazily, so no database is needed.
+        pool = ConnectionPool({}, size=1, idle_timeout=0, ping_interval=0.5)
+        self.assertEqual(0, pool.get_open_count())
+
+        with self.assertRaises(ValueError):
+            ConnectionPool({}, size=0)
+        with self.assertRaises(TypeError):
+            ConnectionPool({}, idle_timeout="300")
+        with self.assertRaises(ValueError):
+            ConnectionPool({}, idle_timeout=-1)
+        with self.assertRaises(TypeError):
+            ConnectionPool({}, ping_interval=None)
+        with self.assertRaises(ValueError):
+            ConnectionPool({}, ping_interval=-0.5)
+
+
+class QueryCacheTestCase(unittest.TestCase):
+
+    def test_get_and_put(self):
+
+        cache = QueryCache(2)
+        self.assertIs(QueryCache.MISSING, cache.get("a"))
+        cache.put("a", 1, [("id", "1")])
+        cache.put("b", 2, [("id", "2")])
+        self.assertEqual(1, cache.get("a"))
+        self.assertEqual(1, cache.get_hits())
+        self.assertEqual(1, cache.get_misses())
+
+        # "b" is least recently used.
+        cache.put("c", 3, [("id", "1")])
+        self.assertEqual(2, cache.get_count())
+        self.assertIs(QueryCache.MISSING, cache.get("b"))
+        self.assertIsNone(cache.get("b", None))
+
+        with self.assertRaises(ValueError):
+            QueryCache(0)
+
+    def test_invalidate(self):
+
+        cache = QueryCache(10)
+        cache.put("a", 1, [("id", "1")])
+        cache.put("b", 2, [("id", "1"), ("reg_id", "111111")])
+        cache.put("c", 3, [("id", "2")])
+        cache.invalidate([("reg_id", "111111")])
+        self.assertEqual(1, cache.get("a"))
+        self.assertIs(QueryCache.MISSING, cache.get("b"))
+        cache.invalidate([("id", "1")])
+        self.assertEqual(1, cache.get_count())
+        cache.clear()
+        self.assertEqual(0, cache.get_count())
+
+
+class QueryStatsTestCase(unittest.TestCase):
+
+    def test_shape(self):
+
+        self.assertEqual(
+            "SELECT * FROM Pigs WHERE id=%s AND farm IN (%s, ...) LIMIT %s;", 
+            QueryStats.shape("SELECT *\nFROM Pigs WHERE id=%s AND farm IN (%s, %s, %s) LIMIT 10;")
+        )
+        self.assertEqual(
+            "SELECT * FROM Pigs WHERE (id, farm) IN ((%s, ...), ...) AND breed=%s;", 
+            QueryStats.shape("SELECT * FROM Pigs WHERE (id, farm) IN ((%s, %s), (%s, %s)) AND breed='it''s';")
+        )
+
+    def test_record(self):
+
+        stats = QueryStats(slow_seconds=1)
+        stats.record("find_pigs", "SELECT 1;", 0.002, 3)
+        stats.record("find_pigs", "SELECT 1;", 0.2, 1)
+        stats.record("update_pig", "UPDATE 1;", 2, 1)
+        got = stats.get_stats()
+        self.assertEqual(["update_pig", "find_pigs"], [entry["method"] for entry in got])
+        self.assertEqual(2, got[1]["count"])
+        self.assertEqual(4, got[1]["rows"])
+        self.assertAlmostEqual(0.2, got[1]["max_seconds"])
+        self.assertEqual(1, got[1]["histogram"]["0.005"])
+        self.assertEqual(1, got[1]["histogram"]["0.5"])
+        self.assertFalse(stats.is_slow(0.5))
+        self.assertTrue(stats.is_slow(2))
+        self.assertFalse(QueryStats().is_slow(100))
+
+        stats.add_slow_query({"method": "update_pig"})
+        self.assertEqual([{"method": "update_pig"}], stats.get_slow_queries())
+        stats.reset()
+        self.assertEqual([], stats.get_stats())
+        self.assertEqual([], stats.get_slow_queries())
+
+        with self.assertRaises(ValueError):
+            QueryStats(slow_log_size=0)
+
+
+class RetryTestCase(unittest.TestCase):
+
+    def test_is_transient(self):
+
+        self.assertTrue(Model.is_transient(pymysql.err.OperationalError(2013, "Lost connection")))
+        self.assertTrue(Model.is_transient(pymysql.err.OperationalError(1213, "Deadlock found")))
+        self.assertTrue(Model.is_transient(pymysql.err.InterfaceError(0, "")))
+        self.assertFalse(Model.is_transient(pymysql.err.OperationalError(1045, "Access denied")))
+        self.assertFalse(Model.is_transient(pymysql.err.IntegrityError(1062, "Duplicate entry")))
+        self.assertFalse(Model.is_transient(ValueError("not a database error")))
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
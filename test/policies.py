@@ -0,0 +1,65 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import pandas as pd
+
+from breeding_db.policies import *
+from breeding_db.data_structures import Pig
+
+
+class ConflictPolicyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.read = Pig(id="123456", birthday="2022-01-01", farm="test farm")
+        self.found = Pig(id="123456", birthday="2022-01-01", farm="test farm")
+        self.found.set_chinese_name("test")
+        self.options = [
+            Pig(id="654321", birthday="2020-01-01", farm="test farm"),
+            Pig(id="654321", birthday="2021-01-01", farm="test farm"),
+            Pig(id="654321", birthday="2019-01-01", farm="test farm")
+        ]
+
+    def test_policies(self):
+
+        conflicts = [(self.read, self.found)] * 2
+        matches = [(self.read, self.options)]
+        with self.assertRaises(TypeError):
+            ConflictPolicy()
+
+        policy = AlwaysUpdatePolicy()
+        self.assertEqual([True, True], policy.resolve_updates("豬隻", conflicts))
+        self.assertEqual([None], policy.resolve_matches("父畜", matches))
+        policy = NeverUpdatePolicy()
+        self.assertEqual([False, False], policy.resolve_updates("豬隻", conflicts))
+        self.assertEqual([None], policy.resolve_matches("父畜", matches))
+        # The youngest pig wins.
+        policy = NewestWinsPolicy()
+        self.assertEqual([True, True], policy.resolve_updates("豬隻", conflicts))
+        self.assertEqual([1], policy.resolve_matches("父畜", matches))
+
+    def test_review_policy(self):
+
+        with self.assertRaises(FileNotFoundError):
+            ReviewPolicy("not/exist/review.csv")
+
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "review.csv")
+            policy = ReviewPolicy(path)
+            self.assertEqual([], policy.resolve_updates("豬隻", []))
+            self.assertFalse(os.path.isfile(path))
+
+            self.assertEqual(
+                [False], policy.resolve_updates("豬隻", [(self.read, self.found)])
+            )
+            self.assertEqual(
+                [None], policy.resolve_matches("父畜", [(self.read, self.options)])
+            )
+            review = pd.read_csv(path)
+            self.assertEqual(["項目", "讀到的資料", "已有的資料"], list(review.columns))
+            self.assertEqual(["豬隻", "父畜"], list(review["項目"]))
+            self.assertIn("2: ", review["已有的資料"][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
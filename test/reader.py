@@ -1,28 +1,40 @@
 import unittest
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 import pandas as pd
 
-from breeding_db.models import Model
 from breeding_db.data_structures import *
 from breeding_db.reader import ExcelReader
+from breeding_db.policies import NeverUpdatePolicy
 from breeding_db.general import delete_contents
 
 
+def pig_frame(rows: list[tuple]) -> pd.DataFrame:
+    """ A pig sheet of (品種, 耳號, 生日, 父畜, 母畜, 中文名, 性別) rows."""
+
+    frame = pd.DataFrame(
+        rows, columns=["品種", "耳號", "生日", "父畜", "母畜", "中文名", "性別"]
+    )
+    frame["生日"] = pd.to_datetime(frame["生日"])
+    frame["登錄號"] = None
+    frame["出生胎次"] = None
+    return frame
+
+
 class MyTestCase(unittest.TestCase):
 
     def setUp(self):
         self.reader = ExcelReader("test/helper/database_settings.json")
-        self.model = Model("test/helper/database_settings.json")
+        # Share the reader's model so that its writes are seen in the session.
+        self.model = self.reader.model
+        # Every test runs in a session which is rolled back afterward.
+        self.session = self.model.begin()
 
     def tearDown(self):
+        if not self.session.is_closed():
+            self.session.rollback()
         self.reader = None
-        self.model._delete_all("Pigs")
-        self.model._delete_all("Estrus")
-        self.model._delete_all("Matings")
-        self.model._delete_all("Farrowings")
-        self.model._delete_all("Weanings")
-        self.model._delete_all("Individuals")
         self.model = None
         delete_contents("test/helper/garbage")
 
@@ -83,6 +95,135 @@ class MyTestCase(unittest.TestCase):
         # 109 rows in pigs.xlsx and 13 errors.
         self.assertEqual(100 + 109 - 13, len(self.model.find_pigs(equal={"farm":"test farm"})))
 
+    @patch("breeding_db.reader.ask")
+    def test_read_and_insert_pigs_prefetch(self, mock_ask):
+
+        # Pigs inserted by the reader are added to the prefetched index.
+        mock_ask.return_value = True
+        self.reader.prefetch = True
+        self.reader.read_and_insert_pigs(
+            farm="test farm", 
+            input_path="test/helper/pig_data/pig_ancestors.xlsx", 
+            output_path="test/helper/garbage", 
+            allow_none=True
+        )
+        self.assertEqual(100, len(self.model.find_pigs(equal={"farm":"test farm"})))
+        output_dataframe = pd.read_csv("test/helper/garbage/output.csv")
+        self.assertEqual(0, output_dataframe.size)
+
+    @patch("breeding_db.reader.ask_multiple")
+    @patch("breeding_db.reader.ask")
+    def test_read_and_insert_pigs_policy(self, mock_ask, mock_ask_multiple):
+
+        # Nothing is asked when a policy resolves the conflicts.
+        self.reader.policy = NeverUpdatePolicy()
+        for output_filename in ("output.csv", "output2.csv"):
+            self.reader.read_and_insert_pigs(
+                farm="test farm", 
+                input_path="test/helper/pig_data/pig_ancestors.xlsx", 
+                output_path="test/helper/garbage", 
+                output_filename=output_filename, 
+                allow_none=True
+            )
+        mock_ask.assert_not_called()
+        mock_ask_multiple.assert_not_called()
+        self.assertEqual(100, len(self.model.find_pigs(equal={"farm":"test farm"})))
+
+    def test_validate_pigs(self):
+
+        # Validating alone does not write anything.
+        candidates = self.reader.validate_pigs(
+            farm="test farm", 
+            input_path="test/helper/pig_data/pig_ancestors.xlsx", 
+            allow_none=True
+        )
+        self.assertEqual(100, len(candidates))
+        self.assertTrue(all(candidate.is_valid() for candidate in candidates))
+        self.assertEqual(0, self.reader.make_report(candidates).size)
+        self.assertEqual(0, len(self.model.find_pigs(equal={"farm": "test farm"})))
+
+    def test_resolve_pigs_within_sheet(self):
+
+        # Parents are found among earlier rows, and written before their
+        # offspring, one generation per upsert.
+        candidates = self.reader.validate_pigs("test farm", dataframe=pig_frame([
+            ("D", "100001", "2018-01-01", None, None, None, "M"),
+            ("L", "100002", "2018-02-01", None, None, None, "F"),
+            ("L", "100003", "2019-03-01", "D100001", "L100002", None, "F"),
+            ("L", "100004", "2020-04-01", "D100001", "L100003", None, "F")
+        ]), allow_none=True)
+        self.reader.resolve_pigs(candidates)
+        self.assertTrue(all(candidate.is_valid() for candidate in candidates))
+        pigs = [candidate.get_record() for candidate in candidates]
+        self.assertEqual(pigs[2], pigs[3].get_dam())
+
+        with patch.object(
+            self.model, "upsert_pigs", wraps=self.model.upsert_pigs
+        ) as upsert_pigs:
+            self.reader.write_pigs(candidates)
+        self.assertEqual(
+            [pigs[:2], pigs[2:3], pigs[3:]], 
+            [call.args[0] for call in upsert_pigs.call_args_list]
+        )
+        self.assertTrue(all(candidate.is_valid() for candidate in candidates))
+        found = self.model.find_pig(pigs[3])
+        self.assertEqual("100001", found.get_sire().get_id())
+        self.assertEqual("100003", found.get_dam().get_id())
+
+    def test_resolve_estrus_within_sheet(self):
+
+        # Parities are checked against earlier estrus of the sheet.
+        self.model.insert_pig(
+            Pig(id="123456", birthday="2020-01-01", farm="test farm", breed="L", gender="F")
+        )
+        candidates = self.reader.validate_estrus("test farm", dataframe=pd.DataFrame({
+            "出生年品種耳號": ["20L123456", "20L123456", "20L123456"],
+            "胎次": [1, 2, 1],
+            "發情日期": pd.to_datetime(["2021-01-01", "2021-06-01", "2021-08-01"]),
+            "發情時間": [None, None, None]
+        }))
+        self.reader.resolve_estrus("test farm", candidates)
+        self.assertEqual(
+            [[], [], ["發情日期比前一胎次發情紀錄的發情日期早"]], 
+            [candidate.get_errors() for candidate in candidates]
+        )
+        self.reader.write_estrus(candidates)
+        self.assertEqual(2, len(self.model.find_estrus(equal={"farm": "test farm"})))
+
+    def test_write_duplicates(self):
+
+        self.model.insert_pig(
+            Pig(id="123456", birthday="2020-01-01", farm="test farm", breed="L", gender="F")
+        )
+        self.reader.policy = NeverUpdatePolicy()
+        candidates = self.reader.validate_pigs("test farm", dataframe=pig_frame([
+            # Differs from the existing pig, and repeated.
+            ("L", "123456", "2020-01-01", None, None, "小花", "F"),
+            ("L", "123456", "2020-01-01", None, None, "小花", "F"),
+            # New, then repeated with other data.
+            ("D", "654321", "2021-01-01", None, None, None, "M"),
+            ("D", "654321", "2021-01-01", None, None, "小黑", "M")
+        ]), allow_none=True)
+        self.reader.resolve_pigs(candidates)
+        with patch.object(
+            self.reader.policy, "resolve_updates", 
+            wraps=self.reader.policy.resolve_updates
+        ) as resolve_updates:
+            self.reader.write_pigs(candidates)
+        # Rows of the sheet are not existing records.
+        self.assertEqual(1, len(resolve_updates.call_args.args[1]))
+        self.assertEqual(
+            [
+                ["豬隻已存在於資料庫且與資料庫中數據不相符"], 
+                ["豬隻已存在於資料庫且與資料庫中數據不相符"], 
+                [], 
+                ["豬隻與表中前面的資料重複且數據不相符"]
+            ], 
+            [candidate.get_errors() for candidate in candidates]
+        )
+        found = self.model.find_pigs(equal={"farm": "test farm"}, order_by="birthday ASC")
+        self.assertEqual([None, None], [pig.get_chinese_name() for pig in found])
+
     def test_seperate_year_breed_id(self):
 
         id = "19Y1234-06"
@@ -181,6 +322,72 @@ class MyTestCase(unittest.TestCase):
         dataframe = pd.read_csv("test/helper/garbage/output3.csv")
         self.assertEqual(13, dataframe.shape[0])
 
+    def test_write_farrowings_pregnant(self):
+
+        # Estrus are pregnant only if their farrowings are written.
+        sow = Pig(id="123456", birthday="2020-01-01", farm="test farm", breed="L", gender="F")
+        self.model.insert_pig(sow)
+        declined = Estrus(sow=sow, estrus_datetime="2021-01-01 10:00:00", parity=1)
+        written = Estrus(sow=sow, estrus_datetime="2022-01-01 10:00:00", parity=2)
+        self.model.insert_estrus_many([declined, written])
+        self.model.insert_farrowing(
+            Farrowing(estrus=declined, farrowing_date="2021-04-25", n_of_male=1, n_of_female=1)
+        )
+
+        self.reader.policy = NeverUpdatePolicy()
+        candidates = self.reader.validate_farrowings("test farm", dataframe=pd.DataFrame({
+            "出生年品種耳號": ["20L123456", "20L123456"],
+            "分娩日期": pd.to_datetime(["2021-04-25", "2022-04-25"]),
+            "(公) 小豬": [3, 3],
+            "(母) 小豬": [4, 4],
+            "胎號": [1001, 1002],
+            "壓": [0, 0],
+            "黑": [0, 0],
+            "弱": [0, 0],
+            "畸": [0, 0],
+            "死": [0, 0]
+        }))
+        self.reader.resolve_farrowings("test farm", candidates)
+        self.reader.write_farrowings(candidates)
+        self.assertEqual(
+            ["分娩紀錄已存在於資料庫且與資料庫中數據不相符"], candidates[0].get_errors()
+        )
+        self.assertTrue(candidates[1].is_valid())
+        found = self.model.find_estrus(
+            equal={"farm": "test farm"}, order_by="estrus_datetime ASC"
+        )
+        self.assertNotEqual(PregnantStatus.YES, found[0].get_pregnant())
+        self.assertEqual(PregnantStatus.YES, found[1].get_pregnant())
+
+    def test_link_farrowings_by_tag(self):
+
+        # A tag matches every sow of the id born in the year, and the latest
+        # estrus of any of them is linked.
+        older = Pig(id="123456", birthday="2020-01-01", farm="test farm", breed="L", gender="F")
+        younger = Pig(id="123456", birthday="2020-06-01", farm="test farm", breed="L", gender="F")
+        self.model.insert_pigs([older, younger])
+        self.model.insert_estrus_many([
+            Estrus(sow=older, estrus_datetime="2021-01-01 10:00:00", parity=1), 
+            Estrus(sow=younger, estrus_datetime="2020-12-20 10:00:00", parity=1)
+        ])
+        candidates = self.reader.validate_farrowings("test farm", dataframe=pd.DataFrame({
+            "出生年品種耳號": ["20L123456"],
+            "分娩日期": pd.to_datetime(["2021-04-25"]),
+            "(公) 小豬": [3],
+            "(母) 小豬": [4],
+            "胎號": [1001],
+            "壓": [0],
+            "黑": [0],
+            "弱": [0],
+            "畸": [0],
+            "死": [0]
+        }))
+        self.reader.resolve_farrowings("test farm", candidates)
+        self.assertTrue(candidates[0].is_valid())
+        estrus = candidates[0].get_record().get_estrus()
+        self.assertEqual(older, estrus.get_sow())
+        self.assertEqual(datetime(2021, 1, 1, 10), estrus.get_estrus_datetime())
+
     @patch("breeding_db.reader.ask")
     def test_read_and_insert_weanings(self, mock_ask):
 
@@ -0,0 +1,19 @@
+import unittest
+
+from breeding_db.schema import *
+
+
+class SchemaTestCase(unittest.TestCase):
+
+    def test_migrations(self):
+
+        # Versions start from 1 and increase one by one.
+        versions = [migration.get_version() for migration in MIGRATIONS]
+        self.assertEqual(list(range(1, len(MIGRATIONS) + 1)), versions)
+        self.assertEqual(len(MIGRATIONS), get_latest_version())
+        for migration in MIGRATIONS:
+            self.assertGreater(len(migration.get_statements()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()